@@ -7,20 +7,34 @@ It also optionally writes an SVG file representation.
 """
 
 import argparse
+import contextlib
 import copy
 import json
 import math
 import os
 import logging
-from typing import Any, Optional, Union, List, Tuple, Dict
+from typing import Any, Optional, Union, List, Tuple, Dict, Iterable, Iterator
 
 import gdspy
+import numpy as np
 
 # Geometry imports (assumed provided elsewhere in your project)
+from geometry.DatabaseGrid import DatabaseGrid
 from geometry.Line import Line
 from geometry.Octagon import Octagon
 from geometry.Point import Point
-from geometry.Polygon import Polygon
+from geometry.Polygon import Polygon, rotate_coords_quarter_turns, snap_coords_to_grid
+from geometry.PolygonGroupInstance import PolygonGroupInstance
+from geometry.SpatialIndex import SpatialIndex
+from geometry.ViaArray import ViaArray
+from gds_stream import GdsStreamWriter
+from output_cache import DEFAULT_MAX_BYTES, OUTPUT_SUFFIXES, OutputCache, output_key, output_kinds
+from parameter_graph import ParameterGraph, compile_expression, evaluate_expression
+from profiler import PROFILE_SUFFIX, GenerationProfiler
+from rule_check import RULES_SUFFIX, RuleChecker, write_report
+from stage_cache import DEFAULT_MAX_BYTES as DEFAULT_STAGE_CACHE_BYTES, StageCache, stage_key
+from svg_preview import write_preview_svg
+from thumbnail import DEFAULT_THUMBNAIL_SIZE, render_thumbnail, resolve_color_map, write_png
 
 
 class ColorFormatter(logging.Formatter):
@@ -51,20 +65,45 @@ if not logger.handlers:
     logger.addHandler(handler)
 
 
-# A safe environment for evaluating parameter expressions.
-SAFE_EVAL_ENV: Dict[str, Any] = {
-    **{k: getattr(math, k) for k in ['sqrt', 'log', 'sin', 'cos', 'tan', 'floor', 'ceil']},
-    'abs': abs,
-    'max': max,
-    'min': min,
-    'round': round,
-}
-
 # Constants for clarity
 ROTATION_ANGLE_UNIT = 45  # Each segment corresponds to 45° rotation
 DEFAULT_GRID_PRECISION = 0.005
 DEFAULT_GRID_PRECISION_DIAGONAL = DEFAULT_GRID_PRECISION/2.0
 
+# Default size cap of the --output-cache directory.
+DEFAULT_OUTPUT_CACHE_MB = DEFAULT_MAX_BYTES // 1024 ** 2
+
+# Default size cap of the --stage-cache directory.
+DEFAULT_STAGE_CACHE_MB = DEFAULT_STAGE_CACHE_BYTES // 1024 ** 2
+
+# Layer merging: gdspy's vertex limit per output polygon and its boolean precision.
+MERGE_MAX_POINTS = 199
+MERGE_PRECISION = 0.001
+
+# Item lists the generation stages append to. A stage's cached output is the
+# slice of each list it appended.
+STAGE_OUTPUTS = ("segment_gds_items", "bridge_gds_items", "arm_gds_items", "via_gds_items",
+                 "via_region_items", "guard_ring_gds_items", "dummy_fills_gds_items", "port_info")
+
+# Parameters every stage reads through the ring geometry (T, S, N, C, grid sizes, reference octagon).
+STAGE_CORE_PARAMETERS = ("apothem", "width", "spacing", "rings", "corners", "precision", "precisionDiagonal")
+
+# Symmetric generation of the 8 octagon segments: segment -> (source segment, mirror axis).
+# The NS mirror maps segment k to 4 - k and the WE mirror maps it to -k, so
+# segments 0, 1 and 2 determine the rest.
+OCTAGON_SEGMENT_MIRRORS = {3: (1, "NS"), 4: (0, "NS"), 5: (3, "WE"), 6: (2, "WE"), 7: (1, "WE")}
+
+# JSON sections each generation stage reads, and the stages whose output it reads.
+STAGE_INPUTS = {
+    "segments": (("Segments", "Arms", "Layers"), ()),
+    "bridges": (("Segments", "Bridges", "Layers"), ()),
+    "bridge_extensions": (("Segments", "Bridges", "ViaPadStack", "Via", "Layers"), ()),
+    "arms": (("Segments", "Arms", "ViaPadStack", "Via", "Layers"), ()),
+    "guard_ring": (("GuardRing", "ViaPadStack", "Via", "Layers"), ()),
+    "dummy_fills": (("GuardRing", "Layers"), ("arms",)),
+    "dummy_fill_bands": (("GuardRing", "Layers"), ()),
+}
+
 
 class Component:
     """
@@ -72,7 +111,13 @@ class Component:
     """
 
     def __init__(self, component_data: dict, output_path: Optional[str] = None,
-                 output_name: Optional[str] = None, generate_layout: bool = True, generate_svg: bool = True) -> None:
+                 output_name: Optional[str] = None, generate_layout: bool = True, generate_svg: bool = True,
+                 parameter_graph: Optional[ParameterGraph] = None,
+                 stage_cache: Optional[StageCache] = None, hierarchical: bool = False,
+                 merge_layers: bool = False, profile: bool = False,
+                 integer_coordinates: bool = False, symmetry: bool = False, stream_gds: bool = False,
+                 preview_lod: bool = False, thumbnail_size: int = 0,
+                 thumbnail_colors: Optional[Dict[str, Any]] = None, rule_check: bool = False) -> None:
         """
         Initialize the Component object.
 
@@ -81,13 +126,69 @@ class Component:
             output_path (str): The output directory path.
             output_name (str): The output file name.
             generate_svg (bool): Flag to generate SVG output. Defaults to True.
+            parameter_graph (ParameterGraph, optional): A precompiled graph of the
+                parameter block. When omitted it is compiled from component_data.
+            stage_cache (StageCache, optional): Cache of generation stage outputs
+                shared between components, e.g. the runs of a sweep.
+            hierarchical (bool): Write repeated vias and dummy-fill groups as
+                references to shared sub-cells instead of flat polygons.
+                Defaults to False, the flat layout.
+            merge_layers (bool): Union the segment, bridge, arm and guard ring
+                polygons per layer before writing. Defaults to False.
+            profile (bool): Record time, geometry counts and peak memory of every
+                stage, draw and write, and save them as <name>.profile.json next
+                to the outputs. The report is also kept in self.profile_report.
+            integer_coordinates (bool): Snap the generated geometry to the
+                "precision" grid in integer GDS database units instead of by
+                float rounding. Every polygon list is snapped in one vectorized
+                pass. Defaults to False.
+            symmetry (bool): Generate the guard ring, its contacts and the
+                dummy fills for part of the octagon only and derive the rest by
+                mirroring and quarter turns. Can also be enabled with
+                "symmetry": true in the guardRing config. Defaults to False.
+            stream_gds (bool): Write the GDS file with GdsStreamWriter while the
+                layout is drawn instead of building gdspy polygons first. The
+                file is identical apart from its timestamps. Without SVG output
+                self.cell then stays empty. Defaults to False.
+            preview_lod (bool): Write a level-of-detail SVG preview instead of
+                the full layout: via arrays are drawn as the hatched outline
+                of the area they fill and dummy fills as hatched bands, no
+                per-via or per-fill polygons are built and every layer is a
+                single SVG path. Cannot be combined with
+                generate_layout. Defaults to False.
+            thumbnail_size (int): Also write <name>.png, a thumbnail this many
+                pixels along its longer side rasterized from the generated
+                polygons. Defaults to 0, no thumbnail.
+            thumbnail_colors (dict, optional): Thumbnail colours keyed by layer
+                name or "layer/datatype", see thumbnail.resolve_color_map.
+                Other layers keep their SVG colours.
+            rule_check (bool): Check the generated items against the rules of
+                the layers block (see rule_check) before drawing, keep the
+                result in self.rule_report and write it to <name>.rules.json.
+                Defaults to False.
+
+        Raises:
+            ValueError: If preview_lod is combined with generate_layout, or a
+                thumbnail colour cannot be resolved.
         """
+        if preview_lod and generate_layout:
+            raise ValueError("preview_lod writes an SVG preview only; it cannot be combined with generate_layout")
+        self.preview_lod: bool = preview_lod
+        self.thumbnail_size: int = thumbnail_size
+        self.profiler: Optional[GenerationProfiler] = GenerationProfiler() if profile else None
+        self.profile_report: Optional[Dict[str, Any]] = None
+
         # Load metadata and parameters from component data
         self.Metadata: dict = component_data["metadata"]
         self.Parameters: dict = component_data["parameters"]
+        self.parameter_graph: Optional[ParameterGraph] = parameter_graph
+
+        # Cache of string expressions resolved against the final parameters.
+        self._resolved_expressions: Dict[str, Any] = {}
 
         # Resolve all parameters using the provided expressions.
-        self.resolve_all_parameters()
+        with self._profile_stage("parameters", "generate"):
+            self.resolve_all_parameters()
 
         # Log the resolved parameters for debugging purposes.
         logging.debug("Resolved parameters: %s", self.Parameters)
@@ -101,6 +202,9 @@ class Component:
         self.ViaPadStack: dict = component_data["viaPadStack"]
         self.GuardRing: dict = component_data["guardRing"]
         self.Layers: dict = component_data["layers"]
+        self.thumbnail_colors: Dict[Tuple[int, int], Tuple[int, int, int]] = resolve_color_map(
+            thumbnail_colors, self.Layers)
+        self.symmetry: bool = symmetry or bool(self.GuardRing["config"].get("symmetry", False))
 
         # Set key parameters.
         self.gridSize: float = self.Parameters["precision"]
@@ -117,43 +221,83 @@ class Component:
         for key, value in self.Parameters.items():
             setattr(self, key, value)
 
-        # Initialize GDS library and create the main cell.
+        # Initialize GDS library and create the main cell. The cell is kept out of
+        # gdspy's global library so one process can generate many components.
         self.lib = gdspy.GdsLibrary()
-        self.cell = self.lib.new_cell(self.Metadata["name"])
+        self.cell = gdspy.Cell(self.Metadata["name"], exclude_from_current=True)
+        self.lib.add(self.cell)
+
+        # Integer database-unit grid the layout is snapped to, if enabled.
+        self.database_grid: Optional[DatabaseGrid] = (
+            DatabaseGrid(self.gridSize, self.lib.precision / self.lib.unit) if integer_coordinates else None)
+        draw_grid: float = self.gridSize if integer_coordinates else DEFAULT_GRID_PRECISION
+
+        # Sub-cells for repeated vias and dummy-fill groups in hierarchical mode.
+        self.hierarchical: bool = hierarchical
+        self._subcells: Dict[Any, gdspy.Cell] = {}
 
         # Initialize lists to store different GDS items.
         self.segment_gds_items: List[Polygon] = []
         self.bridge_gds_items: List[Polygon] = []
         self.arm_gds_items: List[Polygon] = []
-        self.via_gds_items: List[Polygon] = []
+        self.via_gds_items: List[Union[Polygon, ViaArray]] = []
+        # Areas via arrays would fill, generated instead of the arrays in preview mode.
+        self.via_region_items: List[Polygon] = []
         self.guard_ring_gds_items: List[Polygon] = []
-        self.dummy_fills_gds_items: List[Polygon] = []
+        self.dummy_fills_gds_items: List[PolygonGroupInstance] = []
         self.port_gds_items: List[Any] = []
         self.port_info: List[dict] = []
 
+        # Bridge jump and gap extension tables per segment, see _bridge_table.
+        self._bridge_tables: Dict[int, Dict[str, List[float]]] = {}
+
+        # Layer-keyed index over the arms, used for dummy-fill collision checks.
+        self.arm_index: Optional[SpatialIndex] = None
+
+        self.stage_cache: Optional[StageCache] = stage_cache
+        self._stage_keys: Dict[str, str] = {}
+
         # Generate all layout items.
-        self._generate_segment_items(snap_to_grid=True)
-        self._generate_bridge_items(snap_to_grid=True)
-        self._generate_bridge_extensions_items(snap_to_grid=True)
-        self._generate_arm_items(snap_to_grid=True)
-        self._generate_guard_ring_items(snap_to_grid=True)
-        self._generate_dummy_fills(snap_to_grid=True)
-        self._generate_port_items(snap_to_grid=True)
-
-        # Draw the generated items to the GDS cell.
-        self._draw_items_to_gds(self.segment_gds_items, snap_to_grid=True, grid_precision=DEFAULT_GRID_PRECISION)
-        self._draw_items_to_gds(self.bridge_gds_items, snap_to_grid=True, grid_precision=DEFAULT_GRID_PRECISION)
-        self._draw_items_to_gds(self.arm_gds_items, snap_to_grid=True, grid_precision=DEFAULT_GRID_PRECISION)
-        self._draw_items_to_gds(self.via_gds_items, snap_to_grid=True, grid_precision=DEFAULT_GRID_PRECISION)
-        self._draw_items_to_gds(self.guard_ring_gds_items, snap_to_grid=True, grid_precision=DEFAULT_GRID_PRECISION)
-        self._draw_items_to_gds(
-            self.dummy_fills_gds_items, snap_to_grid=True, grid_precision=DEFAULT_GRID_PRECISION,
-            segmented_path=False, segmented_path_precision=0.02)
+        self._run_stage("segments", self._generate_segment_items, snap_to_grid=True)
+        self._run_stage("bridges", self._generate_bridge_items, snap_to_grid=True)
+        self._run_stage("bridge_extensions", self._generate_bridge_extensions_items, snap_to_grid=True)
+        self._run_stage("arms", self._generate_arm_items, snap_to_grid=True)
+        self._run_stage("guard_ring", self._generate_guard_ring_items, snap_to_grid=True)
+        if preview_lod:
+            self._run_stage("dummy_fill_bands", self._generate_dummy_fill_bands)
+        else:
+            self._run_stage("dummy_fills", self._generate_dummy_fills, snap_to_grid=True)
 
         # Define output paths and file names.
         out_path: str = output_path if output_path else self.Parameters["outputDir"]
         out_name: str = output_name if output_name else self.Metadata["name"]
 
+        # Check the generated items themselves, before drawing snaps them and hands them to gdspy.
+        self.rule_report: Optional[Dict[str, Any]] = None
+        if rule_check:
+            with self._profile_stage("rule_check", "check") as record:
+                self.rule_report = self._check_rules()
+            record["violations"] = sum(self.rule_report["counts"].values())
+
+        # In streaming mode the GDS file is written while the items are drawn.
+        self.gds_writer: Optional[GdsStreamWriter] = None
+        if stream_gds and generate_layout:
+            os.makedirs(out_path, exist_ok=True)
+            self.gds_writer = GdsStreamWriter(os.path.join(out_path, f"{out_name}.gds"), self.cell.name,
+                                              self.lib.unit, self.lib.precision, self.lib.name)
+        # gdspy elements are only needed for gdspy's GDS writer and for SVG output.
+        self._fill_cell: bool = self.gds_writer is None or generate_svg
+
+        # Draw the generated items to the GDS cell. Previews are written from the items directly.
+        self.merge_stats: Dict[str, Dict[str, int]] = {}
+        if not preview_lod:
+            try:
+                self._draw_layout(merge_layers, draw_grid)
+            except BaseException:
+                if self.gds_writer is not None:
+                    self.gds_writer.abort()
+                raise
+
         # Create the output directory if it doesn't exist.
         if not os.path.exists(out_path):
             os.makedirs(out_path)
@@ -161,30 +305,53 @@ class Component:
         # Write GDS and optionally SVG files.
         self._write_output_files(out_path, out_name, generate_layout, generate_svg)
 
-    def resolve_all_parameters(self) -> None:
+        if self.profiler is not None:
+            self.profile_report = self.profiler.finish(name=out_name, merge=self.merge_stats)
+            profile_file = os.path.join(out_path, f"{out_name}{PROFILE_SUFFIX}")
+            GenerationProfiler.write(self.profile_report, profile_file)
+            logging.info("Profile written: %s (%.3f s)", profile_file, self.profile_report["total_seconds"])
+
+    def _draw_layout(self, merge_layers: bool, draw_grid: float) -> None:
         """
-        Resolve all parameters defined in the Parameters dictionary.
-        This method repeatedly attempts to evaluate each parameter based on already resolved values.
+        Draw the ports and every generated item list, in GDS element order.
         """
-        unresolved = dict(self.Parameters)
-        resolved: dict = {}
-        max_attempts = len(unresolved)
-
-        for _ in range(max_attempts):
-            for key in list(unresolved):
-                try:
-                    resolved[key] = self._resolve_parameter(unresolved[key], resolved)
-                    del unresolved[key]
-                except Exception:
-                    # Retry later if dependent parameters are not yet resolved.
-                    pass
-            if not unresolved:
-                break
+        with self._profile_draw("draw_ports"):
+            self._generate_port_items(snap_to_grid=True)
+
+        if merge_layers:
+            with self._profile_draw("merge_conductors"):
+                self._merge_items_to_gds(
+                    [self.segment_gds_items, self.bridge_gds_items, self.arm_gds_items, self.guard_ring_gds_items],
+                    grid_precision=draw_grid)
+        else:
+            with self._profile_draw("draw_segments"):
+                self._draw_items_to_gds(self.segment_gds_items, snap_to_grid=True, grid_precision=draw_grid)
+            with self._profile_draw("draw_bridges"):
+                self._draw_items_to_gds(self.bridge_gds_items, snap_to_grid=True, grid_precision=draw_grid)
+            with self._profile_draw("draw_arms"):
+                self._draw_items_to_gds(self.arm_gds_items, snap_to_grid=True, grid_precision=draw_grid)
+        with self._profile_draw("draw_vias"):
+            self._draw_items_to_gds(self.via_gds_items, snap_to_grid=True, grid_precision=draw_grid)
+        if not merge_layers:
+            with self._profile_draw("draw_guard_ring"):
+                self._draw_items_to_gds(self.guard_ring_gds_items, snap_to_grid=True,
+                                        grid_precision=draw_grid)
+        with self._profile_draw("draw_dummy_fills"):
+            self._draw_items_to_gds(
+                self.dummy_fills_gds_items, snap_to_grid=True, grid_precision=draw_grid,
+                segmented_path=False, segmented_path_precision=0.02)
 
-        if unresolved:
-            raise ValueError(f"Unresolved parameters after {max_attempts} attempts: {list(unresolved)}")
+    def resolve_all_parameters(self) -> None:
+        """
+        Resolve all parameters defined in the Parameters dictionary.
+        The parameter block is compiled into a dependency graph once and evaluated in topological order.
 
-        self.Parameters = resolved
+        Raises:
+            ParameterError: On syntax errors, unknown names, circular references or failed evaluations.
+        """
+        if self.parameter_graph is None:
+            self.parameter_graph = ParameterGraph(self.Parameters)
+        self.Parameters = self.parameter_graph.evaluate()
 
     def _resolve_parameter(self, value: Any, context: Optional[dict] = None) -> Any:
         """
@@ -201,55 +368,275 @@ class Component:
             context = self.Parameters  # fallback context
 
         if isinstance(value, str):
+            # Field values such as "armLen" are resolved many times during generation.
+            cacheable = context is self.Parameters
+            if cacheable and value in self._resolved_expressions:
+                return self._resolved_expressions[value]
             try:
-                return eval(value, SAFE_EVAL_ENV, context)
+                result = evaluate_expression(value, context)
             except Exception:
                 if value in context:
-                    return self._resolve_parameter(context[value], context)
+                    result = self._resolve_parameter(context[value], context)
                 else:
                     raise ValueError(f"Could not evaluate or resolve key: {value}")
+            if cacheable:
+                self._resolved_expressions[value] = result
+            return result
         elif isinstance(value, (list, tuple)):
             return type(value)(self._resolve_parameter(v, context) for v in value)
         elif hasattr(value, '__array__'):
-            import numpy as np
             return np.array([self._resolve_parameter(v, context) for v in value])
         else:
             return value
 
+    def _stage_parameter_names(self, value: Any, names: set) -> None:
+        """
+        Collect the parameters referenced by the strings in a JSON subtree.
+        """
+        if isinstance(value, str):
+            if value in self.Parameters:
+                names.add(value)
+            try:
+                _, free_names = compile_expression(value)
+            except SyntaxError:
+                return
+            names.update(name for name in free_names if name in self.Parameters)
+        elif isinstance(value, dict):
+            for item in value.values():
+                self._stage_parameter_names(item, names)
+        elif isinstance(value, (list, tuple)):
+            for item in value:
+                self._stage_parameter_names(item, names)
+
+    def _stage_key(self, stage: str) -> str:
+        """
+        Cache key of a generation stage: the JSON sections it reads, the resolved
+        values of the parameters they reference and the keys of the stages it builds on.
+        """
+        sections, upstream = STAGE_INPUTS[stage]
+        subtrees = [getattr(self, section) for section in sections]
+        names = set(STAGE_CORE_PARAMETERS)
+        self._stage_parameter_names(subtrees, names)
+        parameters = {name: self.Parameters.get(name) for name in sorted(names)}
+        return stage_key(stage, subtrees, parameters, [self._stage_keys[dep] for dep in upstream], self.symmetry,
+                         self.preview_lod)
+
+    def _run_stage(self, stage: str, generate: Any, **kwargs: Any) -> None:
+        """
+        Run one generation stage, reusing its cached output when its inputs are unchanged.
+
+        Parameters:
+            stage (str): The stage name, a key of STAGE_INPUTS.
+            generate (callable): The _generate_* method implementing the stage.
+        """
+        start = {attr: len(getattr(self, attr)) for attr in STAGE_OUTPUTS}
+        with self._profile_stage(stage, "generate") as record:
+            record["cached"] = self._run_cached_stage(stage, generate, start, **kwargs)
+        if self.profiler is not None:
+            record["polygons"], record["vertices"] = self._count_geometry(
+                item for attr in STAGE_OUTPUTS if attr != "port_info" for item in getattr(self, attr)[start[attr]:])
+
+    def _run_cached_stage(self, stage: str, generate: Any, start: Dict[str, int], **kwargs: Any) -> bool:
+        """
+        Returns:
+            bool: True if the stage output was taken from the stage cache.
+        """
+        if self.stage_cache is None:
+            generate(**kwargs)
+            return False
+
+        key = self._stage_keys[stage] = self._stage_key(stage)
+        cached = self.stage_cache.get(key)
+        if cached is not None:
+            logging.debug("Reusing cached %s stage", stage)
+            for attr, items in cached.items():
+                getattr(self, attr).extend(self._copy_stage_items(items))
+            return True
+
+        generate(**kwargs)
+        # Store copies: the live polygons are snapped in place when drawn.
+        self.stage_cache.put(key, {
+            attr: self._copy_stage_items(getattr(self, attr)[start[attr]:])
+            for attr in STAGE_OUTPUTS if len(getattr(self, attr)) > start[attr]
+        })
+        return False
+
+    def _profile_stage(self, name: str, kind: str) -> Any:
+        """
+        The profiler's context manager for a stage, or a no-op one yielding a
+        throwaway record when profiling is off.
+        """
+        if self.profiler is None:
+            return contextlib.nullcontext({})
+        return self.profiler.stage(name, kind)
+
+    @contextlib.contextmanager
+    def _profile_draw(self, name: str) -> Iterator[None]:
+        """
+        Profile a block that adds elements to the GDS cell and count what it added.
+        """
+        if self.profiler is None:
+            yield
+            return
+        if not self._fill_cell:
+            writer = self.gds_writer
+            start = (writer.polygons, writer.vertices, writer.references)
+            with self.profiler.stage(name, "draw") as record:
+                yield
+            record["polygons"] = writer.polygons - start[0]
+            record["vertices"] = writer.vertices - start[1]
+            record["references"] = writer.references - start[2]
+            return
+        start_polygons = len(self.cell.polygons)
+        start_references = len(self.cell.references)
+        with self.profiler.stage(name, "draw") as record:
+            yield
+        added = self.cell.polygons[start_polygons:]
+        record["polygons"] = sum(len(element.polygons) for element in added)
+        record["vertices"] = sum(len(points) for element in added for points in element.polygons)
+        record["references"] = len(self.cell.references) - start_references
+
+    @staticmethod
+    def _count_geometry(items: Iterable[Any]) -> Tuple[int, int]:
+        """
+        Returns:
+            Tuple[int, int]: The number of polygons and vertices the items expand to.
+        """
+        polygons = vertices = 0
+        for item in items:
+            if isinstance(item, ViaArray):
+                polygons += len(item)
+                vertices += 4 * len(item)
+            else:
+                for poly in ([item] if isinstance(item, Polygon) else item.to_polygons()):
+                    polygons += 1
+                    vertices += len(poly)
+        return polygons, vertices
+
+    @staticmethod
+    def _copy_stage_items(items: List[Any]) -> List[Any]:
+        return [item.copy() if isinstance(item, (Polygon, ViaArray, PolygonGroupInstance)) else copy.deepcopy(item)
+                for item in items]
+
     def _write_output_files(self, output_path: str, output_name: str, generate_layout: bool, generate_svg: bool) -> None:
         """
         Write the GDS and SVG files if requested, and verify their existence before logging success.
         """
         if generate_layout:
             gds_file = os.path.join(output_path, f"{output_name}.gds")
-            self.lib.write_gds(gds_file)
+            with self._profile_stage("write_gds", "write") as record:
+                if self.gds_writer is not None:
+                    self.gds_writer.close(self._subcells.values())
+                else:
+                    self._unlink_output(gds_file)
+                    self.lib.write_gds(gds_file)
             if os.path.exists(gds_file):
+                record["bytes"] = os.path.getsize(gds_file)
                 logging.info("GDS file written successfully: %s", gds_file)
             else:
                 logging.error("Failed to write GDS file: %s", gds_file)
 
         if generate_svg:
             svg_file = os.path.join(output_path, f"{output_name}.svg")
-            self.cell.write_svg(svg_file)
+            self._unlink_output(svg_file)
+            with self._profile_stage("write_svg", "write") as record:
+                if self.preview_lod:
+                    self._write_preview_svg(svg_file)
+                else:
+                    self.cell.write_svg(svg_file)
             if os.path.exists(svg_file):
+                record["bytes"] = os.path.getsize(svg_file)
                 logging.info("SVG file written successfully: %s", svg_file)
             else:
                 logging.error("Failed to write SVG file: %s", svg_file)
 
+        if self.rule_report is not None:
+            rules_file = os.path.join(output_path, f"{output_name}{RULES_SUFFIX}")
+            self._unlink_output(rules_file)
+            write_report(self.rule_report, rules_file)
+            if self.rule_report["passed"]:
+                logging.info("Rule check passed: %s", rules_file)
+            else:
+                logging.warning("Rule check failed (%s): %s", ", ".join(
+                    f"{name} x{count}" for name, count in self.rule_report["counts"].items()), rules_file)
+
+        if self.thumbnail_size:
+            png_file = os.path.join(output_path, f"{output_name}.png")
+            self._unlink_output(png_file)
+            with self._profile_stage("write_thumbnail", "write") as record:
+                image = render_thumbnail(self._layer_shapes(), self.thumbnail_size, self.thumbnail_colors)
+                write_png(png_file, image)
+            record["bytes"] = os.path.getsize(png_file)
+            logging.info("Thumbnail written successfully: %s", png_file)
+
+    def _check_rules(self) -> Dict[str, Any]:
+        """
+        Check the generated items against the layer rules, see RuleChecker.check.
+        """
+        checker = RuleChecker(self.Layers, self._resolve_parameter, tolerance=self.gridSize)
+        # Preview items (via regions and fill bands) are not checked.
+        fills = [] if self.preview_lod else [
+            polygon for instance in self.dummy_fills_gds_items for polygon in instance.to_polygons()]
+        return checker.check(
+            self.segment_gds_items + self.bridge_gds_items + self.arm_gds_items + self.guard_ring_gds_items,
+            pads=[item for item in self.via_gds_items if isinstance(item, Polygon)],
+            vias=[item for item in self.via_gds_items if isinstance(item, ViaArray)],
+            fills=fills)
+
+    def _layer_shapes(self) -> List[Tuple[np.ndarray, int, int]]:
+        """
+        (coords, layer, datatype) of every generated polygon, via arrays as their via corners.
+        """
+        shapes = []
+        for attr in STAGE_OUTPUTS:
+            if attr == "port_info":
+                continue
+            for item in getattr(self, attr):
+                if isinstance(item, ViaArray):
+                    shapes.extend((corners, item.gds_layer, item.gds_datatype) for corners in item.corners())
+                elif isinstance(item, PolygonGroupInstance):
+                    shapes.extend((poly.coords, poly.gds_layer, poly.gds_datatype) for poly in item.to_polygons())
+                else:
+                    shapes.append((item.coords, item.gds_layer, item.gds_datatype))
+        return shapes
+
+    def _write_preview_svg(self, svg_file: str) -> None:
+        """
+        Write the level-of-detail SVG preview of the generated items.
+        """
+        # Via regions and dummy-fill bands are drawn hatched, see _generate_dummy_fill_bands.
+        polygons = [(item.coords, item.gds_layer, item.gds_datatype)
+                    for items in (self.segment_gds_items, self.bridge_gds_items, self.arm_gds_items,
+                                  self.via_gds_items, self.guard_ring_gds_items)
+                    for item in items]
+        regions = [(item.coords, item.gds_layer, item.gds_datatype)
+                   for items in (self.via_region_items, self.dummy_fills_gds_items) for item in items]
+        labels = [(text, position, layer, texttype, 20) for text, position, layer, texttype in self._port_labels()]
+        write_preview_svg(svg_file, polygons, regions, labels)
+
+    @staticmethod
+    def _unlink_output(path: str) -> None:
+        # An output restored from an OutputCache may be a hard link to the
+        # cached file; replace it instead of writing through the link.
+        if os.path.lexists(path):
+            os.remove(path)
 
     def _append_gds_item(self, item_list: List[Polygon], poly: Union[Polygon, List[Polygon]]) -> None:
         """
         Append a polygon or list of polygons to a GDS item list.
 
+        Via arrays and placed polygon groups are appended as they are and only
+        expanded into polygons when drawn.
+
         Parameters:
             item_list (list): The list to append to.
             poly (Polygon or list): The polygon(s) to append.
         """
-        if isinstance(poly, Polygon):
+        if isinstance(poly, (Polygon, ViaArray, PolygonGroupInstance)):
             item_list.append(poly)
         elif isinstance(poly, list):
             for p in poly:
-                if isinstance(p, Polygon):
+                if isinstance(p, (Polygon, ViaArray, PolygonGroupInstance)):
                     item_list.append(p)
 
     def _draw_items_to_gds(self, item_list: List[Polygon], snap_to_grid: bool = True,
@@ -262,15 +649,193 @@ class Component:
             item_list (list): List of polygons to draw.
             snap_to_grid (bool): Whether to snap the polygons to grid.
             grid_precision (float): The grid resolution.
-            segmented_path (bool): Whether to generate segmented paths.
-            segmented_path_precision (float): Precision for segmented path generation.
+            segmented_path (bool): Whether to replace every edge by a staircase
+                of axis-parallel steps, see Polygon.generate_staircase_lines.
+            segmented_path_precision (float): Step size of the staircase.
+        """
+        # Runs of polygons, and via arrays that are streamed without expanding them, in drawing order.
+        batches: List[Union[List[Polygon], ViaArray]] = [[]]
+        stream_vias = not self._fill_cell and not segmented_path
+        for item in item_list:
+            if isinstance(item, Polygon):
+                batches[-1].append(item)
+            elif self.hierarchical and isinstance(item, ViaArray):
+                self._draw_via_array_to_gds(item, grid_precision if snap_to_grid else None)
+            elif self.hierarchical and isinstance(item, PolygonGroupInstance) and item.is_complete():
+                self._draw_group_instance_to_gds(item, grid_precision if snap_to_grid else None)
+            elif stream_vias and isinstance(item, ViaArray):
+                batches.extend([item, []])
+            else:
+                batches[-1].extend(item.to_polygons())
+
+        polygons = [poly for batch in batches if isinstance(batch, list) for poly in batch]
+        if snap_to_grid:
+            self._snap_polygons(polygons, grid_precision)
+        if segmented_path:
+            for poly in polygons:
+                poly.generate_staircase_lines(segmented_path_precision)
+        for batch in batches:
+            if isinstance(batch, ViaArray):
+                self._stream_via_array(batch, grid_precision if snap_to_grid else None)
+            else:
+                self._add_polygons(batch)
+
+    def _stream_via_array(self, vias: ViaArray, grid: Optional[float]) -> None:
         """
-        for poly in item_list:
-            if snap_to_grid:
+        Write a via array to the GDS stream from its corner array, without one Polygon per via.
+        """
+        corners = vias.corners()
+        if grid is not None:
+            if self.database_grid is not None:
+                corners = self.database_grid.snap(corners)
+            else:
+                corners = snap_coords_to_grid(corners.reshape(-1, 2), grid).reshape(corners.shape)
+        self.gds_writer.add_polygons(corners, vias.gds_layer, vias.gds_datatype)
+
+    def _add_polygons(self, polygons: List[Polygon]) -> None:
+        """
+        Add polygons to the top cell: streamed to the GDS writer and/or as gdspy polygons.
+        """
+        if self.gds_writer is not None:
+            self.gds_writer.add_polygons([poly.coords for poly in polygons],
+                                         [poly.gds_layer for poly in polygons],
+                                         [poly.gds_datatype for poly in polygons])
+        if self._fill_cell:
+            for poly in polygons:
+                self.cell.add(poly.to_gdspy_polygon(poly.gds_layer, poly.gds_datatype))
+
+    def _add_reference(self, reference: Union[gdspy.CellReference, gdspy.CellArray]) -> None:
+        if self.gds_writer is not None:
+            self.gds_writer.add_reference(reference)
+        if self._fill_cell:
+            self.cell.add(reference)
+
+    def _snap_polygons(self, polygons: List[Polygon], grid_precision: float) -> None:
+        """
+        Snap polygons in place, in one pass over all of them in integer coordinate mode.
+        """
+        if self.database_grid is not None:
+            self.database_grid.snap_polygons(polygons)
+        else:
+            for poly in polygons:
                 poly.snap_to_grid(grid_precision)
-            if segmented_path:
-                poly.generate_segmented_path(segmented_path_precision)
-            self.cell.add(poly.to_gdspy_polygon(poly.gds_layer, poly.gds_datatype))
+
+    def _merge_items_to_gds(self, item_lists: List[List[Polygon]],
+                            grid_precision: float = DEFAULT_GRID_PRECISION) -> None:
+        """
+        Snap the items, union them per (layer, datatype) and draw the result.
+
+        Abutting and overlapping polygons on a layer become as few polygons as
+        gdspy allows with at most MERGE_MAX_POINTS vertices each. Merged
+        vertices are snapped again, since intersections of diagonal edges can
+        fall off the grid. Before/after counts are kept in self.merge_stats.
+
+        Parameters:
+            item_lists (list): Item lists whose polygons are merged together.
+            grid_precision (float): The grid resolution.
+        """
+        polygons = [poly for item_list in item_lists for item in item_list
+                    for poly in ([item] if isinstance(item, Polygon) else item.to_polygons())]
+        self._snap_polygons(polygons, grid_precision)
+        by_layer: Dict[Tuple[int, int], List[np.ndarray]] = {}
+        for poly in polygons:
+            by_layer.setdefault((poly.gds_layer, poly.gds_datatype), []).append(poly.coords)
+
+        total_before = total_after = 0
+        for (gds_layer, gds_datatype), coords in by_layer.items():
+            merged = gdspy.boolean(coords, None, "or", precision=MERGE_PRECISION, max_points=MERGE_MAX_POINTS,
+                                   layer=gds_layer, datatype=gds_datatype)
+            after = 0
+            if merged is not None:
+                if self.database_grid is not None:
+                    merged.polygons = [self.database_grid.snap(points) for points in merged.polygons]
+                else:
+                    for points in merged.polygons:
+                        snap_coords_to_grid(points, grid_precision)
+                after = len(merged.polygons)
+                if self.gds_writer is not None:
+                    self.gds_writer.add_polygons(merged.polygons, merged.layers, merged.datatypes)
+                if self._fill_cell:
+                    self.cell.add(merged)
+            self.merge_stats[f"{gds_layer}/{gds_datatype}"] = {"before": len(coords), "after": after}
+            logging.debug("Merged layer %s/%s: %d -> %d polygons", gds_layer, gds_datatype, len(coords), after)
+            total_before += len(coords)
+            total_after += after
+
+        logging.info("Layer merge: %d polygons -> %d", total_before, total_after)
+
+    def _subcell(self, prefix: str, polygons: List[Polygon], grid: Optional[float]) -> gdspy.Cell:
+        """
+        Return the sub-cell holding the given polygons, creating it on first use.
+        Identical polygon sets share one cell.
+        """
+        key = (prefix, grid, tuple((p.gds_layer, p.gds_datatype, p.coords.tobytes()) for p in polygons))
+        cell = self._subcells.get(key)
+        if cell is None:
+            cell = gdspy.Cell(f"{self.cell.name}_{prefix}{len(self._subcells)}", exclude_from_current=True)
+            cell_polygons = Polygon.copy_polygons(polygons)
+            if grid is not None:
+                self._snap_polygons(cell_polygons, grid)
+            for poly in cell_polygons:
+                cell.add(poly.to_gdspy_polygon(poly.gds_layer, poly.gds_datatype))
+            self.lib.add(cell)
+            self._subcells[key] = cell
+        return cell
+
+    def _snap_point(self, x: float, y: float, grid: Optional[float]) -> Tuple[float, float]:
+        if grid is None:
+            return x, y
+        if self.database_grid is not None:
+            return self.database_grid.snap_point(x, y)
+        snapped = snap_coords_to_grid(np.array([[x, y]], dtype=np.float64), grid)
+        return float(snapped[0, 0]), float(snapped[0, 1])
+
+    def _draw_via_array_to_gds(self, vias: ViaArray, grid: Optional[float]) -> None:
+        """
+        Draw a via array as references to a single-via cell.
+
+        Full rectangular blocks of the grid become CellArrays. If the via
+        pitch is off-grid, every via gets its own reference so each placement
+        can be snapped.
+        """
+        if len(vias) == 0:
+            return
+        cell = self._subcell("VIA", [vias.unit_polygon()], grid)
+        pitch_on_grid = grid is None or all(abs(p / grid - round(p / grid)) < 1e-6 for p in vias.pitch)
+
+        if pitch_on_grid:
+            spacing = self._snap_point(vias.pitch[0], vias.pitch[1], grid)
+            for row, column, rows, columns in vias.blocks():
+                origin = self._snap_point(*vias.centre(row, column), grid)
+                if rows == 1 and columns == 1:
+                    self._add_reference(gdspy.CellReference(cell, origin))
+                else:
+                    self._add_reference(gdspy.CellArray(cell, columns, rows, spacing, origin))
+        else:
+            for x, y in vias.centres().tolist():
+                self._add_reference(gdspy.CellReference(cell, self._snap_point(x, y, grid)))
+
+    def _draw_group_instance_to_gds(self, instance: PolygonGroupInstance, grid: Optional[float]) -> None:
+        """
+        Draw a complete polygon group placement as a reference to a cell of its polygons.
+
+        The cell holds the placed polygons, snapped as the flat layout snaps
+        them, moved back by the snapped origin, and an unrotated reference
+        puts them there again, so the flattened cell is the flat layout
+        exactly. Placements whose snapped polygons have the same shape
+        relative to their origin share one cell.
+        """
+        polygons = Polygon.copy_polygons(instance.to_polygons())
+        origin = instance.origin
+        if grid is not None:
+            self._snap_polygons(polygons, grid)
+            origin = self._snap_point(origin[0], origin[1], grid)
+        Polygon.move_polygons(polygons, -origin[0], -origin[1])
+        if grid is not None:
+            # Snapping again takes out the rounding of the move, so equal shapes key the same cell.
+            self._snap_polygons(polygons, grid)
+        cell = self._subcell("FILL", polygons, grid)
+        self._add_reference(gdspy.CellReference(cell, origin))
 
     # def grid_adjusted_length(self, full_length: float, grid: float = DEFAULT_GRID_PRECISION) -> Tuple[float, int]:
     #     """
@@ -347,20 +912,19 @@ class Component:
                     self._set_polygon_layer(seg_poly, seg_layer)
                     self._append_gds_item(self.segment_gds_items, seg_poly)
                 elif group_def["type"].lower() == "bridge":
+                    bridge_table = self._bridge_table(seg_id)
                     if self.Segments["config"].get("bridge_extension_aligned", 0) == 1:
-                        max_jumps = max(abs(jump) for jump in self._ccw_bridge_jumps(seg_id))
+                        max_jumps = max(abs(jump) for jump in bridge_table["ccw_jumps"])
                         max_gap = max_jumps * (self.T + self.S)
                         ccw_gap = max_gap / 2.0
                         cw_gap = max_gap / 2.0
                         ccw_ext = 0
                         cw_ext = 0
                     else:
-                        ccw_extensions = self._determine_gaps_on_segment_group(seg_id, 0)
-                        cw_extensions = self._determine_gaps_on_segment_group(seg_id, 1)
-                        ccw_gap = abs(self._ccw_bridge_jumps(seg_id)[ring]) * (self.T + self.S) / 2.0
-                        cw_gap = abs(self._cw_bridge_jumps(seg_id)[ring]) * (self.T + self.S) / 2.0
-                        ccw_ext = ccw_extensions[ring]
-                        cw_ext = cw_extensions[ring]
+                        ccw_gap = abs(bridge_table["ccw_jumps"][ring]) * (self.T + self.S) / 2.0
+                        cw_gap = abs(bridge_table["cw_jumps"][ring]) * (self.T + self.S) / 2.0
+                        ccw_ext = bridge_table["ccw_extensions"][ring]
+                        cw_ext = bridge_table["cw_extensions"][ring]
 
                     apothem = self.ref_Octagon.apothem_ref + ring * (self.T + self.S)
                     seg_poly = self._octagon_ring_with_asymmetrical_gap_polygon(
@@ -401,12 +965,12 @@ class Component:
         gds_layer = self._resolve_parameter(layer["gds"]["layer"])
         gds_datatype = self._resolve_parameter(layer["gds"]["datatype"])
 
-        if isinstance(polygon, Polygon):
+        if isinstance(polygon, (Polygon, ViaArray)):
             polygon.gds_layer = gds_layer
             polygon.gds_datatype = gds_datatype
         elif isinstance(polygon, list):
             for p in polygon:
-                if isinstance(p, Polygon):
+                if isinstance(p, (Polygon, ViaArray)):
                     p.gds_layer = gds_layer
                     p.gds_datatype = gds_datatype
 
@@ -680,55 +1244,77 @@ class Component:
                 self._set_polygon_layer(poly, layer)
                 self._append_gds_item(self.guard_ring_gds_items, poly)
             elif shape.lower() == "octagonring":
-                width = segment["width"]
                 width = self._resolve_parameter(segment["width"])
-                if ("partialCut" in segment and segment["partialCut"]["use"]):
-                    for i in range(self.C):
-                        partialCutSegment = self._resolve_parameter(segment["partialCut"]["segment"])
-                        partialCutSpacing = self._resolve_parameter(segment["partialCut"]["spacing"])
-                        # Determine if a partial cut is to be applied for this segment.
-                        usePartialCutInSegment = (isinstance(partialCutSegment, (list, tuple)) and i in partialCutSegment) or (partialCutSegment == i)
-
-                        if usePartialCutInSegment:
-                            segments = self._octagon_ring_with_asymmetrical_gap_polygon(
-                                ref_apothem + offset, width, i, partialCutSpacing / 2.0, partialCutSpacing / 2.0)
-                            self._set_polygon_layer(segments, layer)
-                            self._append_gds_item(self.guard_ring_gds_items, segments)
-
-                            if "contacts" in segment and segment["contacts"]["use"]:
-                                via_stack = segment["contacts"]["viaStack"]
-                                via_stack_data = self.ViaPadStack[via_stack]
-                                via_margin = self._resolve_parameter(via_stack_data["margin"])
-
-                                self._generate_via_stack_on_polygon(
-                                    segments[0], via_stack, via_margin)
-                                self._generate_via_stack_on_polygon(
-                                    segments[1], via_stack, via_margin)
-                        else:
-                            segment_poly = self._octagon_ring_segment_polygon(
-                                ref_apothem + offset, width, i)
-                            self._set_polygon_layer(segment_poly, layer)
-                            self._append_gds_item(self.guard_ring_gds_items, segment_poly)
-
-                            if "contacts" in segment and segment["contacts"]["use"]:
-                                via_stack = segment["contacts"]["viaStack"]
-                                via_stack_data = self.ViaPadStack[via_stack]
-                                via_margin = self._resolve_parameter(via_stack_data["margin"])
-                                self._generate_via_stack_on_polygon(
-                                    segment_poly, via_stack, via_margin)
-                else:
-                    for i in range(self.C):
-                        segment_poly = self._octagon_ring_segment_polygon(
-                            ref_apothem + offset, width, i)
-                        self._set_polygon_layer(segment_poly, layer)
-                        self._append_gds_item(self.guard_ring_gds_items, segment_poly)
-
-                        if "contacts" in segment and segment["contacts"]["use"]:
-                            via_stack = segment["contacts"]["viaStack"]
-                            via_stack_data = self.ViaPadStack[via_stack]
-                            via_margin = self._resolve_parameter(via_stack_data["margin"])
-                            self._generate_via_stack_on_polygon(
-                                segment_poly, via_stack, via_margin)
+                mirrors = self._guard_ring_mirrors(segment) if self.symmetry else {}
+                produced: Dict[int, Tuple[List[Any], ...]] = {}
+                for i in range(self.C):
+                    item_lists = (self.guard_ring_gds_items, self.via_gds_items, self.via_region_items)
+                    start = [len(item_list) for item_list in item_lists]
+                    if i in mirrors:
+                        source, axis = mirrors[i]
+                        for item_list, items in zip(item_lists, produced[source]):
+                            for item in items:
+                                mirrored = item.copy()
+                                mirrored.mirror(axis)
+                                item_list.append(mirrored)
+                    else:
+                        self._generate_guard_ring_segment(segment, i, ref_apothem + offset, width, layer)
+                    produced[i] = tuple(item_list[n:] for item_list, n in zip(item_lists, start))
+
+    def _generate_guard_ring_segment(self, segment: dict, i: int, apothem: float, width: float, layer: str) -> None:
+        """
+        Generate one segment of an octagon ring guard ring and its contacts.
+
+        Parameters:
+            segment (dict): The guard ring segment definition.
+            i (int): Octagon segment index.
+            apothem (float): Inner apothem of the ring.
+            width (float): Ring width.
+            layer (str): Layer name of the ring.
+        """
+        if self._guard_ring_partial_cut(segment, i):
+            partialCutSpacing = self._resolve_parameter(segment["partialCut"]["spacing"])
+            polygons = self._octagon_ring_with_asymmetrical_gap_polygon(
+                apothem, width, i, partialCutSpacing / 2.0, partialCutSpacing / 2.0)
+        else:
+            polygons = [self._octagon_ring_segment_polygon(apothem, width, i)]
+        self._set_polygon_layer(polygons, layer)
+        self._append_gds_item(self.guard_ring_gds_items, polygons)
+
+        if "contacts" in segment and segment["contacts"]["use"]:
+            via_stack = segment["contacts"]["viaStack"]
+            via_stack_data = self.ViaPadStack[via_stack]
+            via_margin = self._resolve_parameter(via_stack_data["margin"])
+            for poly in polygons:
+                self._generate_via_stack_on_polygon(poly, via_stack, via_margin)
+
+    def _guard_ring_partial_cut(self, segment: dict, i: int) -> bool:
+        """
+        Whether octagon segment i of a guard ring segment definition is cut.
+        """
+        if not ("partialCut" in segment and segment["partialCut"]["use"]):
+            return False
+        partialCutSegment = self._resolve_parameter(segment["partialCut"]["segment"])
+        return (isinstance(partialCutSegment, (list, tuple)) and i in partialCutSegment) or (partialCutSegment == i)
+
+    def _guard_ring_mirrors(self, segment: dict) -> Dict[int, Tuple[int, str]]:
+        """
+        The octagon segments of a guard ring that can be mirrored from another one.
+
+        A segment is mirrored only if it is cut exactly when its source is;
+        the others are generated directly. Rings with other than 8 corners
+        are never mirrored.
+
+        Returns:
+            dict: A subset of OCTAGON_SEGMENT_MIRRORS.
+        """
+        if self.C != 8:
+            return {}
+        mirrors = {target: (source, axis) for target, (source, axis) in OCTAGON_SEGMENT_MIRRORS.items()
+                   if self._guard_ring_partial_cut(segment, target) == self._guard_ring_partial_cut(segment, source)}
+        if len(mirrors) < len(OCTAGON_SEGMENT_MIRRORS):
+            logging.debug("Guard ring partial cuts are asymmetric; mirroring segments %s only", sorted(mirrors))
+        return mirrors
 
     def _generate_dummy_fills(self, snap_to_grid: bool = True) -> None:
         """
@@ -743,57 +1329,133 @@ class Component:
         ref_apothem = (self.Parameters["apothem"] + self.N * self.T +
                        (self.N - 1) * self.S + guardRingDistance)
         dummy_fill = self.GuardRing["data"]["dummyFills"]
+        self.arm_index = SpatialIndex(self.arm_gds_items)
 
         if dummy_fill["type"].lower() == "checkered":
             group_spacing = self._resolve_parameter(dummy_fill["groupSpacing"])
-            group_items: List[Polygon] = []
-            group_items_grid_adjusted: List[Polygon] = []
-
-            for item_name, item in dummy_fill["items"].items():
-                if item["shape"].lower() == "rect":
-                    dx = self._resolve_parameter(item["offsetX"])
-                    dy = self._resolve_parameter(item["offsetY"])
-                    length = self._resolve_parameter(item["length"])
-                    height = self._resolve_parameter(item["height"])
-
-                    rect = Polygon([
-                        Point(dx - length / 2.0, dy - height / 2.0),
-                        Point(dx + length / 2.0, dy - height / 2.0),
-                        Point(dx + length / 2.0, dy + height / 2.0),
-                        Point(dx - length / 2.0, dy + height / 2.0),
-                    ])
-
-                    for layer in item["layers"]:
-                        r = rect.copy()
-                        self._set_polygon_layer(r, layer)
-                        group_items.append(r)
-
-                    length_grid_adjusted, _ = self.grid_adjusted_length(length, self.gridSizeDiagonal)
-                    height_grid_adjusted, _ = self.grid_adjusted_length(height, self.gridSizeDiagonal)
-
-                    rect_grid_adjusted = Polygon([
-                        Point(dx - length_grid_adjusted / 2.0, dy - height_grid_adjusted / 2.0),
-                        Point(dx + length_grid_adjusted / 2.0, dy - height_grid_adjusted / 2.0),
-                        Point(dx + length_grid_adjusted / 2.0, dy + height_grid_adjusted / 2.0),
-                        Point(dx - length_grid_adjusted / 2.0, dy + height_grid_adjusted / 2.0),
-                    ])
-
-                    for layer in item["layers"]:
-                        r = rect_grid_adjusted.copy()
-                        self._set_polygon_layer(r, layer)
-                        group_items_grid_adjusted.append(r)
+            group_items, group_items_grid_adjusted = self._dummy_fill_groups(dummy_fill)
 
             guard_ring_octagon = Octagon(ref_apothem)
+            placements: Dict[int, List[Tuple[Tuple[float, float], float, List[Polygon]]]] = {}
             # Fill each edge of the octagon with dummy polygons
             for i in range(8):
-                if i < 7:
-                    line = Line(guard_ring_octagon.vertices[i], guard_ring_octagon.vertices[i + 1])
-                else:
-                    line = Line(guard_ring_octagon.vertices[i], guard_ring_octagon.vertices[0])
-                if i % 2 == 0:
-                    self._fill_line_with_dummy_poly_group(group_items, line, group_spacing)
+                group = group_items if i % 2 == 0 else group_items_grid_adjusted
+                if self.symmetry and i >= 2:
+                    # Edge i is edge i % 2 turned by (i // 2) quarter turns. Fill groups
+                    # are not mirror-symmetric in general, so they are rotated, not mirrored.
+                    placements[i] = self._rotate_dummy_placements(placements[i % 2], i // 2)
                 else:
-                    self._fill_line_with_dummy_poly_group(group_items_grid_adjusted, line, group_spacing)
+                    if i < 7:
+                        line = Line(guard_ring_octagon.vertices[i], guard_ring_octagon.vertices[i + 1])
+                    else:
+                        line = Line(guard_ring_octagon.vertices[i], guard_ring_octagon.vertices[0])
+                    placements[i] = self._dummy_group_placements(group, line, group_spacing)
+                self._place_dummy_groups(group, placements[i], group_spacing)
+
+    def _dummy_fill_groups(self, dummy_fill: dict) -> Tuple[List[Polygon], List[Polygon]]:
+        """
+        Build the dummy fill group prototypes from the checkered dummyFills config.
+
+        Returns:
+            Tuple[list, list]: The group for the even (axis-parallel) octagon
+            edges and the group with sizes adjusted to the diagonal grid for the
+            odd edges.
+        """
+        group_items: List[Polygon] = []
+        group_items_grid_adjusted: List[Polygon] = []
+
+        for item_name, item in dummy_fill["items"].items():
+            if item["shape"].lower() == "rect":
+                dx = self._resolve_parameter(item["offsetX"])
+                dy = self._resolve_parameter(item["offsetY"])
+                length = self._resolve_parameter(item["length"])
+                height = self._resolve_parameter(item["height"])
+
+                rect = Polygon([
+                    Point(dx - length / 2.0, dy - height / 2.0),
+                    Point(dx + length / 2.0, dy - height / 2.0),
+                    Point(dx + length / 2.0, dy + height / 2.0),
+                    Point(dx - length / 2.0, dy + height / 2.0),
+                ])
+
+                for layer in item["layers"]:
+                    r = rect.copy()
+                    self._set_polygon_layer(r, layer)
+                    group_items.append(r)
+
+                length_grid_adjusted, _ = self.grid_adjusted_length(length, self.gridSizeDiagonal)
+                height_grid_adjusted, _ = self.grid_adjusted_length(height, self.gridSizeDiagonal)
+
+                rect_grid_adjusted = Polygon([
+                    Point(dx - length_grid_adjusted / 2.0, dy - height_grid_adjusted / 2.0),
+                    Point(dx + length_grid_adjusted / 2.0, dy - height_grid_adjusted / 2.0),
+                    Point(dx + length_grid_adjusted / 2.0, dy + height_grid_adjusted / 2.0),
+                    Point(dx - length_grid_adjusted / 2.0, dy + height_grid_adjusted / 2.0),
+                ])
+
+                for layer in item["layers"]:
+                    r = rect_grid_adjusted.copy()
+                    self._set_polygon_layer(r, layer)
+                    group_items_grid_adjusted.append(r)
+
+        return group_items, group_items_grid_adjusted
+
+    def _generate_dummy_fill_bands(self) -> None:
+        """
+        Generate the bands the dummy fills occupy instead of the fills themselves.
+
+        Every octagon edge gets one rectangle per fill layer, spanning the
+        groups _dummy_group_placements would place along it. The clearance to
+        the arms is not cut out. Used by level-of-detail previews, which draw
+        the bands as hatched regions.
+        """
+        if not self.GuardRing["config"].get("useGuardRing", False):
+            return
+
+        guardRingDistance = self._resolve_parameter(self.GuardRing["data"]["distance"])
+        ref_apothem = (self.Parameters["apothem"] + self.N * self.T +
+                       (self.N - 1) * self.S + guardRingDistance)
+        dummy_fill = self.GuardRing["data"]["dummyFills"]
+        if dummy_fill["type"].lower() != "checkered":
+            return
+
+        group_spacing = self._resolve_parameter(dummy_fill["groupSpacing"])
+        groups = self._dummy_fill_groups(dummy_fill)
+        guard_ring_octagon = Octagon(ref_apothem)
+        for i in range(8):
+            group = groups[i % 2]
+            if not group:
+                continue
+            line = Line(guard_ring_octagon.vertices[i], guard_ring_octagon.vertices[(i + 1) % 8])
+            bounding_box = Polygon.bounding_box_polygons(group)
+            no_of_groups = line.length() / (Line(bounding_box[0], bounding_box[1]).length() + group_spacing)
+            # Groups are placed at offsets -last..last intervals from the edge midpoint.
+            last = math.floor(no_of_groups / 2.0) - 1
+            if last < 0:
+                continue
+            interval = line.length() / no_of_groups
+            first_origin, rotation = Polygon.line_placement(line, -last * interval, 0)
+            last_origin, _ = Polygon.line_placement(line, last * interval, 0)
+
+            # Offset from the first to the last group in the unrotated group frame.
+            cos_a = math.cos(math.radians(rotation))
+            sin_a = math.sin(math.radians(rotation))
+            span_x = last_origin.x - first_origin.x
+            span_y = last_origin.y - first_origin.y
+            dx = span_x * cos_a + span_y * sin_a
+            dy = -span_x * sin_a + span_y * cos_a
+
+            by_layer: Dict[Tuple[int, int], List[Polygon]] = {}
+            for poly in group:
+                by_layer.setdefault((poly.gds_layer, poly.gds_datatype), []).append(poly)
+            for (gds_layer, gds_datatype), polygons in by_layer.items():
+                bottom_left, _, top_right, _ = Polygon.bounding_box_polygons(polygons)
+                min_x, min_y = bottom_left.x + min(dx, 0.0), bottom_left.y + min(dy, 0.0)
+                max_x, max_y = top_right.x + max(dx, 0.0), top_right.y + max(dy, 0.0)
+                band = Polygon([Point(min_x, min_y), Point(max_x, min_y), Point(max_x, max_y), Point(min_x, max_y)],
+                               gds_layer, gds_datatype)
+                Polygon.move_polygons_to_point_and_rotate([band], Point(0, 0), first_origin, rotation)
+                self._append_gds_item(self.dummy_fills_gds_items, band)
 
     def _fill_line_with_dummy_poly_group(self, dummy_poly_group: List[Polygon],
                                          line: Line, group_spacing: float, mid_spacing: float = 0) -> None:
@@ -806,53 +1468,102 @@ class Component:
             group_spacing (float): Spacing between groups.
             mid_spacing (float): Intra-group spacing.
         """
+        self._place_dummy_groups(dummy_poly_group,
+                                 self._dummy_group_placements(dummy_poly_group, line, group_spacing),
+                                 group_spacing)
+
+    def _dummy_group_placements(self, dummy_poly_group: List[Polygon], line: Line,
+                                group_spacing: float) -> List[Tuple[Tuple[float, float], float, List[Polygon]]]:
+        """
+        Place copies of a dummy polygon group at regular intervals along a line.
+
+        Returns:
+            list: (origin, rotation, placed polygons) of every group copy.
+        """
         bounding_box = Polygon.bounding_box_polygons(dummy_poly_group)
         group_length = Line(bounding_box[0], bounding_box[1]).length()
         line_length = line.length()
         no_of_groups = line_length / (group_length + group_spacing)
         interval = line_length / no_of_groups
 
+        placements = []
         for i in range(-math.floor(no_of_groups / 2.0) + 1, math.floor(no_of_groups / 2.0)):
             x_offset = i * interval
+            origin, rotation = Polygon.line_placement(line, x_offset, 0)
             dummy_poly_group_instance = Polygon.copy_polygons(dummy_poly_group)
-            Polygon.move_polygons_on_line(dummy_poly_group_instance, Point(0, 0), line, x_offset, 0)
-            for p in dummy_poly_group_instance:
-                if not self._polygon_is_near_or_intersecting(p, self.arm_gds_items, group_spacing):
-                    self._append_gds_item(self.dummy_fills_gds_items, p)
+            Polygon.move_polygons_to_point_and_rotate(dummy_poly_group_instance, Point(0, 0), origin, rotation)
+            placements.append(((origin.x, origin.y), rotation, dummy_poly_group_instance))
+        return placements
 
-    def _polygon_is_near_or_intersecting(self, polygon: Polygon, other_polygons: List[Polygon],
+    @staticmethod
+    def _rotate_dummy_placements(placements: List[Tuple[Tuple[float, float], float, List[Polygon]]],
+                                 turns: int) -> List[Tuple[Tuple[float, float], float, List[Polygon]]]:
+        """
+        Turn dummy group placements around the origin by quarter turns.
+
+        All placed polygons are rotated as one coordinate array; quarter turns
+        are exact, so the result matches generating the rotated edge directly
+        up to the rounding of the direct computation.
+        """
+        polygons = [poly for _, _, placed in placements for poly in placed]
+        if not polygons:
+            return []
+        coords = rotate_coords_quarter_turns(np.concatenate([poly.coords for poly in polygons]), turns)
+        rotated = iter(np.split(coords, np.cumsum([len(poly) for poly in polygons])[:-1]))
+
+        result = []
+        for origin, rotation, placed in placements:
+            origin = tuple(rotate_coords_quarter_turns(np.array([origin]), turns)[0].tolist())
+            result.append((origin, rotation + 90 * turns,
+                           [Polygon(next(rotated), poly.gds_layer, poly.gds_datatype, copy=False) for poly in placed]))
+        return result
+
+    def _place_dummy_groups(self, dummy_poly_group: List[Polygon],
+                            placements: List[Tuple[Tuple[float, float], float, List[Polygon]]],
+                            group_spacing: float) -> None:
+        """
+        Keep the placed dummy polygons that clear the arms and append them as group instances.
+        """
+        for origin, rotation, placed in placements:
+            kept = [p for p in placed
+                    if not self._polygon_is_near_or_intersecting(p, self.arm_index, group_spacing)]
+            if kept:
+                self._append_gds_item(self.dummy_fills_gds_items,
+                                      PolygonGroupInstance(dummy_poly_group, origin, rotation, kept))
+
+    def _polygon_is_near_or_intersecting(self, polygon: Polygon,
+                                           other_polygons: Union[SpatialIndex, List[Polygon]],
                                            distance_threshold: float = 0) -> bool:
         """
-        Check if a polygon is near or intersecting any polygon in a list.
+        Check if a polygon is near or intersecting any polygon on the same layer.
 
         Parameters:
             polygon (Polygon): The polygon to check.
-            other_polygons (list): The list of polygons to compare against.
+            other_polygons (SpatialIndex or list): The polygons to compare against.
+                Passing a prebuilt SpatialIndex avoids re-indexing on every call.
             distance_threshold (float): The distance for "nearness."
 
         Returns:
             bool: True if near or intersecting, False otherwise.
         """
-        for other_polygon in other_polygons:
-            if (polygon.gds_layer == other_polygon.gds_layer and
-                polygon.gds_datatype == other_polygon.gds_datatype and
-                    (polygon._is_near_edge(other_polygon, distance_threshold) or polygon.is_inside(other_polygon))):
-                return True
-        return False
+        if not isinstance(other_polygons, SpatialIndex):
+            other_polygons = SpatialIndex(other_polygons)
+        return other_polygons.is_near_or_intersecting(polygon, distance_threshold)
 
     def _generate_port_items(self, snap_to_grid: bool = True) -> None:
         """
         Generate port items for layout labeling.
         """
-        for p in self.port_info:
-            label_text = self.Ports[p["Port"]]["label"]
-            position = p["Point"]
-            gds_layer = self.Layers[p["Layer"]]["gds"]["layer"]
-            gds_datatype = self.Layers[p["Layer"]]["gds"]["datatype"]
+        for label_text, position, gds_layer, gds_datatype in self._port_labels():
+            if self.gds_writer is not None:
+                self.gds_writer.add_label(label_text, position, gds_layer, gds_datatype,
+                                          anchor='o', rotation=0, magnification=20)
+            if not self._fill_cell:
+                continue
             # Removed unsupported x_offset parameter.
             label = gdspy.Label(
                 label_text,
-                (position.x, position.y),
+                position,
                 anchor='o',
                 rotation=0,
                 magnification=20,
@@ -860,6 +1571,18 @@ class Component:
                 texttype=gds_datatype)
             self.cell.add(label)
 
+    def _port_labels(self) -> List[Tuple[str, Tuple[float, float], int, int]]:
+        """
+        Returns:
+            list: (text, (x, y), layer, texttype) of every port label.
+        """
+        labels = []
+        for p in self.port_info:
+            layer = self.Layers[p["Layer"]]["gds"]
+            labels.append((self.Ports[p["Port"]]["label"], (p["Point"].x, p["Point"].y),
+                           layer["layer"], layer["datatype"]))
+        return labels
+
     def _octagon_ring_segment_polygon(self, apothem: float, width: float, segment: int) -> Polygon:
         """
         Create a polygon for a segment of an octagonal ring.
@@ -920,42 +1643,51 @@ class Component:
         poly2 = Polygon([G2, G3, P2, P3])
         return [poly1, poly2]
 
-    def _ccw_bridge_jumps(self, segment: int) -> List[float]:
+    def _bridge_table(self, segment: int) -> Dict[str, List[float]]:
         """
-        Compute counter-clockwise bridge jumps for a given segment.
+        Bridge jumps and gap extensions of every ring of a segment.
+
+        The table is computed on first use and kept for the lifetime of the
+        component, since every ring of every generation stage reads it.
 
         Parameters:
             segment (int): Segment index.
 
         Returns:
-            list: List of bridge jumps per ring.
+            dict: {"ccw_jumps", "cw_jumps", "ccw_extensions", "cw_extensions"},
+            each a list with one entry per ring.
         """
-        ccw_bridge_jumps_array = []
-        group_data = self.Segments["data"]["S" + str(segment)]["group"]
-        for item in group_data:
-            if item["type"].lower() == "bridge":
-                ccw_bridge_jumps_array.append(item["data"]["jump"])
-            else:
-                ccw_bridge_jumps_array.append(0)
-        return ccw_bridge_jumps_array
+        table = self._bridge_tables.get(segment)
+        if table is None:
+            group_data = self.Segments["data"]["S" + str(segment)]["group"]
+            ccw_jumps = [item["data"]["jump"] if item["type"].lower() == "bridge" else 0 for item in group_data]
+
+            # The ring a CCW bridge lands on sees the same jump clockwise.
+            cw_jumps = [0] * len(ccw_jumps)
+            for i in range(len(ccw_jumps)):
+                target_index = i + ccw_jumps[i]
+                if target_index < len(cw_jumps):
+                    cw_jumps[target_index] = -ccw_jumps[i]
+
+            table = self._bridge_tables[segment] = {
+                "ccw_jumps": ccw_jumps,
+                "cw_jumps": cw_jumps,
+                "ccw_extensions": self._gap_extensions(ccw_jumps),
+                "cw_extensions": self._gap_extensions(cw_jumps),
+            }
+        return table
 
-    def _cw_bridge_jumps(self, segment: int) -> List[float]:
+    def _ccw_bridge_jumps(self, segment: int) -> List[float]:
         """
-        Compute clockwise bridge jumps based on counter-clockwise jumps.
-
-        Parameters:
-            segment (int): Segment index.
+        Counter-clockwise bridge jump of every ring of a segment (0 for non-bridge rings).
+        """
+        return self._bridge_table(segment)["ccw_jumps"]
 
-        Returns:
-            list: List of clockwise bridge jumps per ring.
+    def _cw_bridge_jumps(self, segment: int) -> List[float]:
         """
-        ccw_jumps = self._ccw_bridge_jumps(segment)
-        cw_jumps = [0] * len(ccw_jumps)
-        for i in range(len(ccw_jumps)):
-            target_index = i + ccw_jumps[i]
-            if target_index < len(cw_jumps):
-                cw_jumps[target_index] = -ccw_jumps[i]
-        return cw_jumps
+        Clockwise bridge jump of every ring of a segment, derived from the counter-clockwise jumps.
+        """
+        return self._bridge_table(segment)["cw_jumps"]
 
     def _get_gap_and_extension_info(self, segment_id: int, ring: int) -> Tuple[float, float, float, float]:
         """
@@ -964,23 +1696,22 @@ class Component:
         Returns:
             Tuple containing (ccw_gap, cw_gap, ccw_ext, cw_ext).
         """
+        table = self._bridge_table(segment_id)
+        ccw_gap = abs(table["ccw_jumps"][ring] * (self.T + self.S) / 2.0)
+        cw_gap = abs(table["cw_jumps"][ring] * (self.T + self.S) / 2.0)
         if self.Segments["config"].get("bridge_extension_aligned", 0) == 1:
-            max_jumps = max(abs(jump) for jump in self._ccw_bridge_jumps(segment_id))
+            max_jumps = max(abs(jump) for jump in table["ccw_jumps"])
             max_gap = max_jumps * (self.T + self.S)
-            ccw_gap = abs(self._ccw_bridge_jumps(segment_id)[ring] * (self.T + self.S) / 2.0)
-            cw_gap = abs(self._cw_bridge_jumps(segment_id)[ring] * (self.T + self.S) / 2.0)
             ccw_ext = (max_gap / 2.0 - ccw_gap)
             cw_ext = (max_gap / 2.0 - cw_gap)
         else:
-            ccw_gap = abs(self._ccw_bridge_jumps(segment_id)[ring] * (self.T + self.S) / 2.0)
-            cw_gap = abs(self._cw_bridge_jumps(segment_id)[ring] * (self.T + self.S) / 2.0)
-            ccw_ext = abs(self._determine_gaps_on_segment_group(segment_id, 0)[ring])
-            cw_ext = abs(self._determine_gaps_on_segment_group(segment_id, 1)[ring])
+            ccw_ext = abs(table["ccw_extensions"][ring])
+            cw_ext = abs(table["cw_extensions"][ring])
         return ccw_gap, cw_gap, ccw_ext, cw_ext
 
     def _determine_gaps_on_segment_group(self, segment: int, ccw_cw: int) -> List[float]:
         """
-        Calculate gap extensions for a segment group.
+        Gap extensions of a segment group.
 
         Parameters:
             segment (int): Segment index.
@@ -989,32 +1720,35 @@ class Component:
         Returns:
             list: Extensions for each ring.
         """
-        jump_array = self._ccw_bridge_jumps(segment) if ccw_cw == 0 else self._cw_bridge_jumps(segment)
-        absolute_jumps = list(map(abs, jump_array))
-        max_jump = max(absolute_jumps)
-        extensions = []
-        bb = [[0] * len(jump_array) for _ in range(len(jump_array))]
-
-        for idx_current in range(len(jump_array)):
-            for idx_other in range(len(jump_array)):
-                current_ext_unit = max_jump - absolute_jumps[idx_current]
-                other_ext_unit = max_jump - absolute_jumps[idx_other]
-                delta_idx = abs(idx_current - idx_other)
-                if current_ext_unit - other_ext_unit >= 0 and (idx_current != idx_other):
-                    ext = abs(current_ext_unit - other_ext_unit) - 2 * (delta_idx - 1)
-                    ext = ext if ext > 0 else 0
-                    if (idx_current - idx_other < 0 and jump_array[idx_other] < 0) or \
-                       (idx_current - idx_other > 0 and jump_array[idx_other] > 0):
-                        bb[idx_current][idx_other] = ext
-                    else:
-                        bb[idx_current][idx_other] = 0
-                else:
-                    bb[idx_current][idx_other] = 0
+        return self._bridge_table(segment)["ccw_extensions" if ccw_cw == 0 else "cw_extensions"]
+
+    def _gap_extensions(self, jump_array: List[float]) -> List[float]:
+        """
+        Calculate the gap extension of every ring from the bridge jumps of its segment.
+
+        Ring i is extended by the largest excess jump of another ring j whose
+        bridge points towards i, reduced by two units per ring between them.
+        All ring pairs are evaluated at once as an (N, N) array.
+
+        Parameters:
+            jump_array (list): Bridge jump per ring.
+
+        Returns:
+            list: Extensions for each ring.
+        """
+        jumps = np.asarray(jump_array)
+        ext_units = abs(jumps).max() - abs(jumps)
+        index = np.arange(len(jumps))
+
+        current = index[:, None]
+        other = index[None, :]
+        excess = ext_units[:, None] - ext_units[None, :]
+        ext = np.maximum(abs(excess) - 2 * (abs(current - other) - 1), 0)
+        points_towards = (((current < other) & (jumps[None, :] < 0)) |
+                          ((current > other) & (jumps[None, :] > 0)))
+        bb = np.where((excess >= 0) & (current != other) & points_towards, ext, 0)
 
-        for i in range(len(jump_array)):
-            extension_value = (max(bb[i][0:])) * (self.T + self.S) / 2.0
-            extensions.append(extension_value)
-        return extensions
+        return [extension_units * (self.T + self.S) / 2.0 for extension_units in bb.max(axis=1).tolist()]
 
     def _generate_via_stack_on_polygon(self, poly: Polygon, via_stack: str, margin: float = 0) -> None:
         """
@@ -1026,10 +1760,6 @@ class Component:
             margin (float): Margin required from the polygon edges.
         """
         via_stack_data = self.ViaPadStack[via_stack]
-        bounding_box = poly.bounding_box()
-        bounding_box_poly = Polygon(bounding_box)
-        length_bb = Line(bounding_box_poly.vertices[0], bounding_box_poly.vertices[1]).length()
-        height_bb = Line(bounding_box_poly.vertices[0], bounding_box_poly.vertices[3]).length()
 
         # Retrieve layer definitions for top and bottom vias.
         top_layer = via_stack_data["topLayer"]
@@ -1058,32 +1788,82 @@ class Component:
             via_s = self._resolve_parameter(via_data["spacing"])
             via_angle = self._resolve_parameter(via_data["angle"])
 
-            dx = via_l + via_s
-            dy = via_w + via_s
-            c_max = (length_bb - via_s) / (via_l + via_s)
-            r_max = (height_bb - via_s) / (via_w + via_s)
-
-            for r in range(-round(r_max / 2) + 1, round(r_max / 2)):
-                for c in range(-round(c_max / 2) + 1, round(c_max / 2)):
-                    x = poly.midpoint().x + dx * c
-                    y = poly.midpoint().y + dy * r
-                    via_midpoint = Point(x, y)
-                    via_poly = Polygon([
-                        Point(x - via_l / 2.0, y - via_w / 2.0),
-                        Point(x + via_l / 2.0, y - via_w / 2.0),
-                        Point(x + via_l / 2.0, y + via_w / 2.0),
-                        Point(x - via_l / 2.0, y + via_w / 2.0),
-                    ])
-                    via_poly.rotate_around(via_midpoint, via_angle)
-                    if (via_poly.is_inside(poly) and
-                            not via_poly._is_near_edge(poly, margin) and
-                            not via_poly._is_near_edge(poly, via_s)):
-                        self._set_polygon_layer(via_poly, via_layer)
-                        self._append_gds_item(self.via_gds_items, via_poly)
+            if self.preview_lod:
+                via_region = poly.copy()
+                self._set_polygon_layer(via_region, via_layer)
+                self._append_gds_item(self.via_region_items, via_region)
+                continue
+
+            # Vias must sit fully inside the polygon and keep both the stack
+            # margin and the via spacing from its edges.
+            via_array = ViaArray.fill(poly, via_l, via_w, via_s, via_angle, clearance=max(margin, via_s))
+            self._set_polygon_layer(via_array, via_layer)
+            self._append_gds_item(self.via_gds_items, via_array)
 
 # -------------------------------------------------------------------------
 # End of item generation methods.
 # -------------------------------------------------------------------------
+
+
+# Component options that change the written files, see output_key.
+OUTPUT_OPTIONS = ("hierarchical", "merge_layers", "integer_coordinates", "symmetry", "preview_lod", "rule_check")
+
+
+def generate_component(component_data: dict, output_path: Optional[str] = None,
+                       output_name: Optional[str] = None, generate_layout: bool = True,
+                       generate_svg: bool = True, output_cache: Optional[OutputCache] = None,
+                       **component_options: Any) -> Optional[Component]:
+    """
+    Generate a Component, or restore its files from an output cache.
+
+    The cache is looked up with the fully resolved parameters, so artworks that
+    only differ in how a value is written share an entry. The cell name is not
+    part of the key: sweep runs with the same geometry share an entry, and the
+    restored files are renamed to the requested cell. Profiled runs always
+    generate.
+
+    Parameters:
+        component_data (dict): The component data loaded from JSON.
+        output_path (str, optional): The output directory path.
+        output_name (str, optional): The output file name.
+        generate_layout (bool): Write the GDS file.
+        generate_svg (bool): Write the SVG file.
+        output_cache (OutputCache, optional): Cache of previously written files.
+        **component_options: Further Component keyword options.
+
+    Returns:
+        Component: The generated component, or None when the files were restored from the cache.
+    """
+    kinds = output_kinds(generate_layout, generate_svg, bool(component_options.get("thumbnail_size")),
+                         bool(component_options.get("rule_check")))
+    if output_cache is None or not kinds or component_options.get("profile"):
+        return Component(component_data, output_path, output_name, generate_layout, generate_svg,
+                         **component_options)
+
+    parameter_graph = component_options.pop("parameter_graph", None)
+    if parameter_graph is None:
+        parameter_graph = ParameterGraph(component_data["parameters"])
+    parameters = parameter_graph.evaluate()
+    out_path = output_path if output_path else parameters["outputDir"]
+    out_name = output_name if output_name else component_data["metadata"]["name"]
+
+    options: Dict[str, Any] = {option: bool(component_options.get(option)) for option in OUTPUT_OPTIONS}
+    if component_options.get("thumbnail_size"):
+        options["thumbnail"] = [component_options["thumbnail_size"], component_options.get("thumbnail_colors")]
+    key = output_key(component_data, parameters, options)
+    cell_name = component_data["metadata"]["name"]
+    restored = output_cache.fetch(key, kinds, out_path, out_name, cell_name)
+    if restored is not None:
+        logging.info("Restored %s from the output cache (%s)", out_name, key[:12])
+        return None
+
+    component = Component(component_data, out_path, out_name, generate_layout, generate_svg,
+                          parameter_graph=parameter_graph, **component_options)
+    written = {kind: os.path.join(out_path, out_name + OUTPUT_SUFFIXES[kind]) for kind in kinds}
+    output_cache.store(key, {kind: path for kind, path in written.items() if os.path.exists(path)}, cell_name)
+    return component
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Inductive Component GDS Generator")
     parser.add_argument("--artwork", "-a", required=True, help="JSON file path or JSON string")
@@ -1097,9 +1877,42 @@ if __name__ == "__main__":
         help="Set the logging level"
     )
     parser.add_argument("--verbose", "-v", action="store_true", help="Enable verbose (debug) output")
+    parser.add_argument("--stage-cache", help="Directory to persist generated layout stages in")
+    parser.add_argument("--stage-cache-size", type=float, default=DEFAULT_STAGE_CACHE_MB,
+                        help="Size cap of the stage cache directory in MB; least recently used stages are evicted")
+    parser.add_argument("--hierarchical", action="store_true",
+                        help="Write vias and dummy fills as cell references instead of flat polygons")
+    parser.add_argument("--merge", action="store_true",
+                        help="Union conductor polygons per layer before writing")
+    parser.add_argument("--profile", action="store_true",
+                        help="Write per-stage timing, geometry and memory statistics to <name>.profile.json")
+    parser.add_argument("--integer-coords", action="store_true",
+                        help="Snap geometry to the precision grid in integer database units")
+    parser.add_argument("--symmetry", action="store_true",
+                        help="Generate part of the guard ring and dummy fills and mirror or rotate the rest")
+    parser.add_argument("--stream-gds", action="store_true",
+                        help="Stream the GDS file while drawing instead of building gdspy polygons first")
+    parser.add_argument("--preview-lod", action="store_true",
+                        help="Write a fast level-of-detail SVG preview with vias and dummy fills as hatched regions "
+                             "(implies --svg; cannot be combined with --layout)")
+    parser.add_argument("--thumbnail", type=int, nargs="?", const=DEFAULT_THUMBNAIL_SIZE, default=0, metavar="PX",
+                        help=f"Also write a PNG thumbnail, PX pixels on its longer side (default {DEFAULT_THUMBNAIL_SIZE})")
+    parser.add_argument("--thumbnail-colors",
+                        help='Thumbnail colours as JSON, keyed by layer name or "layer/datatype", e.g. \'{"M9": "#ffcc00"}\'')
+    parser.add_argument("--rule-check", action="store_true",
+                        help="Check the layout against the rules of the layers block and write <name>.rules.json")
+    parser.add_argument("--output-cache",
+                        help="Directory of previously generated GDS/SVG files to reuse for unchanged artworks")
+    parser.add_argument("--output-cache-size", type=float, default=DEFAULT_OUTPUT_CACHE_MB,
+                        help="Size cap of the output cache in MB; least recently used files are evicted")
 
     # ✅ Now parse all arguments
     args = parser.parse_args()
+    if args.preview_lod:
+        if args.layout:
+            parser.error("--preview-lod writes an SVG preview only; it cannot be combined with --layout")
+        # The preview is an SVG, so the flag alone must not be a silent no-op.
+        args.svg = True
 
     # Set log level based on --log-level
     log_levels = {
@@ -1137,7 +1950,17 @@ if __name__ == "__main__":
         exit(1)
 
     try:
-        inductive_component = Component(artwork_json_input, args.output, args.name, args.layout, args.svg)
+        stage_cache = (StageCache(directory=args.stage_cache, max_bytes=int(args.stage_cache_size * 1024 ** 2))
+                       if args.stage_cache else None)
+        output_cache = (OutputCache(args.output_cache, int(args.output_cache_size * 1024 ** 2))
+                        if args.output_cache else None)
+        inductive_component = generate_component(
+            artwork_json_input, args.output, args.name, args.layout, args.svg, output_cache=output_cache,
+            stage_cache=stage_cache, hierarchical=args.hierarchical, merge_layers=args.merge,
+            profile=args.profile, integer_coordinates=args.integer_coords, symmetry=args.symmetry,
+            stream_gds=args.stream_gds, preview_lod=args.preview_lod, thumbnail_size=args.thumbnail,
+            thumbnail_colors=json.loads(args.thumbnail_colors) if args.thumbnail_colors else None,
+            rule_check=args.rule_check)
         logging.info("Successfully generated artwork.")
     except Exception as e:
         logging.error("An error occurred during generation: %s", e)
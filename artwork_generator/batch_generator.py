@@ -0,0 +1,213 @@
+"""
+In-process batch artwork generation.
+
+Sweeps used to start one ``artwork_generator.py`` subprocess per
+permutation, paying interpreter start-up, the gdspy import, JSON parsing and
+parameter resolution for every run. ArtworkTemplate parses and compiles an
+artwork once and generates any number of parameter permutations from the same
+warm process; generate_batch spreads those permutations over a process pool
+whose workers each hold their own warm template. Each template keeps a
+StageCache, so consecutive permutations only regenerate the stages whose
+inputs changed. An optional OutputCache skips permutations whose files were
+already generated, e.g. by an earlier run of the same sweep.
+"""
+
+import collections
+import copy
+import logging
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Deque, Dict, Iterable, Iterator, NamedTuple, Optional
+
+from artwork_generator import generate_component
+from output_cache import DEFAULT_MAX_BYTES, OutputCache
+from parameter_graph import ParameterError, ParameterGraph
+from rule_check import RULES_SUFFIX
+from stage_cache import DEFAULT_MAX_BYTES as DEFAULT_STAGE_CACHE_BYTES, StageCache
+
+
+class BatchJob(NamedTuple):
+    """One permutation to generate: swept parameter values plus where to write it."""
+    parameters: Dict[str, Any]
+    output_dir: str
+    output_name: str
+
+
+class ArtworkTemplate:
+    """
+    An artwork description parsed and compiled once for repeated generation.
+
+    Parameters:
+        artwork (dict): The artwork JSON shared by every permutation.
+        stage_cache (StageCache, optional): Cache of generation stage outputs.
+            Defaults to a new in-memory cache.
+        output_cache (OutputCache, optional): Cache of generated GDS/SVG files.
+            Permutations found in it are restored instead of generated.
+    """
+
+    def __init__(self, artwork: dict, stage_cache: Optional[StageCache] = None,
+                 output_cache: Optional[OutputCache] = None) -> None:
+        self.artwork = copy.deepcopy(artwork)
+        self.stage_cache = stage_cache if stage_cache is not None else StageCache()
+        self.output_cache = output_cache
+        self.artwork.setdefault("metadata", {})
+        try:
+            self.parameter_graph: Optional[ParameterGraph] = ParameterGraph(self.artwork["parameters"])
+        except ParameterError as e:
+            # Swept values may still repair the template; each run then compiles its own parameters.
+            logging.warning("Template parameters could not be compiled: %s", e)
+            self.parameter_graph = None
+
+    def component_data(self, parameters: Dict[str, Any], output_name: str) -> dict:
+        """
+        The artwork dictionary for one permutation, as a sweep run would write it.
+        """
+        data = dict(self.artwork)
+        data["parameters"] = {**self.artwork["parameters"], **parameters}
+        data["metadata"] = {**self.artwork["metadata"], "name": output_name}
+        return data
+
+    def generate(self, job: BatchJob, generate_layout: bool = True, generate_svg: bool = False,
+                 **component_options: Any) -> Dict[str, Any]:
+        """
+        Generate the layout of one permutation.
+
+        Parameters:
+            job (BatchJob): The permutation to generate.
+            generate_layout (bool): Write the GDS file.
+            generate_svg (bool): Write the SVG file.
+            **component_options: Further Component keyword options, e.g.
+                hierarchical or merge_layers.
+
+        Returns:
+            dict: {"name", "output_dir", "gds", "svg", "png", "rules", "ok", "cached", "error"},
+            where "gds", "svg", "png" (the thumbnail) and "rules" (the rule check
+            report) are the written file paths or None and
+            "cached" tells whether they were restored from the output cache.
+        """
+        result: Dict[str, Any] = {
+            "name": job.output_name,
+            "output_dir": job.output_dir,
+            "gds": None,
+            "svg": None,
+            "png": None,
+            "rules": None,
+            "ok": False,
+            "cached": False,
+            "error": None,
+        }
+        try:
+            component = generate_component(
+                self.component_data(job.parameters, job.output_name),
+                job.output_dir,
+                job.output_name,
+                generate_layout,
+                generate_svg,
+                output_cache=self.output_cache,
+                parameter_graph=(self.parameter_graph.with_overrides(job.parameters)
+                                 if self.parameter_graph is not None else None),
+                stage_cache=self.stage_cache,
+                **component_options,
+            )
+        except Exception as e:
+            logging.error("An error occurred during generation of %s: %s", job.output_name, e)
+            result["error"] = f"{type(e).__name__}: {e}"
+            return result
+
+        gds_path = os.path.join(job.output_dir, f"{job.output_name}.gds")
+        svg_path = os.path.join(job.output_dir, f"{job.output_name}.svg")
+        result["gds"] = gds_path if generate_layout and os.path.exists(gds_path) else None
+        result["svg"] = svg_path if generate_svg and os.path.exists(svg_path) else None
+        png_path = os.path.join(job.output_dir, f"{job.output_name}.png")
+        result["png"] = png_path if component_options.get("thumbnail_size") and os.path.exists(png_path) else None
+        rules_path = os.path.join(job.output_dir, f"{job.output_name}{RULES_SUFFIX}")
+        result["rules"] = rules_path if component_options.get("rule_check") and os.path.exists(rules_path) else None
+        result["ok"] = True
+        result["cached"] = component is None
+        return result
+
+
+# Permutations generate_batch keeps submitted per worker process.
+IN_FLIGHT_PER_WORKER = 2
+
+# Per-worker state for generate_batch process pools.
+_WORKER_TEMPLATE: Optional[ArtworkTemplate] = None
+_WORKER_OPTIONS: Dict[str, Any] = {}
+
+
+def _output_cache(directory: Optional[str], max_bytes: int) -> Optional[OutputCache]:
+    return OutputCache(directory, max_bytes) if directory else None
+
+
+def _init_worker(artwork: dict, options: Dict[str, Any], log_level: Optional[int],
+                 stage_cache_dir: Optional[str], stage_cache_bytes: int,
+                 output_cache_dir: Optional[str], output_cache_bytes: int) -> None:
+    global _WORKER_TEMPLATE, _WORKER_OPTIONS
+    if log_level is not None:
+        logging.getLogger().setLevel(log_level)
+    _WORKER_TEMPLATE = ArtworkTemplate(artwork, StageCache(directory=stage_cache_dir, max_bytes=stage_cache_bytes),
+                                       _output_cache(output_cache_dir, output_cache_bytes))
+    _WORKER_OPTIONS = options
+
+
+def _generate_in_worker(job: BatchJob) -> Dict[str, Any]:
+    return _WORKER_TEMPLATE.generate(job, **_WORKER_OPTIONS)
+
+
+def generate_batch(template: Any, permutations: Iterable[BatchJob], jobs: int = 1,
+                   generate_layout: bool = True, generate_svg: bool = False,
+                   log_level: Optional[int] = None, stage_cache_dir: Optional[str] = None,
+                   stage_cache_bytes: int = DEFAULT_STAGE_CACHE_BYTES,
+                   output_cache_dir: Optional[str] = None, output_cache_bytes: int = DEFAULT_MAX_BYTES,
+                   **component_options: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Generate many permutations of one artwork.
+
+    Parameters:
+        template (ArtworkTemplate or dict): The compiled template or the raw artwork JSON.
+        permutations (iterable of BatchJob): The permutations to generate.
+        jobs (int): Number of worker processes. 1 generates in the calling process.
+        generate_layout (bool): Write a GDS file per permutation.
+        generate_svg (bool): Write an SVG file per permutation.
+        log_level (int, optional): Root logging level for the generator. Applied
+            in every worker; left unchanged when None.
+        stage_cache_dir (str, optional): Directory to persist generation stages
+            in, shared by all workers. Only used when a raw artwork is passed
+            or jobs > 1; a given ArtworkTemplate keeps its own cache.
+        stage_cache_bytes (int): Size cap of that stage cache directory.
+        output_cache_dir (str, optional): Directory of an OutputCache shared by
+            all workers, used under the same conditions as stage_cache_dir.
+        output_cache_bytes (int): Size cap of that output cache.
+        **component_options: Further Component keyword options, e.g.
+            hierarchical or merge_layers.
+
+    Yields:
+        dict: One ArtworkTemplate.generate result per permutation, in input order.
+        permutations is consumed lazily, at most IN_FLIGHT_PER_WORKER * jobs ahead.
+    """
+    if not isinstance(template, ArtworkTemplate):
+        template = ArtworkTemplate(template, StageCache(directory=stage_cache_dir, max_bytes=stage_cache_bytes),
+                                   _output_cache(output_cache_dir, output_cache_bytes))
+
+    if jobs <= 1:
+        if log_level is not None:
+            logging.getLogger().setLevel(log_level)
+        for job in permutations:
+            yield template.generate(job, generate_layout, generate_svg, **component_options)
+        return
+
+    options = {"generate_layout": generate_layout, "generate_svg": generate_svg, **component_options}
+    with ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=_init_worker,
+            initargs=(template.artwork, options, log_level, stage_cache_dir, stage_cache_bytes,
+                      output_cache_dir, output_cache_bytes)) as pool:
+        # Unlike pool.map, keep only a few permutations per worker in flight, so
+        # permutations are drawn only as fast as the caller takes results.
+        in_flight: Deque[Future] = collections.deque()
+        for job in permutations:
+            in_flight.append(pool.submit(_generate_in_worker, job))
+            if len(in_flight) >= IN_FLIGHT_PER_WORKER * jobs:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
@@ -0,0 +1,272 @@
+"""
+Closed-form inductance and Q estimates of planar spiral coils.
+
+A sweep grid usually contains many points that are far outside the wanted
+inductance, and each of them costs an EM simulation. estimate works straight
+from the resolved parameters (apothem, rings, width, spacing, corners) with
+the expressions of Mohan et al., "Simple Accurate Expressions for Planar
+Spiral Inductances" (IEEE JSSC, 1999):
+
+- modified Wheeler: L = K1 mu0 n^2 d_avg / (1 + K2 rho)
+- current sheet: L = mu0 n^2 d_avg c1 / 2 (ln(c2 / rho) + c3 rho + c4 rho^2)
+
+with d_avg = (d_out + d_in) / 2 and the fill ratio rho = (d_out - d_in) /
+(d_out + d_in). Both are within a few percent of field solvers for
+conventional spirals, which is enough to rank sweep points and to drop the
+ones far outside a target window.
+
+Q is a rough series-resistance estimate, Q = 2 pi f L / R, where R is the
+resistance of the coil's centreline length. It needs the layer stack of the
+winding layer in the artwork's layers block, as in an EMX process file:
+
+    "M9": {"gds": {...}, "thickness": 3.4, "sheetResistance": 0.00545}
+
+with the thickness in um and the sheet resistance in ohm/square. Skin effect
+is taken into account, proximity effect and substrate loss are not.
+Transformers are estimated as one coil of all their rings.
+"""
+
+import math
+from collections import Counter
+from typing import Any, Dict, NamedTuple, Optional, Sequence
+
+from parameter_graph import ParameterGraph
+
+
+MU0 = 4e-7 * math.pi
+
+# Corners -> (K1, K2) of the modified Wheeler expression.
+WHEELER_COEFFICIENTS = {4: (2.34, 2.75), 6: (2.33, 3.82), 8: (2.25, 3.55)}
+# Corners -> (c1, c2, c3, c4) of the current sheet expression; 0 is a circle.
+CURRENT_SHEET_COEFFICIENTS = {
+    4: (1.27, 2.07, 0.18, 0.13),
+    6: (1.09, 2.23, 0.00, 0.17),
+    8: (1.07, 2.29, 0.00, 0.19),
+    0: (1.00, 2.46, 0.00, 0.20),
+}
+
+METHODS = ("wheeler", "currentSheet")
+
+# Frequency the Q estimate is given at unless a target says otherwise, in Hz.
+DEFAULT_FREQUENCY = 5e9
+
+
+class Estimate(NamedTuple):
+    """Closed-form estimate of one coil."""
+    inductance: float  # nH
+    resistance: Optional[float]  # ohm at frequency, None without a layer stack
+    q: Optional[float]
+    frequency: float  # Hz
+    d_out: float  # um, across flats
+    d_in: float  # um, across flats
+    length: float  # um, centreline length of all rings
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: None if value is None else round(value, 6) for name, value in self._asdict().items()}
+
+
+def wheeler_inductance(turns: float, d_out: float, d_in: float, corners: int) -> float:
+    """
+    Modified Wheeler inductance in H, diameters in m.
+
+    Corner counts without Wheeler coefficients use the current sheet expression.
+    """
+    if corners not in WHEELER_COEFFICIENTS:
+        return current_sheet_inductance(turns, d_out, d_in, corners)
+    k1, k2 = WHEELER_COEFFICIENTS[corners]
+    rho = (d_out - d_in) / (d_out + d_in)
+    return k1 * MU0 * turns ** 2 * (d_out + d_in) / 2 / (1 + k2 * rho)
+
+
+def current_sheet_inductance(turns: float, d_out: float, d_in: float, corners: int) -> float:
+    """
+    Current sheet inductance in H, diameters in m. Corner counts not in the table are treated as a circle.
+    """
+    c1, c2, c3, c4 = CURRENT_SHEET_COEFFICIENTS.get(corners, CURRENT_SHEET_COEFFICIENTS[0])
+    rho = (d_out - d_in) / (d_out + d_in)
+    return MU0 * turns ** 2 * (d_out + d_in) / 2 * c1 / 2 * (math.log(c2 / rho) + c3 * rho + c4 * rho ** 2)
+
+
+def series_resistance(length: float, width: float, layer: dict, frequency: float) -> Optional[float]:
+    """
+    Resistance in ohm of a trace of the given length and width in um.
+
+    Parameters:
+        length (float): Trace length in um.
+        width (float): Trace width in um.
+        layer (dict): The winding layer's entry of the layers block, with
+            "sheetResistance" in ohm/square and optionally "thickness" in um.
+        frequency (float): Frequency in Hz. With a thickness, the current is
+            confined to the skin depth at this frequency.
+
+    Returns:
+        float or None: The resistance, or None if the layer has no sheet resistance.
+    """
+    sheet_resistance = layer.get("sheetResistance")
+    if sheet_resistance is None:
+        return None
+    squares = length / width
+    thickness = layer.get("thickness")
+    if not thickness or frequency <= 0:
+        return sheet_resistance * squares
+    thickness *= 1e-6
+    resistivity = sheet_resistance * thickness
+    skin_depth = math.sqrt(resistivity / (math.pi * frequency * MU0))
+    # Effective conducting thickness of a strip carrying current on one side.
+    return resistivity / (skin_depth * (1 - math.exp(-thickness / skin_depth))) * squares
+
+
+def polygon_perimeter(apothem: float, corners: int) -> float:
+    """
+    Perimeter of a regular polygon with the given apothem; 0 corners is a circle.
+    """
+    if corners < 3:
+        return 2 * math.pi * apothem
+    return 2 * corners * apothem * math.tan(math.pi / corners)
+
+
+def estimate(parameters: Dict[str, Any], layers: Optional[dict] = None, layer: Optional[str] = None,
+             frequency: float = DEFAULT_FREQUENCY, method: str = "wheeler") -> Estimate:
+    """
+    Estimate inductance and Q from resolved artwork parameters.
+
+    Ring k (0 is innermost) spans the apothems apothem + k (width + spacing)
+    to that plus width, as the generator draws it.
+
+    Parameters:
+        parameters (dict): Resolved parameters with apothem, rings, width,
+            spacing and corners, e.g. Component.Parameters.
+        layers (dict, optional): The artwork's layers block.
+        layer (str, optional): Name of the winding layer in layers.
+        frequency (float): Frequency of the resistance and Q estimates in Hz.
+        method (str): "wheeler" or "currentSheet".
+
+    Raises:
+        ValueError: If method is unknown or the geometry is degenerate.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown estimation method {method!r}; use one of {', '.join(METHODS)}")
+    apothem = float(parameters["apothem"])
+    rings = int(parameters["rings"])
+    width = float(parameters["width"])
+    spacing = float(parameters["spacing"])
+    corners = int(parameters["corners"])
+    if rings < 1 or width <= 0 or apothem <= 0:
+        raise ValueError(f"Cannot estimate a coil with {rings} rings, width {width} and apothem {apothem}")
+
+    d_in = 2 * apothem
+    d_out = 2 * (apothem + rings * width + (rings - 1) * spacing)
+    expression = wheeler_inductance if method == "wheeler" else current_sheet_inductance
+    inductance = expression(rings, d_out * 1e-6, d_in * 1e-6, corners)
+
+    length = sum(polygon_perimeter(apothem + ring * (width + spacing) + width / 2, corners) for ring in range(rings))
+    layer_stack = (layers or {}).get(layer, {}) if layer else {}
+    resistance = series_resistance(length, width, layer_stack, frequency)
+    q = 2 * math.pi * frequency * inductance / resistance if resistance else None
+    return Estimate(inductance * 1e9, resistance, q, frequency, d_out, d_in, length)
+
+
+def winding_layer(artwork: dict) -> Optional[str]:
+    """
+    The layer most segment pieces of an artwork are drawn on.
+    """
+    counts = Counter(item.get("data", {}).get("layer")
+                     for segment in artwork.get("segments", {}).get("data", {}).values()
+                     for item in segment.get("group", []))
+    counts.pop(None, None)
+    return counts.most_common(1)[0][0] if counts else None
+
+
+class TargetWindow:
+    """
+    The "target" block of a sweep.json, used to prune and order sweep points:
+
+        "target": {
+            "inductance": [1.0, 1.5],
+            "q": [10, null],
+            "frequency": 5e9,
+            "method": "wheeler",
+            "margin": 0.1,
+            "order": "inductance"
+        }
+
+    inductance is in nH and q is unitless; either bound may be null. Points
+    whose estimate lies outside a bound by more than margin, a fraction of
+    the bound that covers the error of the estimate, are pruned. order is "inductance" (closest to the middle of the inductance
+    window first), "q" (highest Q first) or null to keep the sweep order.
+
+    Parameters:
+        target (dict): The target block.
+
+    Raises:
+        ValueError: If a field is invalid.
+    """
+
+    ORDERS = ("inductance", "q")
+
+    def __init__(self, target: dict) -> None:
+        self.inductance = self._bounds(target.get("inductance"), "inductance")
+        self.q = self._bounds(target.get("q"), "q")
+        self.frequency = float(target.get("frequency", DEFAULT_FREQUENCY))
+        self.method = target.get("method", "wheeler")
+        if self.method not in METHODS:
+            raise ValueError(f"Unknown target method {self.method!r}; use one of {', '.join(METHODS)}")
+        self.margin = float(target.get("margin", 0.0))
+        self.order = target.get("order", "inductance" if self.inductance != (None, None) else None)
+        if self.order is not None and self.order not in self.ORDERS:
+            raise ValueError(f"Unknown target order {self.order!r}; use one of {', '.join(self.ORDERS)} or null")
+
+    @staticmethod
+    def _bounds(value: Optional[Sequence[Optional[float]]], name: str) -> tuple:
+        if value is None:
+            return None, None
+        if not isinstance(value, (list, tuple)) or len(value) != 2:
+            raise ValueError(f"Target {name} must be [min, max], got {value!r}")
+        low, high = (None if bound is None else float(bound) for bound in value)
+        if low is not None and high is not None and low > high:
+            raise ValueError(f"Target {name} minimum {low} is above its maximum {high}")
+        return low, high
+
+    def _inside(self, value: Optional[float], bounds: tuple) -> bool:
+        low, high = bounds
+        if value is None:
+            return True
+        if low is not None and value < low * (1 - self.margin):
+            return False
+        return high is None or value <= high * (1 + self.margin)
+
+    def accepts(self, result: Estimate) -> bool:
+        """
+        Whether an estimate lies in the window. A Q bound is ignored when Q could not be estimated.
+        """
+        return self._inside(result.inductance, self.inductance) and self._inside(result.q, self.q)
+
+    def rank(self, result: Estimate) -> float:
+        """
+        Sort key of an accepted estimate; lower runs first.
+        """
+        if self.order == "q":
+            return -(result.q or 0.0)
+        if self.order == "inductance":
+            low, high = self.inductance
+            centre = (low + high) / 2 if low is not None and high is not None else low if low is not None else high
+            return abs(result.inductance - centre) if centre is not None else 0.0
+        return 0.0
+
+
+def estimate_artwork(artwork: dict, overrides: Optional[Dict[str, Any]] = None,
+                     frequency: float = DEFAULT_FREQUENCY, method: str = "wheeler",
+                     parameter_graph: Optional[ParameterGraph] = None) -> Estimate:
+    """
+    Estimate an artwork, e.g. one sweep permutation, without generating it.
+
+    Parameters:
+        artwork (dict): The artwork JSON.
+        overrides (dict, optional): Parameter values replacing the artwork's, e.g. swept values.
+        frequency (float): Frequency of the resistance and Q estimates in Hz.
+        method (str): "wheeler" or "currentSheet".
+        parameter_graph (ParameterGraph, optional): The artwork's compiled
+            parameters, to skip compiling them again for every permutation.
+    """
+    graph = parameter_graph if parameter_graph is not None else ParameterGraph(artwork["parameters"])
+    return estimate(graph.evaluate(overrides), artwork.get("layers"), winding_layer(artwork), frequency, method)
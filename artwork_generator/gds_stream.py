@@ -0,0 +1,306 @@
+"""
+Streaming GDSII writer.
+
+gdspy serializes a layout only after every shape became a gdspy.Polygon in a
+Cell. GdsStreamWriter instead writes BOUNDARY and TEXT records of the top
+structure straight from coordinate arrays to a buffered file while the
+layout is drawn. Runs of polygons with the same vertex count, such as via
+and dummy-fill squares, are encoded in one NumPy pass, and no per-shape
+Python object is kept, so memory stays flat for large fills.
+
+The records are laid out exactly as gdspy.GdsLibrary.write_gds lays them
+out (library header, top structure with its polygons, labels and then
+references, followed by the sub-cells), so for the same layout both files
+are identical apart from their timestamps.
+"""
+
+import datetime
+import os
+import struct
+from typing import Any, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+
+# GDSII record types.
+HEADER = 0x0002
+BGNLIB = 0x0102
+LIBNAME = 0x0206
+UNITS = 0x0305
+ENDLIB = 0x0400
+BGNSTR = 0x0502
+STRNAME = 0x0606
+ENDSTR = 0x0700
+BOUNDARY = 0x0800
+TEXT = 0x0C00
+LAYER = 0x0D02
+DATATYPE = 0x0E02
+XY = 0x1003
+ENDEL = 0x1100
+TEXTTYPE = 0x1602
+PRESENTATION = 0x1701
+STRING = 0x1906
+SNAME = 0x1206
+STRANS = 0x1A01
+MAG = 0x1B05
+ANGLE = 0x1C05
+
+# Timestamp records, which are the only bytes that differ between two writes of one layout.
+TIMESTAMP_RECORDS = (BGNLIB, BGNSTR)
+
+# Vertices per XY record allowed by the GDSII specification.
+MAX_XY_POINTS = 8190
+
+# Label anchor -> GDSII PRESENTATION value, as gdspy.Label maps them.
+LABEL_ANCHORS = {"nw": 0, "n": 1, "ne": 2, "w": 4, "o": 5, "e": 6, "sw": 8, "s": 9, "se": 10}
+
+
+def real8(value: float) -> bytes:
+    """
+    Encode a number in the GDSII 8-byte excess-64 real format.
+    """
+    if value == 0:
+        return b"\x00" * 8
+    sign = 0x00
+    if value < 0:
+        sign = 0x80
+        value = -value
+    fexp = np.log2(value) / 4
+    exponent = int(np.ceil(fexp))
+    if fexp == exponent:
+        exponent += 1
+    mantissa = int(value * 16.0 ** (14 - exponent))
+    byte1 = sign + exponent + 64
+    return struct.pack(">HHL", byte1 * 256 + mantissa // 281474976710656,
+                       (mantissa % 281474976710656) // 4294967296, mantissa % 4294967296)
+
+
+def _padded(text: str) -> bytes:
+    data = text.encode("ascii")
+    return data + b"\0" if len(data) % 2 else data
+
+
+def _timestamp(now: datetime.datetime) -> tuple:
+    stamp = (now.year, now.month, now.day, now.hour, now.minute, now.second)
+    return stamp + stamp
+
+
+def normalize_timestamps(data: bytes) -> bytes:
+    """
+    Zero the modification and access times of a GDSII stream, so two writes of one layout compare equal.
+    """
+    out = bytearray(data)
+    offset = 0
+    while offset + 4 <= len(out):
+        size, record = struct.unpack_from(">2H", out, offset)
+        if size < 4:
+            break
+        if record in TIMESTAMP_RECORDS:
+            out[offset + 4:offset + size] = bytes(size - 4)
+        offset += size
+    return bytes(out)
+
+
+def rename_cells(data: bytes, old_name: str, new_name: str) -> bytes:
+    """
+    Rename a cell, and the sub-cells named after it (old_name_...), in a GDSII stream.
+
+    The STRNAME records of the structures and the SNAME records of the
+    references to them are rewritten; every other record is copied as is.
+    """
+    old = old_name.encode("ascii")
+    new = new_name.encode("ascii")
+    out = bytearray()
+    offset = 0
+    while offset + 4 <= len(data):
+        size, record = struct.unpack_from(">2H", data, offset)
+        if size < 4:
+            break
+        name = data[offset + 4:offset + size].rstrip(b"\0") if record in (STRNAME, SNAME) else None
+        if name is not None and (name == old or name.startswith(old + b"_")):
+            name = new + name[len(old):]
+            if len(name) % 2:
+                name += b"\0"
+            out += struct.pack(">2H", 4 + len(name), record) + name
+        else:
+            out += data[offset:offset + size]
+        offset += size
+    out += data[offset:]
+    return bytes(out)
+
+
+class GdsStreamWriter:
+    """
+    Writes a single-top-cell GDSII library while the layout is being drawn.
+
+    Polygons go to the file as they are added. Labels and references are
+    few, and are kept until close() because GDSII readers such as gdspy
+    list them after the polygons of a structure. Sub-cells are ordinary
+    gdspy.Cell objects and are written after the top structure.
+
+    The file is written under a temporary name and moved into place by
+    close(), so an interrupted generation never leaves a truncated GDS file.
+
+    Parameters:
+        path (str): The GDS file to write.
+        cell_name (str): Name of the top structure.
+        unit (float): User unit in meters, as gdspy.GdsLibrary.unit.
+        precision (float): Database unit in meters, as gdspy.GdsLibrary.precision.
+        library_name (str): The LIBNAME record.
+        timestamp (datetime, optional): Modification time to record. Defaults to now.
+        buffer_size (int): Size of the file write buffer in bytes.
+
+    Attributes:
+        polygons (int): Polygons written so far.
+        vertices (int): Vertices written so far, without the closing vertex.
+        references (int): References added so far.
+    """
+
+    def __init__(self, path: str, cell_name: str, unit: float = 1e-6, precision: float = 1e-9,
+                 library_name: str = "library", timestamp: Optional[datetime.datetime] = None,
+                 buffer_size: int = 1 << 20) -> None:
+        self.path = path
+        self.cell_name = cell_name
+        self.unit = unit
+        self.precision = precision
+        self.multiplier = unit / precision
+        self.timestamp = timestamp
+        self.polygons = 0
+        self.vertices = 0
+        self.references = 0
+        self._labels: List[bytes] = []
+        self._references: List[Any] = []
+        self._tmp_path = f"{path}.tmp"
+        self._file = open(self._tmp_path, "wb", buffering=buffer_size)
+
+        now = timestamp if timestamp is not None else datetime.datetime.today()
+        name = _padded(library_name)
+        self._file.write(struct.pack(">5H12h2H", 6, HEADER, 0x0258, 28, BGNLIB, *_timestamp(now),
+                                     4 + len(name), LIBNAME) + name)
+        self._file.write(struct.pack(">2H", 20, UNITS) + real8(precision / unit) + real8(precision))
+        self._begin_structure(self._file, cell_name, now)
+
+    @staticmethod
+    def _begin_structure(outfile: Any, name: str, now: datetime.datetime) -> None:
+        name_bytes = _padded(name)
+        outfile.write(struct.pack(">2H12h2H", 28, BGNSTR, *_timestamp(now), 4 + len(name_bytes), STRNAME))
+        outfile.write(name_bytes)
+
+    def add_polygons(self, polygons: Sequence[np.ndarray], layers: Union[int, Sequence[int]],
+                     datatypes: Union[int, Sequence[int]]) -> None:
+        """
+        Write BOUNDARY elements for a list of (n, 2) coordinate arrays in user units.
+
+        Parameters:
+            polygons (sequence of ndarray): The polygon vertices, without the closing vertex.
+            layers (int or sequence of int): GDS layer of all or of each polygon.
+            datatypes (int or sequence of int): GDS datatype of all or of each polygon.
+        """
+        count = len(polygons)
+        if count == 0:
+            return
+        if isinstance(polygons, np.ndarray) and polygons.ndim == 3 and polygons.shape[1] <= MAX_XY_POINTS:
+            # A (count, n, 2) array, e.g. the corners of a via array, is a single run.
+            self._write_boundaries(polygons, np.broadcast_to(layers, (count,)),
+                                   np.broadcast_to(datatypes, (count,)), polygons.shape[1])
+            self.polygons += count
+            self.vertices += count * polygons.shape[1]
+            return
+        layers = np.broadcast_to(np.asarray(layers, dtype=np.int64), (count,))
+        datatypes = np.broadcast_to(np.asarray(datatypes, dtype=np.int64), (count,))
+        lengths = np.fromiter((len(points) for points in polygons), dtype=np.int64, count=count)
+
+        # Encode each run of equal vertex counts in one pass, keeping the polygon order.
+        run_starts = np.flatnonzero(np.diff(lengths, prepend=-1))
+        run_ends = np.append(run_starts[1:], count)
+        for start, end in zip(run_starts.tolist(), run_ends.tolist()):
+            n = int(lengths[start])
+            if n > MAX_XY_POINTS:
+                for index in range(start, end):
+                    self._write_large_boundary(polygons[index], int(layers[index]), int(datatypes[index]))
+            else:
+                self._write_boundaries(polygons[start:end], layers[start:end], datatypes[start:end], n)
+        self.polygons += count
+        self.vertices += int(lengths.sum())
+
+    def _write_boundaries(self, polygons: Sequence[np.ndarray], layers: np.ndarray, datatypes: np.ndarray,
+                          n: int) -> None:
+        records = np.empty(len(polygons), dtype=[
+            ("head", ">i2", (8,)), ("xy_head", ">i2", (2,)), ("xy", ">i4", (n + 1, 2)), ("end", ">i2", (2,))])
+        records["head"] = (4, BOUNDARY, 6, LAYER, 0, 6, DATATYPE, 0)
+        records["head"][:, 4] = layers
+        records["head"][:, 7] = datatypes
+        records["xy_head"] = (12 + 8 * n, XY)
+        coords = polygons if isinstance(polygons, np.ndarray) else np.stack(polygons)
+        xy = np.round(coords * self.multiplier)
+        records["xy"][:, :n] = xy
+        records["xy"][:, n] = xy[:, 0]
+        records["end"] = (4, ENDEL)
+        self._file.write(records.tobytes())
+
+    def _write_large_boundary(self, points: np.ndarray, layer: int, datatype: int) -> None:
+        # Split the vertices over several XY records, as gdspy does beyond the specification limit.
+        self._file.write(struct.pack(">4Hh2Hh", 4, BOUNDARY, 6, LAYER, layer, 6, DATATYPE, datatype))
+        xy = np.empty((len(points) + 1, 2), dtype=">i4")
+        xy[:-1] = np.round(points * self.multiplier)
+        xy[-1] = xy[0]
+        for i0 in range(0, len(xy), MAX_XY_POINTS):
+            chunk = xy[i0:i0 + MAX_XY_POINTS]
+            self._file.write(struct.pack(">2H", 4 + 8 * len(chunk), XY))
+            self._file.write(chunk.tobytes())
+        self._file.write(struct.pack(">2H", 4, ENDEL))
+
+    def add_label(self, text: str, position: Iterable[float], layer: int, texttype: int, anchor: str = "o",
+                  rotation: Optional[float] = None, magnification: Optional[float] = None) -> None:
+        """
+        Add a TEXT element, with the same options as gdspy.Label.
+        """
+        record = struct.pack(">4Hh2Hh2Hh", 4, TEXT, 6, LAYER, layer, 6, TEXTTYPE, texttype,
+                             6, PRESENTATION, LABEL_ANCHORS[anchor])
+        if rotation is not None or magnification is not None:
+            values = b""
+            if magnification is not None:
+                values += struct.pack(">2H", 12, MAG) + real8(magnification)
+            if rotation is not None:
+                values += struct.pack(">2H", 12, ANGLE) + real8(rotation)
+            record += struct.pack(">3H", 6, STRANS, 0) + values
+        x, y = position
+        text_bytes = _padded(text)
+        record += struct.pack(">2H2l2H", 12, XY, int(round(x * self.multiplier)), int(round(y * self.multiplier)),
+                              4 + len(text_bytes), STRING)
+        record += text_bytes + struct.pack(">2H", 4, ENDEL)
+        self._labels.append(record)
+
+    def add_reference(self, reference: Any) -> None:
+        """
+        Add a gdspy.CellReference or gdspy.CellArray to the top structure.
+        """
+        self._references.append(reference)
+        self.references += 1
+
+    def close(self, subcells: Iterable[Any] = ()) -> None:
+        """
+        End the top structure, write the sub-cells and move the file into place.
+
+        Parameters:
+            subcells (iterable of gdspy.Cell): Cells referenced from the top structure.
+        """
+        outfile = self._file
+        for label in self._labels:
+            outfile.write(label)
+        for reference in self._references:
+            reference.to_gds(outfile, self.multiplier)
+        outfile.write(struct.pack(">2H", 4, ENDSTR))
+        for cell in subcells:
+            cell.to_gds(outfile, self.multiplier, timestamp=self.timestamp)
+        outfile.write(struct.pack(">2H", 4, ENDLIB))
+        outfile.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self) -> None:
+        """
+        Close and remove the partial file.
+        """
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
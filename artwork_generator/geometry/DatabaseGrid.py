@@ -0,0 +1,99 @@
+import numpy as np
+
+
+class DatabaseGrid:
+    """
+    Integer coordinate system of a layout: multiples of a grid in GDS database units.
+
+    Coordinates are rounded once to int64 grid indices and scaled to database
+    units, so on-grid values are exact integers and never pass through decimal
+    rounding. The float (user unit) image of a database-unit array is only
+    formed where a float consumer such as gdspy needs it, and converts back
+    to the same integers.
+
+    Attributes:
+        grid_size (float): The grid in user units (µm), e.g. the "precision" parameter.
+        database_unit (float): User units per database unit, gdspy's precision / unit.
+        step (int): The grid in database units.
+    """
+
+    def __init__(self, grid_size, database_unit=1e-3):
+        """
+        Args:
+            grid_size (float): The grid in user units.
+            database_unit (float, optional): User units per database unit. Defaults to 1 nm in µm.
+
+        Raises:
+            ValueError: If the grid is not a positive whole number of database units.
+        """
+        self.grid_size = grid_size
+        self.database_unit = database_unit
+        self.step = self._database_steps(grid_size)
+
+    def __repr__(self):
+        return f"DatabaseGrid({self.grid_size}, step={self.step})"
+
+    def _database_steps(self, size):
+        steps = round(size / self.database_unit)
+        if steps <= 0 or abs(size / self.database_unit - steps) > 1e-6:
+            raise ValueError(f"The grid {size} is not a whole number of database units ({self.database_unit})")
+        return int(steps)
+
+    def to_units(self, coords):
+        """
+        Snap user-unit coordinates to the grid.
+
+        Args:
+            coords (ndarray): Coordinates of any shape, in user units.
+
+        Returns:
+            ndarray: int64 coordinates in database units, all multiples of the grid step.
+        """
+        units = np.rint(np.asarray(coords, dtype=np.float64) / self.grid_size).astype(np.int64)
+        units *= self.step
+        return units
+
+    def to_user(self, units):
+        """
+        Convert database-unit coordinates back to user units.
+        """
+        return units * self.database_unit
+
+    def snap(self, coords):
+        """
+        Snap user-unit coordinates to the grid and return them in user units.
+        """
+        return self.to_user(self.to_units(coords))
+
+    def snap_point(self, x, y):
+        snapped = self.snap(np.array([x, y], dtype=np.float64))
+        return float(snapped[0]), float(snapped[1])
+
+    def is_on_grid(self, value):
+        """
+        Whether a user-unit length is a whole number of grid steps.
+        """
+        steps = value / self.grid_size
+        return abs(steps - round(steps)) < 1e-6
+
+    def snap_polygons(self, polygons):
+        """
+        Snap many polygons in one vectorized pass.
+
+        The vertices of all polygons are rounded together and written back in
+        user units, which convert back to the same database units exactly.
+
+        Args:
+            polygons (list): Polygons to snap in place.
+
+        Returns:
+            list: The int64 database-unit coordinate array of every polygon, in order.
+        """
+        if not polygons:
+            return []
+        units = self.to_units(np.concatenate([polygon.coords for polygon in polygons]))
+        splits = np.cumsum([len(polygon.coords) for polygon in polygons])[:-1]
+        polygon_units = np.split(units, splits)
+        for polygon, unit_coords in zip(polygons, polygon_units):
+            polygon.coords = self.to_user(unit_coords)
+        return polygon_units
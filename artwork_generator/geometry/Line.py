@@ -1,6 +1,69 @@
 import math
 import numpy as np
-from .Point import Point
+from .Point import Point, grid_decimals
+
+
+def staircase_steps(starts, ends, pixel_size):
+    """
+    Snapped step points of the staircase approximations of many edges at once.
+
+    Edge i is cut into n_i = max(ceil(max(|dx|, |dy|) / pixel_size), 1) equal
+    steps; the end point of every step is snapped to the grid. The start
+    points themselves are not included.
+
+    Args:
+        starts (ndarray): (E, 2) edge start points.
+        ends (ndarray): (E, 2) edge end points.
+        pixel_size (float): The grid of the staircase.
+
+    Returns:
+        ndarray: (sum(n_i), 2) int64 step points in grid units, edge by edge.
+    """
+    deltas = ends - starts
+    counts = np.maximum(np.ceil(np.abs(deltas).max(axis=1) / pixel_size).astype(np.int64), 1)
+    edge = np.repeat(np.arange(len(starts)), counts)
+    # Step number within its edge, 1..n_i.
+    step = np.arange(1, counts.sum() + 1) - np.repeat(np.cumsum(counts) - counts, counts)
+    points = starts[edge] + deltas[edge] * (step / counts[edge])[:, None]
+    return np.rint(points / pixel_size).astype(np.int64)
+
+
+def remove_collinear(points, closed=True):
+    """
+    Drop repeated points and the interior points of straight runs.
+
+    Args:
+        points (ndarray): (N, 2) vertices. With integral values (grid units) the test is exact.
+        closed (bool): Treat the points as a closed ring; otherwise the two
+            end points are always kept.
+
+    Returns:
+        ndarray: The remaining vertices, in order.
+    """
+    if len(points) < 3:
+        return points
+    if closed:
+        keep = (points != np.roll(points, 1, axis=0)).any(axis=1)
+        if not keep.any():
+            return points[:1]
+        points = points[keep]
+        before = np.roll(points, 1, axis=0)
+        after = np.roll(points, -1, axis=0)
+    else:
+        keep = np.ones(len(points), dtype=bool)
+        keep[1:] = (points[1:] != points[:-1]).any(axis=1)
+        points = points[keep]
+        if len(points) < 3:
+            return points
+        before = np.concatenate((points[:1], points[:-1]))
+        after = np.concatenate((points[1:], points[-1:]))
+
+    incoming = points - before
+    outgoing = after - points
+    corner = incoming[:, 0] * outgoing[:, 1] != incoming[:, 1] * outgoing[:, 0]
+    if not closed:
+        corner[0] = corner[-1] = True
+    return points[corner]
 
 class Line:
     def __init__(self, point1, point2):
@@ -60,44 +123,31 @@ class Line:
 
 
     def generate_staircase_line(self, pixel_size):
-        dx = self.point2.x - self.point1.x
-        dy = self.point2.y - self.point1.y
-        magnitude = max(abs(dx), abs(dy))
-        num_pixels = max(int(np.ceil(magnitude / pixel_size)), 1)
-
-        # Calculate the increments for x and y directions
-        x_increment = dx / num_pixels
-        y_increment = dy / num_pixels
-
-        # Determine the number of decimal places based on pixel_size
-        decimal_places = max(len(str(pixel_size).split('.')[-1]), 0)
-
-        # Generate the staircase line
-        staircase_line = []
-        x, y = self.point1.x, self.point1.y
-        staircase_line.append(Point(x, y))
-        for _ in range(num_pixels):
-            x += x_increment
-            y += y_increment
-            snapped_x = round(x / pixel_size) * pixel_size
-            snapped_y = round(y / pixel_size) * pixel_size
-            snapped_x = round(snapped_x, decimal_places)
-            snapped_y = round(snapped_y, decimal_places)
-            point = Point(snapped_x, snapped_y)
-
-            # Check if the new point is collinear with the last two points
-            if len(staircase_line) >= 2:
-                last_point = staircase_line[-1]
-                second_last_point = staircase_line[-2]
-                if self.is_collinear(second_last_point, last_point, point):
-                    # Replace the last point with the new point
-                    staircase_line[-1] = point
-                else:
-                    staircase_line.append(point)
-            else:
-                staircase_line.append(point)
-
-        return staircase_line
+        """
+        Approximate the line by a staircase on a grid of pixel_size.
+
+        The line is cut into max(|dx|, |dy|) / pixel_size equal steps whose
+        end points are snapped to the grid; collinear runs are merged so only
+        the corners of the staircase remain.
+
+        Args:
+            pixel_size (float): The grid of the staircase.
+
+        Returns:
+            list: Points from point1 (not snapped) to the snapped point2.
+        """
+        start = np.array([[self.point1.x, self.point1.y]], dtype=np.float64)
+        end = np.array([[self.point2.x, self.point2.y]], dtype=np.float64)
+        steps = staircase_steps(start, end, pixel_size)
+
+        # Work in grid units: snapped points are integral, so the collinearity test is exact.
+        units = np.concatenate((start / pixel_size, steps.astype(np.float64)))
+        units = remove_collinear(units, closed=False)
+
+        coords = units * pixel_size
+        coords[1:] = np.round(coords[1:], grid_decimals(pixel_size))
+        coords[0] = start[0]
+        return [Point(x, y) for x, y in coords.tolist()]
 
     @staticmethod
     def is_collinear(p1, p2, p3):
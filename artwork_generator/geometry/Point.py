@@ -1,4 +1,15 @@
 import math
+from decimal import Decimal
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def grid_decimals(grid_size):
+    """
+    Number of decimal places needed to represent a multiple of grid_size.
+    """
+    return max(0, -Decimal(str(grid_size)).normalize().as_tuple().exponent)
+
 
 class Point:
     """
@@ -146,7 +157,7 @@ class Point:
         self.x = round(self.x / grid_size) * grid_size
         self.y = round(self.y / grid_size) * grid_size
 
-        decimal_points = len(str(grid_size).split('.')[1])
+        decimal_points = grid_decimals(grid_size)
 
         self.x = round(self.x, decimal_points)
         self.y = round(self.y, decimal_points)
@@ -1,14 +1,154 @@
-import copy
 import math
+
 import gdspy
-from .Point import Point
-from .Line import Line
+import numpy as np
+
+from .Point import Point, grid_decimals
+from .Line import remove_collinear, staircase_steps
+
+
+def _as_coords(vertices, copy=True):
+	"""
+	Convert a vertex sequence (Points, (x, y) pairs or an (N, 2) array) into a
+	float64 coordinate array of shape (N, 2).
+	"""
+	if isinstance(vertices, np.ndarray):
+		coords = np.array(vertices, dtype=np.float64) if copy else np.asarray(vertices, dtype=np.float64)
+	elif len(vertices) and isinstance(vertices[0], Point):
+		coords = np.array([(vertex.x, vertex.y) for vertex in vertices], dtype=np.float64)
+	else:
+		coords = np.array(vertices, dtype=np.float64)
+	return coords.reshape(-1, 2)
+
+
+def snap_coords_to_grid(coords, grid_size):
+	"""
+	Snap an (N, 2) coordinate array in place to the nearest multiple of grid_size.
+	"""
+	np.round(coords / grid_size, out=coords)
+	coords *= grid_size
+	np.round(coords, grid_decimals(grid_size), out=coords)
+	return coords
+
+
+def point_edge_distances(points, starts, ends):
+	"""
+	Distance from every point to every edge.
+
+	Args:
+		points (ndarray): (P, 2) query points.
+		starts (ndarray): (E, 2) edge start points.
+		ends (ndarray): (E, 2) edge end points.
+
+	Returns:
+		ndarray: (P, E) matrix of point-to-segment distances.
+	"""
+	edge_vectors = ends - starts
+	point_vectors = points[:, None, :] - starts[None, :, :]
+	dot_products = (point_vectors * edge_vectors[None, :, :]).sum(axis=2)
+	edge_lengths_squared = (edge_vectors ** 2).sum(axis=1)[None, :]
+
+	to_start = np.sqrt((point_vectors ** 2).sum(axis=2))
+	to_end = np.sqrt(((points[:, None, :] - ends[None, :, :]) ** 2).sum(axis=2))
+
+	# Degenerate edges always take the to_start branch; keep their projection finite.
+	projection = dot_products / np.where(edge_lengths_squared == 0, 1.0, edge_lengths_squared)
+	projected = edge_vectors[None, :, :] * projection[:, :, None]
+	perpendicular = np.sqrt(((point_vectors - projected) ** 2).sum(axis=2))
+
+	return np.where(dot_products <= 0, to_start,
+	                np.where(dot_products >= edge_lengths_squared, to_end, perpendicular))
+
+
+def points_in_polygon(points, coords):
+	"""
+	Even-odd ray casting test of many points against one polygon.
+
+	Args:
+		points (ndarray): (P, 2) query points.
+		coords (ndarray): (N, 2) polygon vertices.
+
+	Returns:
+		ndarray: (P,) boolean array, True where the point lies inside.
+	"""
+	p1x = coords[:, 0:1]
+	p1y = coords[:, 1:2]
+	p2x = np.concatenate((p1x[1:], p1x[:1]))
+	p2y = np.concatenate((p1y[1:], p1y[:1]))
+	x = points[:, 0]
+	y = points[:, 1]
+
+	# Horizontal edges never toggle; give them a unit denominator to keep the division finite.
+	horizontal = p1y == p2y
+	xinters = (y - p1y) * (p2x - p1x) / np.where(horizontal, 1.0, p2y - p1y) + p1x
+	crossing = ((y > np.minimum(p1y, p2y)) &
+	            (y <= np.maximum(p1y, p2y)) &
+	            (x <= np.maximum(p1x, p2x)) &
+	            ~horizontal &
+	            ((p1x == p2x) | (x <= xinters)))
+	return np.count_nonzero(crossing, axis=0) % 2 == 1
+
+
+def mirror_coords(coords, axis):
+	"""
+	Mirror an (N, 2) coordinate array across the "NS" (x -> -x) or "WE" (y -> -y) axis.
+
+	Returns:
+		ndarray: A new array.
+	"""
+	if axis == "NS":
+		return coords * np.array([-1.0, 1.0])
+	if axis == "WE":
+		return coords * np.array([1.0, -1.0])
+	raise ValueError(f"Unknown mirror axis {axis!r}; use 'NS' or 'WE'")
+
+
+def rotate_coords_quarter_turns(coords, turns):
+	"""
+	Rotate an (N, 2) coordinate array around the origin by turns * 90 degrees.
+
+	Quarter turns only swap and negate coordinates, so unlike a rotation by
+	an angle they introduce no rounding error.
+
+	Returns:
+		ndarray: A new array.
+	"""
+	turns %= 4
+	x = coords[:, 0]
+	y = coords[:, 1]
+	if turns == 0:
+		return coords.copy()
+	if turns == 1:
+		return np.stack((-y, x), axis=1)
+	if turns == 2:
+		return -coords
+	return np.stack((y, -x), axis=1)
+
 
 class Polygon:
-	def __init__(self, vertices):
-		self.vertices = vertices
-		self.gds_layer = None
-		self.gds_datatype = None
+	"""
+	Polygon stored as an (N, 2) float64 coordinate array plus GDS layer and datatype.
+
+	Transforms operate on the whole array at once and modify the polygon in place.
+	The ``vertices`` property still exposes the vertices as Point objects for code
+	that works point by point.
+	"""
+
+	def __init__(self, vertices, gds_layer=None, gds_datatype=None, copy=True):
+		self.coords = _as_coords(vertices, copy=copy)
+		self.gds_layer = gds_layer
+		self.gds_datatype = gds_datatype
+
+	@property
+	def vertices(self):
+		return [Point(x, y) for x, y in self.coords.tolist()]
+
+	@vertices.setter
+	def vertices(self, vertices):
+		self.coords = _as_coords(vertices)
+
+	def __len__(self):
+		return len(self.coords)
 
 	def __str__(self):
 		vertex_strings = [str(vertex) for vertex in self.vertices]
@@ -19,153 +159,123 @@ class Polygon:
 
 	def __eq__(self, other):
 		if isinstance(other, Polygon):
-			return self.vertices == other.vertices
+			return np.array_equal(self.coords, other.coords)
 		return False
 
 	def snap_to_grid(self, grid_size):
-		for vertex in self.vertices:
-			vertex.snap_to_grid(grid_size)
-
+		snap_coords_to_grid(self.coords, grid_size)
 
 	def perimeter(self):
-		perimeter = 0.0
-		num_points = len(self.vertices)
-		for i in range(num_points):
-			current_point = self.vertices[i]
-			next_point = self.vertices[(i + 1) % num_points]
-			dx = next_point.x - current_point.x
-			dy = next_point.y - current_point.y
-			perimeter += (dx ** 2 + dy ** 2) ** 0.5
-		return perimeter
+		deltas = np.roll(self.coords, -1, axis=0) - self.coords
+		return float(np.sqrt((deltas ** 2).sum(axis=1)).sum())
 
 	def area(self):
-		area = 0.0
-		num_points = len(self.vertices)
-		for i in range(num_points):
-			current_point = self.vertices[i]
-			next_point = self.vertices[(i + 1) % num_points]
-			area += (current_point.x * next_point.y - current_point.y * next_point.x)
-		return abs(area) / 2.0
+		x = self.coords[:, 0]
+		y = self.coords[:, 1]
+		return abs(float((x * np.roll(y, -1) - y * np.roll(x, -1)).sum())) / 2.0
 
 	def scale(self, factor):
-		centroid = self.midpoint()
-
-		for vertex in self.vertices:
-			# Calculate the vector from the centroid to the vertex
-			vector = Point(vertex.x - centroid.x, vertex.y - centroid.y)
-
-			# Scale the vector
-			scaled_vector = Point(vector.x * factor, vector.y * factor)
-
-			# Update the vertex coordinates by adding the scaled vector to the centroid
-			vertex.x = centroid.x + scaled_vector.x
-			vertex.y = centroid.y + scaled_vector.y
+		centroid = self.coords.sum(axis=0) / len(self.coords)
+		self.coords = centroid + (self.coords - centroid) * factor
 
 	def translate(self, dx, dy):
-		for point in self.vertices:
-			point.translate(dx, dy)
+		self.coords[:, 0] += dx
+		self.coords[:, 1] += dy
 
 	def rotate_around(self, center, angle_deg):
-		for point in self.vertices:
-			point.rotate_around(center,angle_deg)
+		if not isinstance(center, Point):
+			raise TypeError("Center parameter must be of type Point")
+		angle_rad = math.radians(angle_deg)
+		cos_a = math.cos(angle_rad)
+		sin_a = math.sin(angle_rad)
+		translated_x = self.coords[:, 0] - center.x
+		translated_y = self.coords[:, 1] - center.y
+		self.coords[:, 0] = translated_x * cos_a - translated_y * sin_a + center.x
+		self.coords[:, 1] = translated_x * sin_a + translated_y * cos_a + center.y
+
+	def mirror(self, axis):
+		"""
+		Mirror the polygon in place across an axis through the origin.
+
+		Mirroring only negates coordinates, so it is exact. The vertex order is
+		reversed to keep the orientation of the outline.
+
+		Args:
+			axis (str): "NS" mirrors across the north-south axis (x -> -x), "WE"
+				across the west-east axis (y -> -y), as in Octagon.cardinal_symmetry.
+		"""
+		self.coords = mirror_coords(self.coords, axis)[::-1].copy()
+
+	def rotate_quarter_turns(self, turns):
+		"""
+		Rotate the polygon in place around the origin by turns * 90 degrees, exactly.
+		"""
+		self.coords = rotate_coords_quarter_turns(self.coords, turns)
 
 	def midpoint(self):
-		total_x = 0.0
-		total_y = 0.0
-		num_points = len(self.vertices)
-		for point in self.vertices:
-			total_x += point.x
-			total_y += point.y
-		midpoint_x = total_x / num_points
-		midpoint_y = total_y / num_points
-		return Point(midpoint_x, midpoint_y)
-
-	def intersects(self, other_polygon):
-		for i in range(len(self.vertices)):
-			current_point = self.vertices[i]
-			next_point = self.vertices[(i + 1) % len(self.vertices)]
-			for j in range(len(other_polygon.vertices)):
-				other_current_point = other_polygon.vertices[j]
-				other_next_point = other_polygon.vertices[(j + 1) % len(other_polygon.vertices)]
-				if self._do_lines_intersect(current_point, next_point, other_current_point, other_next_point):
-					return True
-		return False
-
-	def _do_lines_intersect(self, p1, p2, q1, q2):
-		def _orientation(p, q, r):
-			val = (q.y - p.y) * (r.x - q.x) - (q.x - p.x) * (r.y - q.y)
-			if val == 0:
-				return 0  # Collinear
-			elif val > 0:
-				return 1  # Clockwise orientation
-			else:
-				return 2  # Counterclockwise orientation
-
-		o1 = _orientation(p1, p2, q1)
-		o2 = _orientation(p1, p2, q2)
-		o3 = _orientation(q1, q2, p1)
-		o4 = _orientation(q1, q2, p2)
+		total_x, total_y = self.coords.sum(axis=0).tolist()
+		num_points = len(self.coords)
+		return Point(total_x / num_points, total_y / num_points)
 
-		if o1 != o2 and o3 != o4:
-			return True
+	def edges(self):
+		"""
+		Returns:
+			tuple: (starts, ends) arrays of shape (N, 2) describing the closed edge loop.
+		"""
+		return self.coords, np.concatenate((self.coords[1:], self.coords[:1]))
 
-		if o1 == 0 and self._on_segment(p1, q1, p2):
-			return True
-
-		if o2 == 0 and self._on_segment(p1, q2, p2):
-			return True
-
-		if o3 == 0 and self._on_segment(q1, p1, q2):
-			return True
-
-		if o4 == 0 and self._on_segment(q1, p2, q2):
-			return True
+	def intersects(self, other_polygon):
+		p1, p2 = self.edges()
+		q1, q2 = other_polygon.edges()
+		p1, p2 = p1[:, None, :], p2[:, None, :]
+		q1, q2 = q1[None, :, :], q2[None, :, :]
+
+		o1 = self._orientation(p1, p2, q1)
+		o2 = self._orientation(p1, p2, q2)
+		o3 = self._orientation(q1, q2, p1)
+		o4 = self._orientation(q1, q2, p2)
+
+		hits = (o1 != o2) & (o3 != o4)
+		hits |= (o1 == 0) & self._on_segment(p1, q1, p2)
+		hits |= (o2 == 0) & self._on_segment(p1, q2, p2)
+		hits |= (o3 == 0) & self._on_segment(q1, p1, q2)
+		hits |= (o4 == 0) & self._on_segment(q1, p2, q2)
+		return bool(hits.any())
 
-		return False
+	@staticmethod
+	def _orientation(p, q, r):
+		# 0: collinear, 1: clockwise, -1: counterclockwise
+		val = (q[..., 1] - p[..., 1]) * (r[..., 0] - q[..., 0]) - (q[..., 0] - p[..., 0]) * (r[..., 1] - q[..., 1])
+		return np.sign(val)
 
-	def _on_segment(self, p, q, r):
-		return (min(p.x, r.x) <= q.x <= max(p.x, r.x) and
-		        min(p.y, r.y) <= q.y <= max(p.y, r.y))
+	@staticmethod
+	def _on_segment(p, q, r):
+		return ((np.minimum(p[..., 0], r[..., 0]) <= q[..., 0]) & (q[..., 0] <= np.maximum(p[..., 0], r[..., 0])) &
+		        (np.minimum(p[..., 1], r[..., 1]) <= q[..., 1]) & (q[..., 1] <= np.maximum(p[..., 1], r[..., 1])))
 
 	def is_inside(self, other_polygon):
-		for vertex in self.vertices:
-			if not other_polygon.contains_point(vertex):
-				return False
-		return True
+		return bool(points_in_polygon(self.coords, other_polygon.coords).all())
 
 	def contains_point(self, point):
-		num_vertices = len(self.vertices)
-		inside = False
-
-		p1 = self.vertices[0]
-		for i in range(num_vertices + 1):
-			p2 = self.vertices[i % num_vertices]
-			if point.y > min(p1.y, p2.y):
-				if point.y <= max(p1.y, p2.y):
-					if point.x <= max(p1.x, p2.x):
-						if p1.y != p2.y:
-							xinters = (point.y - p1.y) * (p2.x - p1.x) / (p2.y - p1.y) + p1.x
-							if p1.x == p2.x or point.x <= xinters:
-								inside = not inside
-			p1 = p2
-
-		return inside
+		return bool(points_in_polygon(np.array([[point.x, point.y]]), self.coords)[0])
+
+	def contains_points(self, points):
+		"""
+		Vectorized version of contains_point for an (P, 2) array of points.
+		"""
+		return points_in_polygon(np.asarray(points, dtype=np.float64).reshape(-1, 2), self.coords)
+
+	def bounds(self):
+		"""
+		Returns:
+			tuple: (min_x, min_y, max_x, max_y) as floats.
+		"""
+		min_x, min_y = self.coords.min(axis=0).tolist()
+		max_x, max_y = self.coords.max(axis=0).tolist()
+		return min_x, min_y, max_x, max_y
 
 	def bounding_box(self):
-		min_x = float('inf')
-		min_y = float('inf')
-		max_x = float('-inf')
-		max_y = float('-inf')
-
-		for vertex in self.vertices:
-			if vertex.x < min_x:
-				min_x = vertex.x
-			if vertex.y < min_y:
-				min_y = vertex.y
-			if vertex.x > max_x:
-				max_x = vertex.x
-			if vertex.y > max_y:
-				max_y = vertex.y
+		min_x, min_y, max_x, max_y = self.bounds()
 
 		bottom_left = Point(min_x, min_y)
 		bottom_right = Point(max_x, min_y)
@@ -175,137 +285,67 @@ class Polygon:
 		return bottom_left, bottom_right, top_right, top_left
 
 	def _get_edges(self):
-		num_vertices = len(self.vertices)
-		edges = []
-
-		for i in range(num_vertices):
-			current_vertex = self.vertices[i]
-			next_vertex = self.vertices[(i + 1) % num_vertices]
-			edges.append((current_vertex, next_vertex))
-
-		return edges
-
+		vertices = self.vertices
+		return [(vertices[i], vertices[(i + 1) % len(vertices)]) for i in range(len(vertices))]
+
+	def distance_to(self, other_polygon):
+		"""
+		Smallest vertex-to-edge distance between this polygon and another one.
+		"""
+		starts, ends = self.edges()
+		other_starts, other_ends = other_polygon.edges()
+		return float(min(point_edge_distances(self.coords, other_starts, other_ends).min(),
+		                 point_edge_distances(other_polygon.coords, starts, ends).min()))
 
 	def _is_near_edge(self, other_polygon, distance_threshold):
-		for edge1 in self._get_edges():
-			for edge2 in other_polygon._get_edges():
-				if self._edges_are_near(edge1, edge2, distance_threshold, other_polygon):
-					return True
-		return False
-
-	def _edges_are_near(self, edge1, edge2, distance_threshold, other_polygon):
-		edge1_start, edge1_end = edge1
-		edge2_start, edge2_end = edge2
-
-		# Calculate the distance between the edges
-		distance = self._point_to_edge_distance(edge1_start, edge2)
-
-		if distance <= distance_threshold:
-			return True
-
-		distance = self._point_to_edge_distance(edge1_end, edge2)
-
-		if distance <= distance_threshold:
-			return True
-
-		distance = other_polygon._point_to_edge_distance(edge2_start, edge1)
-
-		if distance <= distance_threshold:
-			return True
-
-		distance = other_polygon._point_to_edge_distance(edge2_end, edge1)
-
-		if distance <= distance_threshold:
-			return True
-
-		return False
+		return self.distance_to(other_polygon) <= distance_threshold
 
 	def _point_to_edge_distance(self, point, edge):
 		edge_start, edge_end = edge
-
-		# Calculate the vector representing the edge
-		edge_vector = Point(edge_end.x - edge_start.x, edge_end.y - edge_start.y)
-
-		# Calculate the vector from the edge start to the point
-		point_vector = Point(point.x - edge_start.x, point.y - edge_start.y)
-
-		# Calculate the dot product of the edge vector and point vector
-		dot_product = edge_vector.x * point_vector.x + edge_vector.y * point_vector.y
-
-		# Check the winding order to determine if the point is on the correct side of the edge
-		if dot_product <= 0:
-			# The point is on the opposite side or collinear with the edge
-			return point.distance(edge_start)
-
-		edge_length_squared = edge_vector.x ** 2 + edge_vector.y ** 2
-
-		if dot_product >= edge_length_squared:
-			# The point is beyond the end of the edge
-			return point.distance(edge_end)
-
-		# Calculate the projection value
-		projection = dot_product / edge_length_squared
-
-		# Calculate the projected vector onto the edge vector
-		projected_vector = Point(edge_vector.x * projection, edge_vector.y * projection)
-
-		# Calculate the perpendicular distance from the point to the edge
-		perpendicular_distance = point_vector.distance(projected_vector)
-
-		return perpendicular_distance
-
+		return float(point_edge_distances(np.array([[point.x, point.y]]),
+		                                  np.array([[edge_start.x, edge_start.y]]),
+		                                  np.array([[edge_end.x, edge_end.y]]))[0, 0])
 
 	def line_angles(self):
-		angles = []
-		num_points = len(self.vertices)
-		for i in range(num_points):
-			current_point = self.vertices[i]
-			next_point = self.vertices[(i + 1) % num_points]
-			dx = next_point.x - current_point.x
-			dy = next_point.y - current_point.y
-			angle = math.atan2(dy, dx)
-			angles.append(math.degrees(angle))
-		return angles
-
+		deltas = np.roll(self.coords, -1, axis=0) - self.coords
+		return np.degrees(np.arctan2(deltas[:, 1], deltas[:, 0])).tolist()
 
 	def generate_staircase_lines(self, step_size):
-		num_points = len(self.vertices)
-		new_vertices = []
-
-		for i in range(num_points):
-			current_point = self.vertices[i]
-			next_point = self.vertices[(i + 1) % num_points]
-			line = Line(current_point, next_point)
-			
-			staircase_line = line.generate_staircase_line(step_size)
-			new_vertices.extend(staircase_line[1:])  # Exclude the first point (already added in previous segment)
-			
-		self.vertices = new_vertices
-
+		"""
+		Replace every edge by its staircase on a grid of step_size, in one pass over all edges.
 
+		The vertices become the snapped step points of all edges with repeated
+		points and straight runs (also across the original vertices) removed,
+		i.e. only the corners of the staircase outline.
+		"""
+		starts, ends = self.edges()
+		units = remove_collinear(staircase_steps(starts, ends, step_size))
+		self.coords = np.round(units * step_size, grid_decimals(step_size))
 
 	def copy(self):
-		copied_vertices = [Point(vertex.x, vertex.y) for vertex in self.vertices]
-		return Polygon(copied_vertices)
+		return Polygon(self.coords, self.gds_layer, self.gds_datatype)
 
 	def to_gdspy_polygon(self, layer, datatype):
-		points = [(vertex.x, vertex.y) for vertex in self.vertices]
-		return gdspy.Polygon(points, layer, datatype)
-
+		"""
+		Hand the coordinate array to gdspy without copying it.
+
+		The returned gdspy.Polygon shares its point array with this polygon, so
+		later in-place transforms of this polygon are visible through it.
+		"""
+		gdspy_polygon = gdspy.Polygon.__new__(gdspy.Polygon)
+		gdspy_polygon.polygons = [self.coords]
+		gdspy_polygon.layers = [layer]
+		gdspy_polygon.datatypes = [datatype]
+		gdspy_polygon.properties = {}
+		return gdspy_polygon
 
 	@classmethod
 	def from_gdspy_polygon(cls, gdspy_polygon):
-		points = [Point(point[0], point[1]) for point in gdspy_polygon.points]
-		return cls(points)
+		return cls(gdspy_polygon.polygons[0], gdspy_polygon.layers[0], gdspy_polygon.datatypes[0])
 
 	@staticmethod
 	def copy_polygons(polygons):
-		copied_polygons = []
-		for polygon in polygons:
-			copied_polygons.append(copy.deepcopy(polygon))
-		return copied_polygons
-
-
+		return [polygon.copy() for polygon in polygons]
 
 	@staticmethod
 	def move_polygons(polygons, dx, dy):
@@ -330,6 +370,18 @@ class Polygon:
 
 	@staticmethod
 	def move_polygons_on_line(polygons, current_reference_point, line, offsetX=0, offsetY=0):
+		offset_midpoint, angle_degrees = Polygon.line_placement(line, offsetX, offsetY)
+		Polygon.move_polygons_to_point_and_rotate(polygons, current_reference_point, offset_midpoint, angle_degrees)
+
+	@staticmethod
+	def line_placement(line, offsetX=0, offsetY=0):
+		"""
+		Where move_polygons_on_line places polygons.
+
+		Returns:
+			tuple: (Point, float) the point the reference point is moved to and the
+			rotation around it in degrees.
+		"""
 		# Calculate the midpoint of the line
 		midpoint = line.midpoint()
 
@@ -351,25 +403,13 @@ class Polygon:
 		offset_midpoint = Point(midpoint.x + offset_vector_x.x + offset_vector_y.x,
 		                        midpoint.y + offset_vector_x.y + offset_vector_y.y)
 
-		# Place the polygons on the line using the move_polygons_on_point function
-		Polygon.move_polygons_to_point_and_rotate(polygons, current_reference_point, offset_midpoint, angle_degrees - 90)
-
-
+		return offset_midpoint, angle_degrees - 90
 
 	@staticmethod
 	def bounding_box_polygons(polygons):
-		min_x = float('inf')
-		min_y = float('inf')
-		max_x = float('-inf')
-		max_y = float('-inf')
-
-		for polygon in polygons:
-			bbox = polygon.bounding_box()
-			for point in bbox:
-				min_x = min(min_x, point.x)
-				min_y = min(min_y, point.y)
-				max_x = max(max_x, point.x)
-				max_y = max(max_y, point.y)
+		all_coords = np.concatenate([polygon.coords for polygon in polygons])
+		min_x, min_y = all_coords.min(axis=0).tolist()
+		max_x, max_y = all_coords.max(axis=0).tolist()
 
 		bottom_left = Point(min_x, min_y)
 		bottom_right = Point(max_x, min_y)
@@ -377,5 +417,3 @@ class Polygon:
 		top_left = Point(min_x, max_y)
 
 		return [bottom_left, bottom_right, top_right, top_left]
-
-
@@ -0,0 +1,39 @@
+class PolygonGroupInstance:
+    """
+    One placed copy of a prototype polygon group.
+
+    The placement is a rotation of the prototype around (0, 0) followed by a
+    move to origin, which is exactly what a GDS cell reference does. Keeping
+    the prototype and placement next to the placed polygons lets a
+    hierarchical writer emit a single reference where a flat writer emits
+    every polygon.
+
+    Attributes:
+        prototype (list): The untransformed prototype polygons. Never modified.
+        origin (tuple): (x, y) the prototype origin is moved to.
+        rotation (float): Rotation around the prototype origin, in degrees.
+        polygons (list): The placed polygons that were kept, in prototype order.
+    """
+
+    def __init__(self, prototype, origin, rotation, polygons):
+        self.prototype = prototype
+        self.origin = origin
+        self.rotation = rotation
+        self.polygons = polygons
+
+    def __len__(self):
+        return len(self.polygons)
+
+    def is_complete(self):
+        """
+        Whether every prototype polygon was kept, i.e. the instance is a plain copy of the group.
+        """
+        return len(self.polygons) == len(self.prototype)
+
+    def to_polygons(self):
+        return self.polygons
+
+    def copy(self):
+        # The prototype is shared; only the placed polygons are ever modified.
+        return PolygonGroupInstance(self.prototype, self.origin, self.rotation,
+                                    [polygon.copy() for polygon in self.polygons])
@@ -0,0 +1,110 @@
+import math
+
+import numpy as np
+
+
+class _LayerGrid:
+    """
+    Uniform grid over the bounding boxes of the polygons on one layer.
+    """
+
+    def __init__(self, polygons):
+        self.polygons = polygons
+        self.bounds = np.array([polygon.bounds() for polygon in polygons], dtype=np.float64).reshape(-1, 4)
+        self.cells = {}
+
+        sizes = np.maximum(self.bounds[:, 2] - self.bounds[:, 0], self.bounds[:, 3] - self.bounds[:, 1])
+        extent = max(self.bounds[:, 2].max() - self.bounds[:, 0].min(),
+                     self.bounds[:, 3].max() - self.bounds[:, 1].min())
+        # Aim for roughly one polygon per cell, but never smaller than a typical polygon.
+        self.cell_size = max(float(np.median(sizes)), extent / math.sqrt(len(polygons)), 1e-9)
+
+        for item, (min_x, min_y, max_x, max_y) in enumerate(self.bounds.tolist()):
+            for key in self._cell_keys(min_x, min_y, max_x, max_y):
+                self.cells.setdefault(key, []).append(item)
+
+    def _cell_keys(self, min_x, min_y, max_x, max_y):
+        i0, i1 = math.floor(min_x / self.cell_size), math.floor(max_x / self.cell_size)
+        j0, j1 = math.floor(min_y / self.cell_size), math.floor(max_y / self.cell_size)
+        return [(i, j) for i in range(i0, i1 + 1) for j in range(j0, j1 + 1)]
+
+    def query(self, min_x, min_y, max_x, max_y, distance):
+        items = set()
+        for key in self._cell_keys(min_x - distance, min_y - distance, max_x + distance, max_y + distance):
+            items.update(self.cells.get(key, ()))
+        if not items:
+            return []
+
+        items = np.fromiter(items, dtype=np.int64, count=len(items))
+        items.sort()
+        b = self.bounds[items]
+        # Keep polygons whose bounding box gap is within distance on both axes.
+        close = ((b[:, 0] - max_x <= distance) & (min_x - b[:, 2] <= distance) &
+                 (b[:, 1] - max_y <= distance) & (min_y - b[:, 3] <= distance))
+        return [self.polygons[item] for item in items[close].tolist()]
+
+
+class SpatialIndex:
+    """
+    Layer-keyed spatial index answering "is anything within distance d" queries.
+
+    Polygons are grouped by (gds_layer, gds_datatype) and bucketed on a uniform
+    grid over their bounding boxes. Queries first collect the polygons whose
+    bounding boxes lie within the requested distance and only run the exact
+    edge test on those candidates.
+    """
+
+    def __init__(self, polygons=()):
+        self._polygons = {}
+        self._grids = {}
+        for polygon in polygons:
+            self.insert(polygon)
+
+    def __len__(self):
+        return sum(len(polygons) for polygons in self._polygons.values())
+
+    def insert(self, polygon):
+        """
+        Add a polygon to the index under its own layer and datatype.
+        """
+        key = (polygon.gds_layer, polygon.gds_datatype)
+        self._polygons.setdefault(key, []).append(polygon)
+        self._grids.pop(key, None)
+
+    def layers(self):
+        return list(self._polygons)
+
+    def _grid(self, key):
+        grid = self._grids.get(key)
+        if grid is None and self._polygons.get(key):
+            grid = self._grids[key] = _LayerGrid(self._polygons[key])
+        return grid
+
+    def query(self, polygon, distance=0, layer=None):
+        """
+        Candidate polygons whose bounding box lies within distance of the polygon.
+
+        Args:
+            polygon (Polygon): The query polygon.
+            distance (float): Search distance around the polygon bounding box.
+            layer (tuple, optional): (gds_layer, gds_datatype) to search. Defaults
+                to the layer of the query polygon.
+
+        Returns:
+            list: Candidate polygons in insertion order.
+        """
+        key = layer if layer is not None else (polygon.gds_layer, polygon.gds_datatype)
+        grid = self._grid(key)
+        if grid is None:
+            return []
+        return grid.query(*polygon.bounds(), distance)
+
+    def is_near_or_intersecting(self, polygon, distance=0, layer=None):
+        """
+        Check whether any indexed polygon on the layer is within distance of, or
+        contains, the given polygon.
+        """
+        for other in self.query(polygon, distance, layer):
+            if polygon._is_near_edge(other, distance) or polygon.is_inside(other):
+                return True
+        return False
@@ -0,0 +1,219 @@
+import math
+
+import numpy as np
+
+from .Polygon import Polygon, point_edge_distances, points_in_polygon
+
+
+class ViaArray:
+    """
+    A rectangular grid of identical via cuts placed inside a host polygon.
+
+    Candidate vias are laid out on a row/column grid centred on the host
+    polygon midpoint. Containment and edge clearance are evaluated for all
+    candidates at once and only the surviving grid cells are kept.
+
+    Attributes:
+        origin (tuple): (x, y) centre of grid cell (0, 0).
+        pitch (tuple): (dx, dy) centre-to-centre distance along columns and rows.
+        length (float): Via size along x before rotation.
+        width (float): Via size along y before rotation.
+        angle (float): Rotation of every via around its own centre, in degrees.
+        indices (ndarray): (K, 2) integer (row, column) indices of the placed vias.
+        gds_layer (int): GDS layer of the vias.
+        gds_datatype (int): GDS datatype of the vias.
+    """
+
+    # Candidates are tested in chunks to bound the size of the (vias x edges) matrices.
+    CHUNK_SIZE = 8192
+
+    def __init__(self, origin, pitch, length, width, angle=0, indices=None, gds_layer=None, gds_datatype=None):
+        self.origin = origin
+        self.pitch = pitch
+        self.length = length
+        self.width = width
+        self.angle = angle
+        self.indices = np.empty((0, 2), dtype=np.int64) if indices is None else indices
+        self.gds_layer = gds_layer
+        self.gds_datatype = gds_datatype
+
+    def __len__(self):
+        return len(self.indices)
+
+    @classmethod
+    def fill(cls, host, length, width, spacing, angle=0, clearance=0):
+        """
+        Place as many vias as fit inside a host polygon.
+
+        Args:
+            host (Polygon): The polygon the vias must lie within.
+            length (float): Via length.
+            width (float): Via width.
+            spacing (float): Spacing between neighbouring vias.
+            angle (float): Via rotation in degrees.
+            clearance (float): A via is rejected when any of its edges comes
+                within this distance of a host edge.
+
+        Returns:
+            ViaArray: The vias that are fully inside the host and clear of its edges.
+        """
+        min_x, min_y, max_x, max_y = host.bounds()
+        midpoint = host.midpoint()
+        dx = length + spacing
+        dy = width + spacing
+        c_max = ((max_x - min_x) - spacing) / (length + spacing)
+        r_max = ((max_y - min_y) - spacing) / (width + spacing)
+
+        rows = np.arange(-round(r_max / 2) + 1, round(r_max / 2))
+        cols = np.arange(-round(c_max / 2) + 1, round(c_max / 2))
+        vias = cls((midpoint.x, midpoint.y), (dx, dy), length, width, angle)
+        if len(rows) == 0 or len(cols) == 0:
+            return vias
+
+        # Row-major order matches the order vias have always been emitted in.
+        grid_r, grid_c = np.meshgrid(rows, cols, indexing='ij')
+        candidates = np.stack((grid_r.ravel(), grid_c.ravel()), axis=1)
+
+        host_starts, host_ends = host.edges()
+        kept = []
+        for start in range(0, len(candidates), cls.CHUNK_SIZE):
+            chunk = candidates[start:start + cls.CHUNK_SIZE]
+            corners = vias._corners_for(chunk)
+
+            inside = points_in_polygon(corners.reshape(-1, 2), host.coords).reshape(-1, 4).all(axis=1)
+            chunk = chunk[inside]
+            if len(chunk) == 0:
+                continue
+            corners = corners[inside]
+
+            via_starts = corners.reshape(-1, 2)
+            via_ends = np.roll(corners, -1, axis=1).reshape(-1, 2)
+            via_to_host = point_edge_distances(via_starts, host_starts, host_ends)
+            host_to_via = point_edge_distances(host.coords, via_starts, via_ends)
+            distance = np.minimum(via_to_host.reshape(-1, 4 * len(host_starts)).min(axis=1),
+                                  host_to_via.reshape(len(host_starts), -1, 4).min(axis=(0, 2)))
+            kept.append(chunk[distance > clearance])
+
+        if kept:
+            vias.indices = np.concatenate(kept)
+        return vias
+
+    def centres(self):
+        """
+        Returns:
+            ndarray: (K, 2) via centre coordinates.
+        """
+        return self._centres_for(self.indices)
+
+    def centre(self, row, column):
+        """
+        Returns:
+            tuple: (x, y) centre of grid cell (row, column).
+        """
+        return (self.origin[0] + self.pitch[0] * column, self.origin[1] + self.pitch[1] * row)
+
+    def corners(self):
+        """
+        Returns:
+            ndarray: (K, 4, 2) corner coordinates of every via, rotated by angle.
+        """
+        return self._corners_for(self.indices)
+
+    def copy(self):
+        return ViaArray(self.origin, self.pitch, self.length, self.width, self.angle,
+                        self.indices.copy(), self.gds_layer, self.gds_datatype)
+
+    def mirror(self, axis):
+        """
+        Mirror the array in place across the "NS" (x -> -x) or "WE" (y -> -y) axis.
+
+        The grid is symmetric around its origin, so mirroring negates the
+        origin coordinate and the column (NS) or row (WE) indices. The vias
+        keep their size; only their rotation changes sign. Indices are kept
+        in row-major order.
+        """
+        if axis == "NS":
+            self.origin = (-self.origin[0], self.origin[1])
+            self.indices = self.indices * np.array([1, -1])
+        elif axis == "WE":
+            self.origin = (self.origin[0], -self.origin[1])
+            self.indices = self.indices * np.array([-1, 1])
+        else:
+            raise ValueError(f"Unknown mirror axis {axis!r}; use 'NS' or 'WE'")
+        self.angle = -self.angle
+        self.indices = self.indices[np.lexsort((self.indices[:, 1], self.indices[:, 0]))]
+
+    def to_polygons(self, gds_layer=None, gds_datatype=None):
+        """
+        Expand the array into one Polygon per via.
+
+        Each polygon views its own rows of a single corner array, so no
+        per-vertex objects are created. The layer and datatype default to the
+        array's own.
+        """
+        gds_layer = self.gds_layer if gds_layer is None else gds_layer
+        gds_datatype = self.gds_datatype if gds_datatype is None else gds_datatype
+        return [Polygon(corners, gds_layer, gds_datatype, copy=False) for corners in self.corners()]
+
+    def unit_polygon(self):
+        """
+        A single via centred on (0, 0), the cell a hierarchical layout repeats.
+        """
+        corners = ViaArray((0.0, 0.0), self.pitch, self.length, self.width, self.angle)._corners_for(
+            np.zeros((1, 2), dtype=np.int64))
+        return Polygon(corners[0], self.gds_layer, self.gds_datatype, copy=False)
+
+    def blocks(self):
+        """
+        Cover the placed vias with full rectangular sub-grids.
+
+        Runs of consecutive columns are found per row and identical runs in
+        consecutive rows are merged, so a via array that is mostly full
+        collapses to a handful of blocks.
+
+        Returns:
+            list: (row, column, rows, columns) tuples, ordered by first row and column.
+        """
+        blocks = []
+        open_blocks = {}
+        previous_row = None
+        rows = self.indices[:, 0]
+        for row in np.unique(rows).tolist():
+            columns = np.sort(self.indices[rows == row, 1])
+            breaks = np.flatnonzero(np.diff(columns) != 1) + 1
+            still_open = {}
+            for run in np.split(columns, breaks):
+                run_key = (int(run[0]), len(run))
+                block = open_blocks.pop(run_key, None) if previous_row == row - 1 else None
+                if block is None:
+                    block = [row, 0]
+                block[1] += 1
+                still_open[run_key] = block
+            blocks.extend((block[0], column, block[1], count) for (column, count), block in open_blocks.items())
+            open_blocks = still_open
+            previous_row = row
+        blocks.extend((block[0], column, block[1], count) for (column, count), block in open_blocks.items())
+        return sorted(blocks)
+
+    def _centres_for(self, indices):
+        x = self.origin[0] + self.pitch[0] * indices[:, 1]
+        y = self.origin[1] + self.pitch[1] * indices[:, 0]
+        return np.stack((x, y), axis=1)
+
+    def _corners_for(self, indices):
+        centres = self._centres_for(indices)
+        x = centres[:, 0:1]
+        y = centres[:, 1:2]
+        half_l = self.length / 2.0
+        half_w = self.width / 2.0
+        corner_x = np.concatenate((x - half_l, x + half_l, x + half_l, x - half_l), axis=1)
+        corner_y = np.concatenate((y - half_w, y - half_w, y + half_w, y + half_w), axis=1)
+
+        angle_rad = math.radians(self.angle)
+        cos_a = math.cos(angle_rad)
+        sin_a = math.sin(angle_rad)
+        translated_x = corner_x - x
+        translated_y = corner_y - y
+        rotated_x = translated_x * cos_a - translated_y * sin_a + x
+        rotated_y = translated_x * sin_a + translated_y * cos_a + y
+        return np.stack((rotated_x, rotated_y), axis=2)
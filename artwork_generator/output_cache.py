@@ -0,0 +1,264 @@
+"""
+Content-addressed cache of generated GDS, SVG and thumbnail files.
+
+Re-running a sweep, or previewing an artwork that did not change, produces
+exactly the files an earlier run already wrote. output_key hashes everything
+the written files depend on: the generator sources, the fully resolved
+parameters, the artwork sections that describe geometry and the Component
+options. OutputCache stores the files of every key and, on a hit, hard-links
+(or copies) them to the requested output path instead of generating again.
+
+The cell name is not part of the key, since every sweep run has its own name
+and would otherwise never share an entry. GDS and SVG files are stored with
+their cell renamed to CACHED_CELL_NAME and get the requested cell name back
+when they are restored.
+
+Entries are plain files named <key>.gds, <key>.svg, <key>.png and <key>.rules.json in one directory, so
+several processes can share a cache. The modification time of an entry is
+its last use; when the directory grows beyond max_bytes the least recently
+used entries are removed.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+from typing import Any, Dict, Iterable, List, Optional
+
+from gds_stream import rename_cells
+from stage_cache import CODE_FINGERPRINT
+
+
+# Output kind -> file suffix.
+OUTPUT_SUFFIXES = {"gds": ".gds", "svg": ".svg", "png": ".png", "rules": ".rules.json"}
+
+# Artwork sections whose content ends up in the written files.
+GEOMETRY_SECTIONS = ("segments", "bridges", "arms", "ports", "via", "viaPadStack", "guardRing", "layers")
+
+# Resolved parameters that only decide where files go, not what they contain.
+NON_GEOMETRY_PARAMETERS = ("outputDir",)
+
+DEFAULT_MAX_BYTES = 1024 ** 3
+
+# Cell name of the cached GDS and SVG files, replaced by the requested name on restore.
+CACHED_CELL_NAME = "CACHED_CELL"
+
+# Output kinds whose files contain the cell name.
+NAMED_KINDS = ("gds", "svg")
+
+
+def output_kinds(generate_layout: bool, generate_svg: bool, generate_thumbnail: bool = False,
+                 rule_check: bool = False) -> List[str]:
+    """
+    The output kinds a Component writes for the given flags.
+    """
+    return [kind for kind, enabled in (("gds", generate_layout), ("svg", generate_svg), ("png", generate_thumbnail),
+                                       ("rules", rule_check)) if enabled]
+
+
+def output_key(component_data: dict, parameters: Dict[str, Any], options: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Build the cache key of a Component's output files.
+
+    Parameters:
+        component_data (dict): The artwork JSON.
+        parameters (dict): The fully resolved parameters.
+        options (dict, optional): Component options that change the output,
+            e.g. hierarchical or merge_layers.
+
+    Returns:
+        str: A hex SHA-256 digest.
+    """
+    payload = json.dumps(
+        [
+            CODE_FINGERPRINT,
+            {name: value for name, value in parameters.items() if name not in NON_GEOMETRY_PARAMETERS},
+            {section: component_data.get(section) for section in GEOMETRY_SECTIONS},
+            options or {},
+        ],
+        sort_keys=True,
+        default=repr,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def rename_cell(kind: str, data: bytes, old_name: str, new_name: str) -> bytes:
+    """
+    Rename the cell, and the sub-cells named after it, in the contents of a GDS or SVG file.
+    """
+    if kind == "gds":
+        return rename_cells(data, old_name, new_name)
+    # gdspy writes cells as <g id="name"> and references them as xlink:href="#name".
+    pattern = re.compile(rb'(id="|href="#)' + re.escape(old_name.encode()) + rb'(?=["_])')
+    return pattern.sub(lambda match: match.group(1) + new_name.encode(), data)
+
+
+class OutputCache:
+    """
+    Size-capped LRU store of generated output files.
+
+    Parameters:
+        directory (str): Directory the entries are kept in. Created if missing.
+        max_bytes (int): Total size of the entries kept. The least recently
+            used entries are removed once it is exceeded.
+        link (bool): Hard-link cached files to the output path on a hit,
+            falling back to a copy where linking is not possible. When False
+            the files are always copied.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES, link: bool = True) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.link = link
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str, kind: str) -> str:
+        return os.path.join(self.directory, key + OUTPUT_SUFFIXES[kind])
+
+    def fetch(self, key: str, kinds: Iterable[str], output_path: str, output_name: str,
+              cell_name: str) -> Optional[Dict[str, str]]:
+        """
+        Restore the cached files of key to output_path.
+
+        Parameters:
+            key (str): The output_key of the requested outputs.
+            kinds (iterable of str): The output kinds needed, e.g. ["gds", "svg"].
+            output_path (str): Directory to restore the files to.
+            output_name (str): File name without suffix.
+            cell_name (str): Name of the cell in the restored GDS and SVG files.
+
+        Returns:
+            dict: Output kind -> restored file path, or None when any of the
+            requested kinds is not cached. Nothing is restored in that case.
+        """
+        kinds = list(kinds)
+        sources = {kind: self._path(key, kind) for kind in kinds}
+        if not kinds or not all(os.path.exists(path) for path in sources.values()):
+            self.misses += 1
+            return None
+
+        os.makedirs(output_path, exist_ok=True)
+        restored = {}
+        try:
+            for kind, source in sources.items():
+                target = os.path.join(output_path, output_name + OUTPUT_SUFFIXES[kind])
+                if kind in NAMED_KINDS:
+                    with open(source, "rb") as f:
+                        data = rename_cell(kind, f.read(), CACHED_CELL_NAME, cell_name)
+                    self._write_file(data, target)
+                else:
+                    self._restore_file(source, target)
+                # Mark the entry as recently used for eviction.
+                os.utime(source)
+                restored[kind] = target
+        except OSError as e:
+            # The entry may have been evicted by another process in between.
+            logging.warning("Could not restore cached output %s: %s", key, e)
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return restored
+
+    def store(self, key: str, files: Dict[str, str], cell_name: str) -> None:
+        """
+        Copy freshly written output files into the cache and evict old entries.
+
+        Parameters:
+            key (str): The output_key the files were generated for.
+            files (dict): Output kind -> path of the written file.
+            cell_name (str): Name of the cell in the written GDS and SVG files.
+        """
+        for kind, path in files.items():
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            os.close(fd)
+            try:
+                # The cache keeps its own copy, so later edits of the output never reach it.
+                if kind in NAMED_KINDS:
+                    with open(path, "rb") as f:
+                        data = rename_cell(kind, f.read(), cell_name, CACHED_CELL_NAME)
+                    with open(tmp_path, "wb") as f:
+                        f.write(data)
+                else:
+                    shutil.copyfile(path, tmp_path)
+                shutil.copymode(path, tmp_path)
+                os.replace(tmp_path, self._path(key, kind))
+            except OSError as e:
+                logging.warning("Could not store output %s in the cache: %s", path, e)
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        self.evict()
+
+    def size(self) -> int:
+        """
+        Total size of the cached files in bytes.
+        """
+        return sum(size for _, size in self._entries().values())
+
+    def evict(self) -> None:
+        """
+        Remove least recently used entries until the cache fits in max_bytes.
+        """
+        entries = self._entries()
+        total = sum(size for _, size in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k][0]):
+            if total <= self.max_bytes:
+                break
+            for kind in OUTPUT_SUFFIXES:
+                try:
+                    os.remove(self._path(key, kind))
+                except FileNotFoundError:
+                    pass
+            total -= entries[key][1]
+            logging.debug("Evicted cached output %s", key)
+
+    def _entries(self) -> Dict[str, List[float]]:
+        """
+        Key -> [last use, size] of every entry on disk.
+        """
+        entries: Dict[str, List[float]] = {}
+        with os.scandir(self.directory) as it:
+            for dir_entry in it:
+                # Keys are hex digests, so the suffix starts at the first dot.
+                key, dot, suffix = dir_entry.name.partition(".")
+                if dot + suffix not in OUTPUT_SUFFIXES.values():
+                    continue
+                try:
+                    stat = dir_entry.stat()
+                except FileNotFoundError:
+                    continue
+                entry = entries.setdefault(key, [0.0, 0])
+                entry[0] = max(entry[0], stat.st_mtime)
+                entry[1] += stat.st_size
+        return entries
+
+    @staticmethod
+    def _write_file(data: bytes, target: str) -> None:
+        # Write next to the target, then rename, so a reader never sees a partial file.
+        tmp_path = target + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, target)
+
+    def _restore_file(self, source: str, target: str) -> None:
+        if os.path.exists(target) and os.path.samefile(source, target):
+            return
+        # Link or copy next to the target, then rename, so a reader never sees a partial file.
+        tmp_path = target + ".tmp"
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        linked = False
+        if self.link:
+            try:
+                os.link(source, tmp_path)
+                linked = True
+            except OSError:
+                pass
+        if not linked:
+            shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, target)
@@ -0,0 +1,238 @@
+"""
+Dependency-graph compiler for artwork parameter expressions.
+
+The "parameters" block of an artwork JSON maps names to numbers, lists or
+Python expressions that may reference other parameters, e.g.::
+
+    {"width": 10, "spacing": 2, "pitch": "width + spacing"}
+
+ParameterGraph parses every expression once, records which parameters it
+reads, orders the parameters topologically and keeps the compiled code
+objects. Evaluating the graph for a new set of swept values is then a single
+pass of eval() calls in dependency order.
+"""
+
+import ast
+import builtins
+import functools
+import math
+from types import CodeType
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# A safe environment for evaluating parameter expressions.
+SAFE_EVAL_ENV: Dict[str, Any] = {
+    **{k: getattr(math, k) for k in ['sqrt', 'log', 'sin', 'cos', 'tan', 'floor', 'ceil']},
+    'abs': abs,
+    'max': max,
+    'min': min,
+    'round': round,
+}
+
+
+class ParameterError(ValueError):
+    """Raised when the parameter block cannot be resolved."""
+
+
+class ParameterCycleError(ParameterError):
+    """Raised when parameters depend on each other in a cycle."""
+
+    def __init__(self, cycle: List[str]):
+        self.cycle = cycle
+        super().__init__("Circular parameter dependency: " + " -> ".join(cycle))
+
+
+class UnknownParameterError(ParameterError):
+    """Raised when an expression references a name that is not defined anywhere."""
+
+    def __init__(self, parameter: str, expression: str, names: List[str]):
+        self.parameter = parameter
+        self.expression = expression
+        self.names = names
+        super().__init__(
+            f"Parameter '{parameter}' = {expression!r} references unknown name(s): {', '.join(names)}")
+
+
+@functools.lru_cache(maxsize=4096)
+def compile_expression(expression: str) -> Tuple[CodeType, frozenset]:
+    """
+    Compile a parameter expression and collect the free names it reads.
+
+    Results are cached, so the same expression string is only parsed once per
+    process no matter how many artworks or sweep runs use it.
+
+    Returns:
+        Tuple[CodeType, frozenset]: The code object and the names it loads.
+    """
+    tree = ast.parse(expression.strip(), mode="eval")
+    loaded = set()
+    bound = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            (loaded if isinstance(node.ctx, ast.Load) else bound).add(node.id)
+        elif isinstance(node, ast.arg):
+            bound.add(node.arg)
+    return compile(tree, f"<parameter {expression!r}>", "eval"), frozenset(loaded - bound)
+
+
+def evaluate_expression(expression: str, namespace: Dict[str, Any]) -> Any:
+    """
+    Evaluate a single expression against a namespace of resolved parameters.
+    """
+    code, _ = compile_expression(expression)
+    return eval(code, SAFE_EVAL_ENV, namespace)
+
+
+class _Node:
+    """
+    One compiled parameter: a constant, an expression, an alias or a sequence of those.
+    """
+
+    __slots__ = ("kind", "value", "deps")
+
+    def __init__(self, kind: str, value: Any, deps: frozenset):
+        self.kind = kind
+        self.value = value
+        self.deps = deps
+
+    def evaluate(self, namespace: Dict[str, Any]) -> Any:
+        if self.kind == "const":
+            return self.value
+        if self.kind == "expr":
+            return eval(self.value, SAFE_EVAL_ENV, namespace)
+        if self.kind == "alias":
+            return namespace[self.value]
+        seq_type, items = self.value
+        return seq_type(item.evaluate(namespace) for item in items)
+
+
+class ParameterGraph:
+    """
+    Parameters parsed into a dependency DAG and compiled for repeated evaluation.
+
+    Parameters:
+        parameters (dict): The raw "parameters" block of an artwork.
+
+    Raises:
+        ParameterError: If an expression is not valid Python.
+        UnknownParameterError: If an expression reads a name that is neither a
+            parameter nor an allowed function.
+        ParameterCycleError: If parameters depend on each other in a cycle.
+    """
+
+    def __init__(self, parameters: Dict[str, Any]):
+        self.parameters = dict(parameters)
+        self.nodes: Dict[str, _Node] = {name: self._compile(name, value) for name, value in self.parameters.items()}
+        self.order: List[str] = self._topological_order()
+
+    def _compile(self, name: str, value: Any) -> _Node:
+        if isinstance(value, str):
+            if value in self.parameters and not value.isidentifier():
+                return _Node("alias", value, frozenset([value]))
+            try:
+                code, names = compile_expression(value)
+            except SyntaxError as exc:
+                raise ParameterError(f"Parameter '{name}' = {value!r} is not a valid expression: {exc.msg}") from None
+            deps = frozenset(n for n in names if n in self.parameters)
+            unknown = sorted(n for n in names - deps
+                             if n not in SAFE_EVAL_ENV and not hasattr(builtins, n))
+            if unknown:
+                raise UnknownParameterError(name, value, unknown)
+            return _Node("expr", code, deps)
+        if isinstance(value, (list, tuple)):
+            items = [self._compile(name, item) for item in value]
+            deps = frozenset().union(*(item.deps for item in items))
+            return _Node("seq", (type(value), items), deps)
+        return _Node("const", value, frozenset())
+
+    def _topological_order(self) -> List[str]:
+        """
+        Kahn's algorithm, breaking ties by the order parameters were declared in.
+        """
+        names = list(self.nodes)
+        remaining = {name: len(self.nodes[name].deps - {name}) for name in names}
+        dependants: Dict[str, List[str]] = {name: [] for name in names}
+        for name in names:
+            for dep in self.nodes[name].deps:
+                if dep != name:
+                    dependants[dep].append(name)
+
+        ready = [name for name in names if remaining[name] == 0 and name not in self.nodes[name].deps]
+        order: List[str] = []
+        while ready:
+            name = ready.pop(0)
+            order.append(name)
+            for dependant in dependants[name]:
+                remaining[dependant] -= 1
+                if remaining[dependant] == 0:
+                    ready.append(dependant)
+
+        if len(order) != len(names):
+            raise ParameterCycleError(self._find_cycle(set(names) - set(order)))
+        return order
+
+    def _find_cycle(self, unresolved: set) -> List[str]:
+        start = next(name for name in self.nodes if name in unresolved)
+        path: List[str] = []
+        seen: Dict[str, int] = {}
+        name = start
+        while name not in seen:
+            seen[name] = len(path)
+            path.append(name)
+            name = next(dep for dep in self.nodes if dep in self.nodes[name].deps and dep in unresolved)
+        return path[seen[name]:] + [name]
+
+    def dependencies(self, name: str) -> frozenset:
+        """
+        All parameters the given parameter depends on, directly or indirectly.
+        """
+        result = set()
+        stack = list(self.nodes[name].deps)
+        while stack:
+            dep = stack.pop()
+            if dep not in result:
+                result.add(dep)
+                stack.extend(self.nodes[dep].deps)
+        return frozenset(result)
+
+    def with_overrides(self, overrides: Dict[str, Any]) -> "ParameterGraph":
+        """
+        Return a graph with some parameters replaced, reusing every compiled node
+        that is not overridden.
+        """
+        parameters = {**self.parameters, **overrides}
+        if any(name not in self.parameters for name in overrides):
+            return ParameterGraph(parameters)
+        nodes = dict(self.nodes)
+        graph = ParameterGraph.__new__(ParameterGraph)
+        graph.parameters = parameters
+        for name, value in overrides.items():
+            nodes[name] = graph._compile(name, value)
+        graph.nodes = nodes
+        graph.order = graph._topological_order()
+        return graph
+
+    def evaluate(self, overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Evaluate every parameter in dependency order.
+
+        Args:
+            overrides (dict, optional): Parameter values to use instead of the
+                compiled ones, e.g. the swept values of one sweep run.
+
+        Returns:
+            dict: Resolved parameter values in declaration order.
+
+        Raises:
+            ParameterError: If an expression fails to evaluate.
+        """
+        graph = self.with_overrides(overrides) if overrides else self
+        namespace: Dict[str, Any] = {}
+        for name in graph.order:
+            try:
+                namespace[name] = graph.nodes[name].evaluate(namespace)
+            except Exception as exc:
+                raise ParameterError(
+                    f"Parameter '{name}' = {graph.parameters[name]!r} failed to evaluate: "
+                    f"{type(exc).__name__}: {exc}") from exc
+        return {name: namespace[name] for name in graph.parameters}
@@ -0,0 +1,82 @@
+"""
+Per-stage instrumentation of Component generation.
+
+GenerationProfiler times every generation stage, draw call and file write,
+records the peak Python heap while it ran (via tracemalloc) and collects the
+polygon and vertex counts the caller attaches to each record. The report is
+written as a JSON sidecar next to the GDS file, which sweep.py aggregates
+across runs.
+"""
+
+import contextlib
+import json
+import time
+import tracemalloc
+from typing import Any, Dict, Iterator, List
+
+
+PROFILE_SUFFIX = ".profile.json"
+
+
+class GenerationProfiler:
+    """
+    Collects timing, memory and geometry statistics for one Component.
+
+    tracemalloc is started on creation unless it is already running and is
+    stopped again by finish(). Tracing slows generation down noticeably, so
+    absolute times are only comparable between profiled runs.
+    """
+
+    def __init__(self) -> None:
+        self.stages: List[Dict[str, Any]] = []
+        self._owns_tracing = not tracemalloc.is_tracing()
+        if self._owns_tracing:
+            tracemalloc.start()
+        self._start = time.perf_counter()
+
+    @contextlib.contextmanager
+    def stage(self, name: str, kind: str) -> Iterator[Dict[str, Any]]:
+        """
+        Time a block and record its peak memory.
+
+        Parameters:
+            name (str): Stage name, e.g. "segments" or "write_gds".
+            kind (str): "generate", "check", "draw" or "write".
+
+        Yields:
+            dict: The stage record. Callers add counts such as "polygons" to it.
+        """
+        record: Dict[str, Any] = {"stage": name, "kind": kind}
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = time.perf_counter() - start
+            record["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+            self.stages.append(record)
+
+    def finish(self, **extra: Any) -> Dict[str, Any]:
+        """
+        Stop tracing and build the report.
+
+        Parameters:
+            **extra: Additional top-level report fields, e.g. the component name.
+
+        Returns:
+            dict: {"total_seconds", "peak_memory_bytes", "stages", **extra}.
+        """
+        peak = max((record["peak_memory_bytes"] for record in self.stages), default=0)
+        if self._owns_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        return {
+            **extra,
+            "total_seconds": time.perf_counter() - self._start,
+            "peak_memory_bytes": peak,
+            "stages": self.stages,
+        }
+
+    @staticmethod
+    def write(report: Dict[str, Any], path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
@@ -0,0 +1,354 @@
+"""
+Fast geometric rule checks of a generated layout.
+
+A sweep point with a too small spacing or an arm running into the guard ring
+only fails after an expensive EM simulation. RuleChecker catches such points
+right after generation. Rules are declared per layer in the artwork's layers
+block, next to the GDS numbers:
+
+    "M9": {
+        "gds": {"layer": 39, "datatype": 60},
+        "rules": {"minWidth": 2, "minSpacing": 2, "noOverlap": true}
+    },
+    "V8": {
+        "gds": {"layer": 58, "datatype": 40},
+        "rules": {"minSpacing": 0.54, "enclosure": {"M9": 0.1, "M8": 0.1}}
+    }
+
+Rule values may be parameter expressions. The checks are:
+
+- minWidth: the caliper width of every polygon, which is exact for the
+  convex pieces the generator emits, and the size of every via.
+- minSpacing: the distance between shapes that do not touch. Touching
+  shapes are parts of one conductor. Dummy fills are checked against
+  everything else, but not against each other.
+- noOverlap: conductors, bridges, arms and guard ring pieces on the layer
+  never overlap by more than the tolerance. Overlap here is the thickness of
+  their intersection, so pieces that only abut are accepted.
+- enclosure: every via of the layer lies inside a single shape of each
+  listed layer, with at least the given margin.
+
+Candidate pairs come from a SpatialIndex, and vias and fills are checked
+as whole arrays, so a layout is checked in milliseconds.
+"""
+
+import json
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import gdspy
+import numpy as np
+
+from geometry.Polygon import Polygon, points_in_polygon
+from geometry.SpatialIndex import SpatialIndex
+from geometry.ViaArray import ViaArray
+
+
+RULES_SUFFIX = ".rules.json"
+
+# Violations listed per rule and layer; the rest are only counted.
+MAX_REPORTED = 20
+
+LayerKey = Tuple[int, int]
+
+
+def caliper_widths(coords: np.ndarray) -> np.ndarray:
+    """
+    Minimum caliper width of polygons with the same number of vertices.
+
+    Parameters:
+        coords (ndarray): (K, n, 2) vertices.
+
+    Returns:
+        ndarray: (K,) the smallest extent of every polygon perpendicular to one of its edges.
+    """
+    edges = np.roll(coords, -1, axis=1) - coords
+    normals = np.stack((-edges[..., 1], edges[..., 0]), axis=-1)
+    lengths = np.linalg.norm(normals, axis=-1)
+    # (K, edge, vertex) distances of every vertex to the line through every edge.
+    offsets = coords[:, None, :, :] - coords[:, :, None, :]
+    distances = np.abs((offsets * normals[:, :, None, :]).sum(axis=-1)) / np.where(lengths > 0, lengths, 1.0)[..., None]
+    extents = np.where(lengths > 0, distances.max(axis=2), np.inf)
+    return extents.min(axis=1)
+
+
+def _vertex_edge_distances(points: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """
+    (K, n, m) distances from the n vertices to the m edges of K polygon pairs.
+    """
+    edges = (ends - starts)[:, None, :, :]
+    offsets = points[:, :, None, :] - starts[:, None, :, :]
+    lengths_squared = (edges ** 2).sum(axis=-1)
+    t = np.clip((offsets * edges).sum(axis=-1) / np.where(lengths_squared > 0, lengths_squared, 1.0), 0.0, 1.0)
+    return np.linalg.norm(offsets - t[..., None] * edges, axis=-1)
+
+
+def _first_vertex_inside(points: np.ndarray, polygons: np.ndarray) -> np.ndarray:
+    """
+    Even-odd test of one (K, 2) point per polygon against (K, n, 2) polygons.
+    """
+    x, y = points[:, 0:1], points[:, 1:2]
+    x1, y1 = polygons[..., 0], polygons[..., 1]
+    x2, y2 = np.roll(x1, -1, axis=1), np.roll(y1, -1, axis=1)
+    straddles = (y1 > y) != (y2 > y)
+    crossings = straddles & (x < (x2 - x1) * (y - y1) / np.where(straddles, y2 - y1, 1.0) + x1)
+    return np.count_nonzero(crossings, axis=1) % 2 == 1
+
+
+def _pair_gaps(first: np.ndarray, second: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Distances between K polygon pairs with equal vertex counts per side.
+
+    Parameters:
+        first (ndarray): (K, n, 2) vertices.
+        second (ndarray): (K, m, 2) vertices.
+
+    Returns:
+        tuple: (gaps, overlapping). gaps is 0 for pairs that touch or
+        overlap; overlapping is True where the interiors may overlap, i.e.
+        edges cross properly or one polygon lies inside the other.
+    """
+    first_next = np.roll(first, -1, axis=1)
+    second_next = np.roll(second, -1, axis=1)
+    gaps = np.minimum(_vertex_edge_distances(first, second, second_next).min(axis=(1, 2)),
+                      _vertex_edge_distances(second, first, first_next).min(axis=(1, 2)))
+
+    def side(p: np.ndarray, q: np.ndarray, r: np.ndarray) -> np.ndarray:
+        return np.sign((q[..., 0] - p[..., 0]) * (r[..., 1] - p[..., 1]) - (q[..., 1] - p[..., 1]) * (r[..., 0] - p[..., 0]))
+
+    # (K, n, m) proper crossings of every edge of the first polygon with every edge of the second.
+    p, p_next = first[:, :, None, :], first_next[:, :, None, :]
+    q, q_next = second[:, None, :, :], second_next[:, None, :, :]
+    crossing = ((side(p, p_next, q) * side(p, p_next, q_next) < 0) &
+                (side(q, q_next, p) * side(q, q_next, p_next) < 0)).any(axis=(1, 2))
+    overlapping = (crossing | _first_vertex_inside(first[:, 0], second) |
+                   _first_vertex_inside(second[:, 0], first))
+    return np.where(overlapping, 0.0, gaps), overlapping
+
+
+def _gaps(pairs: Sequence[Tuple[Polygon, Polygon]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    _pair_gaps of any polygon pairs, batched by vertex counts.
+    """
+    gaps = np.zeros(len(pairs))
+    overlapping = np.zeros(len(pairs), dtype=bool)
+    batches: Dict[Tuple[int, int], List[int]] = {}
+    for index, (a, b) in enumerate(pairs):
+        batches.setdefault((len(a), len(b)), []).append(index)
+    for indices in batches.values():
+        gaps[indices], overlapping[indices] = _pair_gaps(np.stack([pairs[i][0].coords for i in indices]),
+                                                         np.stack([pairs[i][1].coords for i in indices]))
+    return gaps, overlapping
+
+
+def _overlap_thickness(a: Polygon, b: Polygon) -> float:
+    overlap = gdspy.boolean(gdspy.Polygon(a.coords), gdspy.Polygon(b.coords), "and")
+    if overlap is None:
+        return 0.0
+    return max((float(caliper_widths(points[None])[0]) for points in overlap.polygons), default=0.0)
+
+
+def _via_outline(vias: ViaArray) -> Polygon:
+    corners = vias.corners().reshape(-1, 2)
+    min_x, min_y = corners.min(axis=0).tolist()
+    max_x, max_y = corners.max(axis=0).tolist()
+    return Polygon([(min_x, min_y), (max_x, min_y), (max_x, max_y), (min_x, max_y)],
+                   vias.gds_layer, vias.gds_datatype)
+
+
+class RuleChecker:
+    """
+    Checks generated items against the rules of an artwork's layers block.
+
+    Parameters:
+        layers (dict): The artwork's layers block.
+        resolve (callable): Resolves a rule value or GDS number that may be a parameter expression.
+        tolerance (float): Violations smaller than this are ignored, usually
+            the layout grid, so rounding to the grid is never reported.
+    """
+
+    def __init__(self, layers: dict, resolve: Callable[[Any], Any] = lambda value: value,
+                 tolerance: float = 0.0) -> None:
+        self.layers = layers
+        self.tolerance = tolerance
+        self.names: Dict[LayerKey, str] = {}
+        self.rules: Dict[LayerKey, Dict[str, Any]] = {}
+
+        def gds_key(gds: dict) -> LayerKey:
+            # Resolved as the generator resolves them, so the keys match the drawn polygons.
+            return resolve(gds["layer"]), resolve(gds["datatype"])
+
+        for name, layer in layers.items():
+            key = gds_key(layer["gds"])
+            self.names.setdefault(key, name)
+            # Report under the name the rules are declared for, not an alias such as DEFAULT.
+            if "rules" in layer and key not in self.rules:
+                self.names[key] = name
+            for rule, value in layer.get("rules", {}).items():
+                merged = self.rules.setdefault(key, {})
+                if rule == "enclosure":
+                    enclosure = merged.setdefault("enclosure", {})
+                    for other, margin in value.items():
+                        other_key = gds_key(layers[other]["gds"])
+                        enclosure[other_key] = max(enclosure.get(other_key, 0.0), float(resolve(margin)))
+                elif rule == "noOverlap":
+                    merged[rule] = merged.get(rule, False) or bool(value)
+                else:
+                    # Layer names sharing GDS numbers get the strictest value.
+                    merged[rule] = max(merged.get(rule, 0.0), float(resolve(value)))
+        self._violations: List[Dict[str, Any]] = []
+        self._counts: Dict[str, int] = {}
+
+    def check(self, conductors: Sequence[Polygon], pads: Sequence[Polygon] = (),
+              vias: Sequence[ViaArray] = (), fills: Sequence[Polygon] = ()) -> Dict[str, Any]:
+        """
+        Run every declared rule.
+
+        Parameters:
+            conductors (sequence of Polygon): Segments, bridges, arms and guard
+                ring pieces, the shapes the noOverlap rule applies to.
+            pads (sequence of Polygon): Via stack pads, which overlap the
+                conductors they sit on by design.
+            vias (sequence of ViaArray): The via arrays.
+            fills (sequence of Polygon): Dummy fill polygons.
+
+        Returns:
+            dict: {"passed", "counts", "violations"}. counts maps "rule:layer"
+            to the number of violations; violations lists up to MAX_REPORTED
+            of them per rule and layer as {"rule", "layer", "limit", "value", "location"}.
+        """
+        self._violations = []
+        self._counts = {}
+        vias = [array for array in vias if len(array)]
+        if self.rules:
+            self._check_widths(list(conductors) + list(pads) + list(fills), vias)
+            self._check_spacing_and_overlap(conductors, pads, vias, fills)
+            self._check_enclosure(list(conductors) + list(pads), vias)
+        return {"passed": not self._counts, "counts": self._counts, "violations": self._violations}
+
+    def _report(self, rule: str, key: LayerKey, limit: Any, value: Optional[float],
+                location: Iterable[float]) -> None:
+        name = f"{rule}:{self.names.get(key, '%d/%d' % key)}"
+        self._counts[name] = self._counts.get(name, 0) + 1
+        if self._counts[name] <= MAX_REPORTED:
+            x, y = location
+            self._violations.append({
+                "rule": rule,
+                "layer": self.names.get(key, "%d/%d" % key),
+                "limit": limit,
+                "value": None if value is None else round(float(value), 6),
+                "location": [round(float(x), 6), round(float(y), 6)],
+            })
+
+    def _check_widths(self, polygons: List[Polygon], vias: List[ViaArray]) -> None:
+        by_shape: Dict[Tuple[LayerKey, int], List[Polygon]] = {}
+        for polygon in polygons:
+            key = (polygon.gds_layer, polygon.gds_datatype)
+            if "minWidth" in self.rules.get(key, {}):
+                by_shape.setdefault((key, len(polygon)), []).append(polygon)
+        for (key, _), group in by_shape.items():
+            limit = self.rules[key]["minWidth"]
+            widths = caliper_widths(np.stack([polygon.coords for polygon in group]))
+            for index in np.flatnonzero(widths < limit - self.tolerance).tolist():
+                centre = group[index].midpoint()
+                self._report("minWidth", key, limit, widths[index], (centre.x, centre.y))
+
+        for array in vias:
+            key = (array.gds_layer, array.gds_datatype)
+            limit = self.rules.get(key, {}).get("minWidth")
+            if limit is not None and min(array.length, array.width) < limit - self.tolerance:
+                for x, y in array.centres()[:MAX_REPORTED].tolist():
+                    self._report("minWidth", key, limit, min(array.length, array.width), (x, y))
+
+    def _check_spacing_and_overlap(self, conductors: Sequence[Polygon], pads: Sequence[Polygon],
+                                   vias: List[ViaArray], fills: Sequence[Polygon]) -> None:
+        def checked(polygon: Polygon) -> bool:
+            rules = self.rules.get((polygon.gds_layer, polygon.gds_datatype), {})
+            return "minSpacing" in rules or rules.get("noOverlap", False)
+
+        # Each via array takes part as the rectangle around its vias.
+        shapes = [polygon for polygon in list(conductors) + list(pads) if checked(polygon)]
+        shapes += [_via_outline(array) for array in vias if checked(array)]
+        conductor_ids = {id(polygon) for polygon in conductors}
+        order = {id(shape): index for index, shape in enumerate(shapes)}
+        index = SpatialIndex(shapes)
+        fill_index = SpatialIndex(polygon for polygon in fills if checked(polygon))
+
+        pairs: List[Tuple[Polygon, Polygon]] = []
+        fill_pairs: List[Tuple[Polygon, Polygon]] = []
+        for shape in shapes:
+            spacing = self.rules[(shape.gds_layer, shape.gds_datatype)].get("minSpacing", 0.0)
+            pairs += [(shape, other) for other in index.query(shape, spacing) if order[id(other)] > order[id(shape)]]
+            if spacing:
+                fill_pairs += [(shape, fill) for fill in fill_index.query(shape, spacing)]
+
+        gaps, overlapping = _gaps(pairs)
+        for (shape, other), gap, overlaps in zip(pairs, gaps.tolist(), overlapping.tolist()):
+            key = (shape.gds_layer, shape.gds_datatype)
+            rules = self.rules[key]
+            centre = shape.midpoint()
+            # Shapes closer than the tolerance are parts of one conductor.
+            if gap <= self.tolerance:
+                if (overlaps and rules.get("noOverlap", False)
+                        and id(shape) in conductor_ids and id(other) in conductor_ids):
+                    thickness = _overlap_thickness(shape, other)
+                    if thickness > self.tolerance:
+                        self._report("noOverlap", key, 0.0, thickness, (centre.x, centre.y))
+            elif gap < rules.get("minSpacing", 0.0) - self.tolerance:
+                self._report("minSpacing", key, rules["minSpacing"], gap, (centre.x, centre.y))
+
+        # A fill touching a conductor shorts it, which is reported as zero spacing.
+        gaps, _ = _gaps(fill_pairs)
+        for (shape, fill), gap in zip(fill_pairs, gaps.tolist()):
+            key = (shape.gds_layer, shape.gds_datatype)
+            spacing = self.rules[key]["minSpacing"]
+            if gap < spacing - self.tolerance:
+                centre = fill.midpoint()
+                self._report("minSpacing", key, spacing, 0.0 if gap <= self.tolerance else gap, (centre.x, centre.y))
+
+        # Vias within an array are one pitch apart.
+        for array in vias:
+            key = (array.gds_layer, array.gds_datatype)
+            spacing = self.rules.get(key, {}).get("minSpacing")
+            if spacing is None or len(array) < 2:
+                continue
+            gaps = []
+            if len(np.unique(array.indices[:, 1])) > 1:
+                gaps.append(array.pitch[0] - array.length)
+            if len(np.unique(array.indices[:, 0])) > 1:
+                gaps.append(array.pitch[1] - array.width)
+            if gaps and min(gaps) < spacing - self.tolerance:
+                x, y = array.centres()[0].tolist()
+                self._report("minSpacing", key, spacing, min(gaps), (x, y))
+
+    def _check_enclosure(self, hosts: List[Polygon], vias: List[ViaArray]) -> None:
+        index = SpatialIndex(hosts)
+        for array in vias:
+            key = (array.gds_layer, array.gds_datatype)
+            for host_key, margin in self.rules.get(key, {}).get("enclosure", {}).items():
+                grow = 2.0 * max(margin - self.tolerance, 0.0)
+                grown = ViaArray(array.origin, array.pitch, array.length + grow, array.width + grow,
+                                 array.angle, array.indices)
+                corners = grown.corners()
+                enclosed = np.zeros(len(array), dtype=bool)
+                for host in index.query(_via_outline(grown), 0, layer=host_key):
+                    enclosed |= points_in_polygon(corners.reshape(-1, 2), host.coords).reshape(-1, 4).all(axis=1)
+                centres = array.centres()
+                for via in np.flatnonzero(~enclosed).tolist():
+                    self._report("enclosure:" + self.names.get(host_key, "%d/%d" % host_key), key, margin, None,
+                                 centres[via])
+
+
+def write_report(report: Dict[str, Any], path: str) -> None:
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+def read_report(path: str) -> Optional[Dict[str, Any]]:
+    """
+    Load a report written by write_report, or None if there is none.
+    """
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
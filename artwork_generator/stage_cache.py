@@ -0,0 +1,188 @@
+"""
+Memoization of Component generation stages.
+
+A sweep usually changes a few parameters per run, and most generation stages
+(segments, bridges, arms, guard ring, ...) only read some of them. Component
+derives a key for every stage from the JSON subtrees and resolved parameters
+that stage reads; StageCache maps those keys to the items the stage produced,
+so a run only recomputes the stages whose inputs changed.
+
+Entries live in an in-memory LRU and, when a directory is given, are also
+pickled to disk so later processes (e.g. a resumed sweep) can reuse them.
+The directory is capped like OutputCache's: the modification time of a
+pickle is its last use, and when the pickles grow beyond max_bytes the least
+recently used ones are removed.
+"""
+
+import glob
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+
+def _code_fingerprint() -> str:
+    """
+    Hash of the generator sources, so cached stages are never reused across code changes.
+    """
+    root = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(root, "*.py")) + glob.glob(os.path.join(root, "geometry", "*.py"))):
+        with open(path, "rb") as f:
+            digest.update(os.path.basename(path).encode())
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+CODE_FINGERPRINT = _code_fingerprint()
+
+DEFAULT_MAX_BYTES = 1024 ** 3
+
+
+def stage_key(stage: str, *inputs: Any) -> str:
+    """
+    Build a cache key from a stage name and the JSON-serializable inputs it reads.
+    """
+    payload = json.dumps([CODE_FINGERPRINT, stage, inputs], sort_keys=True, default=repr)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class StageCache:
+    """
+    LRU cache of generation stage outputs with optional on-disk persistence.
+
+    Parameters:
+        max_entries (int): Number of stage outputs kept in memory.
+        directory (str, optional): Directory to persist entries in. Entries
+            evicted from memory stay available on disk.
+        max_bytes (int): Total size of the pickles kept in directory. The
+            least recently used ones are removed once it is exceeded.
+    """
+
+    def __init__(self, max_entries: int = 256, directory: Optional[str] = None,
+                 max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Return the stored value for key, or None when it is not cached.
+        """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self._touch(key)
+            self.hits += 1
+            return self._entries[key]
+
+        if self.directory and os.path.exists(self._path(key)):
+            try:
+                with open(self._path(key), "rb") as f:
+                    value = pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError, AttributeError) as e:
+                logging.warning("Ignoring unreadable stage cache entry %s: %s", key, e)
+            else:
+                self._remember(key, value)
+                self._touch(key)
+                self.hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    def put(self, key: str, value: Any) -> None:
+        """
+        Store value under key in memory and, if enabled, on disk.
+        """
+        self._remember(key, value)
+        if self.directory:
+            # Write then rename so concurrent sweep workers never read a partial file.
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, self._path(key))
+            except OSError as e:
+                logging.warning("Could not persist stage cache entry %s: %s", key, e)
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            self.evict()
+
+    def clear(self) -> None:
+        """
+        Drop every in-memory entry. Persisted entries are left on disk.
+        """
+        self._entries.clear()
+
+    def size(self) -> int:
+        """
+        Total size of the persisted entries in bytes.
+        """
+        return sum(size for _, size in self._files().values())
+
+    def evict(self) -> None:
+        """
+        Remove least recently used pickles until the directory fits in max_bytes.
+        """
+        if not self.directory:
+            return
+        files = self._files()
+        total = sum(size for _, size in files.values())
+        for key in sorted(files, key=lambda k: files[k][0]):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+            total -= files[key][1]
+            logging.debug("Evicted stage cache entry %s", key)
+
+    def _touch(self, key: str) -> None:
+        """
+        Mark a persisted entry as recently used for eviction.
+        """
+        if self.directory:
+            try:
+                os.utime(self._path(key))
+            except OSError:
+                # Evicted by another process; it is written again on the next put.
+                pass
+
+    def _files(self) -> Dict[str, List[float]]:
+        """
+        Key -> [last use, size] of every pickle on disk.
+        """
+        files: Dict[str, List[float]] = {}
+        with os.scandir(self.directory) as it:
+            for dir_entry in it:
+                key, suffix = os.path.splitext(dir_entry.name)
+                if suffix != ".pkl":
+                    continue
+                try:
+                    stat = dir_entry.stat()
+                except FileNotFoundError:
+                    continue
+                files[key] = [stat.st_mtime, stat.st_size]
+        return files
+
+    def _remember(self, key: str, value: Any) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -0,0 +1,141 @@
+"""
+Level-of-detail SVG previews.
+
+gdspy writes one <polygon> element per shape, so a layout with tens of
+thousands of via cuts and dummy fills becomes a multi-megabyte SVG. A preview
+only needs to show where things are: write_preview_svg draws all solid
+polygons of a layer as a single <path> and draws via arrays and fill bands
+as outlined, hatched regions, again one <path> per layer. Layer colours,
+background, padding and the y-axis orientation follow gdspy's write_svg, so
+a preview looks like the full-detail SVG at a glance.
+"""
+
+import colorsys
+from html import escape
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+
+# (coords, layer, datatype) of one polygon; coords is an (N, 2) array in user units.
+Shape = Tuple[np.ndarray, int, int]
+# (text, (x, y), layer, texttype, magnification) of one label.
+Label = Tuple[str, Tuple[float, float], int, int, float]
+
+# Hatch lines across the preview's larger dimension.
+HATCH_LINES = 200
+
+
+def layer_color(layer: int, datatype: int) -> str:
+    """
+    The colour gdspy's write_svg gives a layer/datatype (or layer/texttype) pair.
+    """
+    rgb = colorsys.hsv_to_rgb(
+        (layer % 3) / 3.0 + (layer % 6 // 3) / 6.0 + (layer // 6) / 11.0,
+        1 - ((layer + datatype) % 8) / 12.0,
+        1 - (datatype % 3) / 4.0,
+    )
+    return "rgb({}, {}, {})".format(*[int(255 * c + 0.5) for c in rgb])
+
+
+def _path_data(polygons: Sequence[np.ndarray], scaling: float) -> str:
+    """
+    One SVG path string for many closed polygons, with the y axis pointing up.
+
+    Every polygon is written with the same orientation, so overlapping
+    polygons add up under the nonzero fill rule instead of cutting holes.
+    All vertices are oriented and formatted in one NumPy pass.
+    """
+    lengths = np.array([len(coords) for coords in polygons])
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    coords = np.concatenate(polygons).astype(np.float64)
+
+    # Index of the next vertex of each vertex's own polygon.
+    polygon_of = np.repeat(np.arange(len(lengths)), lengths)
+    position = np.arange(len(coords)) - starts[polygon_of]
+    following = starts[polygon_of] + (position + 1) % lengths[polygon_of]
+    x, y = coords[:, 0], coords[:, 1]
+    area = np.add.reduceat(x * y[following] - y * x[following], starts)
+    # Clockwise polygons are read backwards.
+    reverse = (area < 0)[polygon_of]
+    order = np.where(reverse, starts[polygon_of] + lengths[polygon_of] - 1 - position, np.arange(len(coords)))
+
+    points = np.char.mod("%.2f", coords[order] * (scaling, -scaling)).tolist()
+    pairs = [f"{px} {py}" for px, py in points]
+    parts = []
+    for start, length in zip(starts.tolist(), lengths.tolist()):
+        parts.append(f"M{pairs[start]}L{' '.join(pairs[start + 1:start + length])}Z")
+    return "".join(parts)
+
+
+def _group(shapes: Iterable[Shape]) -> Dict[Tuple[int, int], List[np.ndarray]]:
+    grouped: Dict[Tuple[int, int], List[np.ndarray]] = {}
+    for coords, layer, datatype in shapes:
+        grouped.setdefault((layer, datatype), []).append(coords)
+    return grouped
+
+
+def write_preview_svg(path: str, polygons: Sequence[Shape], regions: Sequence[Shape] = (),
+                      labels: Sequence[Label] = (), scaling: float = 10, background: str = "#222",
+                      pad: float = 0.05) -> None:
+    """
+    Write a level-of-detail SVG preview.
+
+    Parameters:
+        path (str): The SVG file to write.
+        polygons (sequence): (coords, layer, datatype) of the solid shapes.
+        regions (sequence): (coords, layer, datatype) of the outlines drawn
+            hatched instead of filled, e.g. via arrays and dummy-fill bands.
+        labels (sequence): (text, (x, y), layer, texttype, magnification) of the labels.
+        scaling (float): SVG units per user unit, as in gdspy's write_svg.
+        background (str): Background colour, or None for none.
+        pad (float): Margin around the bounding box, as a fraction of its larger side.
+    """
+    solid = _group(polygons)
+    hatched = _group(regions)
+    coords = [c for group in (solid, hatched) for shapes in group.values() for c in shapes]
+    if not coords:
+        return
+    all_points = np.concatenate(coords) * scaling
+    (min_x, min_y), (max_x, max_y) = all_points.min(axis=0), all_points.max(axis=0)
+    margin = max(max_x - min_x, max_y - min_y) * pad
+    x, y = min_x - margin, -max_y - margin
+    w, h = max_x - min_x + 2 * margin, max_y - min_y + 2 * margin
+    hatch = max(w, h) / HATCH_LINES
+
+    out = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink"\n'
+        f'     width="{w:.2f}" height="{h:.2f}" viewBox="{x:.2f} {y:.2f} {w:.2f} {h:.2f}">\n'
+        "<defs>\n<style type=\"text/css\">\n"
+    ]
+    for layer, datatype in sorted(set(solid) | set(hatched)):
+        color = layer_color(layer, datatype)
+        out.append(f".l{layer}d{datatype} {{stroke: {color}; fill: {color}; fill-opacity: 0.5;}}\n")
+    for layer, texttype in sorted({(label[2], label[3]) for label in labels}):
+        out.append(f".l{layer}t{texttype} {{stroke: none; fill: {layer_color(layer, texttype)};}}\n")
+    out.append("</style>\n")
+    for layer, datatype in sorted(hatched):
+        out.append(
+            f'<pattern id="hatch_l{layer}d{datatype}" patternUnits="userSpaceOnUse" '
+            f'width="{hatch:.2f}" height="{hatch:.2f}" patternTransform="rotate(45)">'
+            f'<line class="l{layer}d{datatype}" x1="0" y1="0" x2="0" y2="{hatch:.2f}" '
+            f'stroke-width="{hatch / 4:.2f}"/></pattern>\n')
+    out.append("</defs>\n")
+    if background is not None:
+        out.append(f'<rect x="{x:.2f}" y="{y:.2f}" width="{w:.2f}" height="{h:.2f}" '
+                   f'fill="{background}" stroke="none"/>\n')
+
+    for (layer, datatype), shapes in solid.items():
+        out.append(f'<path class="l{layer}d{datatype}" d="{_path_data(shapes, scaling)}"/>\n')
+    for (layer, datatype), shapes in hatched.items():
+        out.append(f'<path class="l{layer}d{datatype}" style="fill: url(#hatch_l{layer}d{datatype}); '
+                   f'fill-opacity: 1;" d="{_path_data(shapes, scaling)}"/>\n')
+    for text, (label_x, label_y), layer, texttype, magnification in labels:
+        out.append(f'<text class="l{layer}t{texttype}" text-anchor="middle" dominant-baseline="central" '
+                   f'transform="translate({label_x * scaling:.2f} {-label_y * scaling:.2f}) '
+                   f'scale({magnification})">{escape(text)}</text>\n')
+    out.append("</svg>")
+
+    with open(path, "w") as f:
+        f.write("".join(out))
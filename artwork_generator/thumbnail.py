@@ -0,0 +1,203 @@
+"""
+PNG thumbnails of generated layouts.
+
+A sweep gallery only needs a small picture of every run, and opening the
+full SVGs of thousands of runs is slow. render_thumbnail rasterizes the
+polygons of each layer straight from their coordinate arrays with a
+vectorized scanline fill: the crossings of every polygon edge with every
+pixel row are computed in one NumPy pass, sorted into spans and filled
+through a running sum. Layers are blended over the background in layer
+order, and write_png encodes the result without any imaging library.
+"""
+
+import re
+import struct
+import zlib
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from svg_preview import Shape, layer_color
+
+
+DEFAULT_THUMBNAIL_SIZE = 256
+DEFAULT_BACKGROUND = "#222"
+# Opacity each layer is blended with, as the fill-opacity of gdspy's SVG output.
+LAYER_OPACITY = 0.5
+
+RGB = Tuple[int, int, int]
+
+_RGB_FUNCTION = re.compile(r"rgb\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*\)")
+
+
+def parse_color(color: Union[str, Sequence[int]]) -> RGB:
+    """
+    Parse "#rgb", "#rrggbb", "rgb(r, g, b)" or an (r, g, b) sequence.
+
+    Raises:
+        ValueError: If the colour cannot be parsed.
+    """
+    if not isinstance(color, str):
+        r, g, b = (int(c) for c in color)
+        return r, g, b
+    text = color.strip()
+    match = _RGB_FUNCTION.fullmatch(text)
+    if match:
+        r, g, b = (int(c) for c in match.groups())
+        return r, g, b
+    if re.fullmatch(r"#[0-9a-fA-F]{3}", text):
+        return tuple(int(c * 2, 16) for c in text[1:])
+    if re.fullmatch(r"#[0-9a-fA-F]{6}", text):
+        return tuple(int(text[i:i + 2], 16) for i in (1, 3, 5))
+    raise ValueError(f"Invalid colour: {color!r}")
+
+
+def resolve_color_map(color_map: Optional[Dict[str, Union[str, Sequence[int]]]],
+                      layers: Optional[dict] = None) -> Dict[Tuple[int, int], RGB]:
+    """
+    Turn a user colour map into (layer, datatype) -> RGB.
+
+    Parameters:
+        color_map (dict, optional): Colours keyed by layer name from the
+            artwork's layers block (e.g. "M9") or by "layer/datatype" (e.g. "39/60").
+        layers (dict, optional): The artwork's layers block.
+
+    Raises:
+        ValueError: If a key is neither a known layer name nor "layer/datatype".
+    """
+    resolved: Dict[Tuple[int, int], RGB] = {}
+    for key, color in (color_map or {}).items():
+        if layers and key in layers:
+            gds = layers[key]["gds"]
+            resolved[(gds["layer"], gds["datatype"])] = parse_color(color)
+            continue
+        match = re.fullmatch(r"\s*(\d+)\s*/\s*(\d+)\s*", str(key))
+        if not match:
+            raise ValueError(f"Thumbnail colour key {key!r} is neither a layer name nor 'layer/datatype'")
+        resolved[(int(match.group(1)), int(match.group(2)))] = parse_color(color)
+    return resolved
+
+
+def rasterize(polygons: Sequence[np.ndarray], width: int, height: int) -> np.ndarray:
+    """
+    Scanline-fill polygons given in pixel coordinates.
+
+    A pixel is covered when its centre lies inside any of the polygons. Each
+    polygon is filled by the even-odd rule on its own, and the polygons are
+    combined by union.
+
+    Parameters:
+        polygons (sequence of ndarray): (n, 2) vertices, x to the right and y down.
+        width (int): Image width in pixels.
+        height (int): Image height in pixels.
+
+    Returns:
+        ndarray: (height, width) boolean coverage mask.
+    """
+    if len(polygons) == 0:
+        return np.zeros((height, width), dtype=bool)
+    lengths = np.array([len(coords) for coords in polygons])
+    return _rasterize_points(np.concatenate(polygons).astype(np.float64), lengths, width, height)
+
+
+def _rasterize_points(points: np.ndarray, lengths: np.ndarray, width: int, height: int) -> np.ndarray:
+    """
+    Like rasterize, for the concatenated vertices of polygons with the given vertex counts.
+    """
+    mask = np.zeros((height, width), dtype=bool)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    polygon_of = np.repeat(np.arange(len(lengths)), lengths)
+    following = starts[polygon_of] + (np.arange(len(points)) - starts[polygon_of] + 1) % lengths[polygon_of]
+
+    x0, y0 = points[:, 0], points[:, 1]
+    x1, y1 = points[following, 0], points[following, 1]
+
+    # Rows whose centre y + 0.5 lies in [min(y0, y1), max(y0, y1)); horizontal edges cross none.
+    first_row = np.clip(np.ceil(np.minimum(y0, y1) - 0.5), 0, height).astype(np.int64)
+    end_row = np.clip(np.ceil(np.maximum(y0, y1) - 0.5), 0, height).astype(np.int64)
+    counts = np.maximum(end_row - first_row, 0)
+    total = int(counts.sum())
+    if total == 0:
+        return mask
+
+    edge = np.repeat(np.arange(len(points)), counts)
+    row = first_row[edge] + np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    slope = (x1[edge] - x0[edge]) / (y1[edge] - y0[edge])
+    crossing = x0[edge] + (row + 0.5 - y0[edge]) * slope
+
+    # Every polygon crosses every row an even number of times, so after
+    # sorting by polygon, row and x the crossings pair up into spans.
+    order = np.lexsort((crossing, row, polygon_of[edge]))
+    crossing = crossing[order]
+    row = row[order][0::2]
+    span_start = np.clip(np.ceil(crossing[0::2] - 0.5), 0, width).astype(np.int64)
+    span_end = np.clip(np.ceil(crossing[1::2] - 0.5), 0, width).astype(np.int64)
+    filled = span_end > span_start
+
+    coverage = np.zeros((height, width + 1), dtype=np.int32)
+    np.add.at(coverage, (row[filled], span_start[filled]), 1)
+    np.add.at(coverage, (row[filled], span_end[filled]), -1)
+    return np.cumsum(coverage, axis=1)[:, :width] > 0
+
+
+def render_thumbnail(shapes: Sequence[Shape], size: int = DEFAULT_THUMBNAIL_SIZE,
+                     colors: Optional[Dict[Tuple[int, int], RGB]] = None,
+                     background: Union[str, Sequence[int]] = DEFAULT_BACKGROUND) -> np.ndarray:
+    """
+    Rasterize a layout into an RGB image.
+
+    Parameters:
+        shapes (sequence): (coords, layer, datatype) of every polygon, in user units.
+        size (int): Pixels along the longer side of the layout's bounding box.
+        colors (dict, optional): (layer, datatype) -> RGB. Layers without an
+            entry get the colour gdspy's SVG output gives them.
+        background: Background colour.
+
+    Returns:
+        ndarray: (height, width, 3) uint8 image, y pointing up as in the layout.
+    """
+    colors = colors or {}
+    image = np.empty((1, 1, 3), dtype=np.float64)
+    image[:] = parse_color(background)
+    if not shapes:
+        return image.astype(np.uint8)
+
+    by_layer: Dict[Tuple[int, int], list] = {}
+    for coords, layer, datatype in shapes:
+        by_layer.setdefault((layer, datatype), []).append(coords)
+    layer_points = {key: (np.concatenate(polygons).astype(np.float64), np.array([len(c) for c in polygons]))
+                    for key, polygons in by_layer.items()}
+
+    low = np.min([points.min(axis=0) for points, _ in layer_points.values()], axis=0)
+    high = np.max([points.max(axis=0) for points, _ in layer_points.values()], axis=0)
+    extent = high - low
+    scale = (size - 1) / max(extent.max(), 1e-12)
+    width, height = (np.ceil(extent * scale).astype(int) + 1).tolist()
+    image = np.broadcast_to(image, (height, width, 3)).copy()
+
+    for key in sorted(layer_points):
+        points, lengths = layer_points[key]
+        # Pixel coordinates: x to the right, y down from the top of the bounding box.
+        mask = _rasterize_points((points - (low[0], high[1])) * (scale, -scale) + 0.5, lengths, width, height)
+        color = np.array(colors.get(key) or parse_color(layer_color(*key)), dtype=np.float64)
+        image[mask] += LAYER_OPACITY * (color - image[mask])
+    return np.rint(image).astype(np.uint8)
+
+
+def write_png(path: str, image: np.ndarray) -> None:
+    """
+    Write an (height, width, 3) uint8 image as an 8-bit RGB PNG.
+    """
+    height, width, _ = image.shape
+    # Every scanline starts with filter type 0 (none).
+    raw = np.zeros((height, 1 + 3 * width), dtype=np.uint8)
+    raw[:, 1:] = image.reshape(height, 3 * width)
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">2I5B", width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)))
+        f.write(chunk(b"IEND", b""))
@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the artwork generator.
+
+Behavior:
+- Generates every template under artwork_library/ at several scales:
+    - base:  the template as stored
+    - large: two extra turns, twice the via density, 1.5x guard ring distance
+    - xl:    four extra turns, four times the via density, 2x guard ring distance
+- Times each case (best of --repeat runs) and profiles one extra run for
+  peak memory and per-stage times
+- Writes a machine-readable JSON report:
+    {
+      "meta": {...},
+      "cases": {
+        "<template>@<scale>": {
+          "status": "ok" | "error",
+          "seconds", "peak_memory_bytes", "polygons", "vertices",
+          "references", "gds_bytes", "stages": {...}
+        }
+      }
+    }
+- Optionally compares the report against a stored baseline and exits with
+  status 1 when a case got slower or larger than the tolerance allows
+- Optionally (--verify-stream) writes every case with both gdspy and the
+  streaming GDS writer and exits with status 1 unless the two files are
+  byte-for-byte identical apart from their timestamps
+- Optionally (--verify-hierarchical) writes every case flat and
+  hierarchical and exits with status 1 unless the flattened hierarchical
+  layout XORs to nothing against the flat one on every layer
+
+Everything runs in-process and offline; only the packages the generator
+itself needs are used.
+"""
+
+import argparse
+import copy
+import glob
+import json
+import logging
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import gdspy
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+LIBRARY_DIR = REPO_ROOT / "artwork_library"
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+sys.path.insert(0, str(REPO_ROOT / "artwork_generator"))
+from artwork_generator import Component  # noqa: E402
+from gds_stream import normalize_timestamps  # noqa: E402
+
+# Scale name -> (extra rings, via density factor, guard ring distance factor)
+SCALES = {
+    "base": (0, 1.0, 1.0),
+    "large": (2, 2.0, 1.5),
+    "xl": (4, 4.0, 2.0),
+}
+
+# Metrics that must not grow by more than the tolerance, and metrics that are
+# expected to be reproduced exactly for unchanged generator logic.
+TIMED_METRICS = ("seconds", "peak_memory_bytes")
+EXACT_METRICS = ("polygons", "vertices", "references", "gds_bytes")
+
+# Precision of the per-layer XOR of --verify-hierarchical, well below the layout grid.
+XOR_PRECISION = 1e-4
+
+
+logger = logging.getLogger("benchmark")
+logger.setLevel(logging.INFO)
+logger.propagate = False
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s [BENCH] %(levelname)s - %(message)s"))
+    logger.addHandler(handler)
+
+
+# ------------------------------------------------------------------------------
+# Template scaling
+# ------------------------------------------------------------------------------
+def _scale_value(value, factor):
+    """
+    Multiply a numeric parameter field, or wrap an expression field, by factor.
+    """
+    if factor == 1.0:
+        return value
+    if isinstance(value, (int, float)):
+        return value * factor
+    return f"({value}) * {factor}"
+
+
+def scale_artwork(artwork, extra_rings=0, via_density=1.0, guard_ring_factor=1.0):
+    """
+    Return a copy of an artwork made larger along the benchmark axes.
+
+    Parameters:
+        artwork (dict): The template.
+        extra_rings (int): Turns added on the inside of every segment group,
+            so existing bridge jumps keep their meaning.
+        via_density (float): Factor by which via pitch area shrinks.
+        guard_ring_factor (float): Factor applied to the guard ring distance.
+    """
+    scaled = copy.deepcopy(artwork)
+
+    if extra_rings:
+        scaled["parameters"]["rings"] = scaled["parameters"]["rings"] + extra_rings
+        for seg_def in scaled["segments"]["data"].values():
+            layer = seg_def["group"][0]["data"]["layer"]
+            inner = [{"type": "DEFAULT", "data": {"layer": layer}} for _ in range(extra_rings)]
+            seg_def["group"] = inner + seg_def["group"]
+
+    if via_density != 1.0:
+        # Vias per area scale with 1/pitch^2; shrink the spacing accordingly.
+        pitch_factor = 1.0 / math.sqrt(via_density)
+        for via in scaled["via"].values():
+            if isinstance(via["spacing"], (int, float)) and isinstance(via["length"], (int, float)):
+                via["spacing"] = max((via["length"] + via["spacing"]) * pitch_factor - via["length"],
+                                     via["spacing"] / via_density)
+            else:
+                via["spacing"] = _scale_value(via["spacing"], 1.0 / via_density)
+
+    if guard_ring_factor != 1.0:
+        guard_ring = scaled["guardRing"]["data"]
+        guard_ring["distance"] = _scale_value(guard_ring["distance"], guard_ring_factor)
+
+    return scaled
+
+
+def discover_templates(library_dir=LIBRARY_DIR, names=None):
+    paths = sorted(glob.glob(os.path.join(library_dir, "**", "*.json"), recursive=True))
+    templates = {Path(p).stem: p for p in paths}
+    if names:
+        templates = {name: path for name, path in templates.items() if name in names}
+    return templates
+
+
+# ------------------------------------------------------------------------------
+# Running cases
+# ------------------------------------------------------------------------------
+def _cell_counts(component):
+    if component.gds_writer is not None and not component.cell.polygons:
+        writer = component.gds_writer
+        return writer.polygons, writer.vertices, writer.references
+    polygons = sum(len(element.polygons) for element in component.cell.polygons)
+    vertices = sum(len(points) for element in component.cell.polygons for points in element.polygons)
+    return polygons, vertices, len(component.cell.references)
+
+
+def run_case(artwork, output_dir, name, repeat=3, component_options=None):
+    """
+    Generate one artwork repeat times plus one profiled run.
+
+    Returns:
+        dict: The case record of the report.
+    """
+    component_options = component_options or {}
+    seconds = []
+    component = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        component = Component(copy.deepcopy(artwork), output_dir, name, True, False, **component_options)
+        seconds.append(time.perf_counter() - start)
+
+    polygons, vertices, references = _cell_counts(component)
+    gds_bytes = os.path.getsize(os.path.join(output_dir, f"{name}.gds"))
+
+    profiled = Component(copy.deepcopy(artwork), output_dir, f"{name}_profile", True, False,
+                         profile=True, **component_options)
+    report = profiled.profile_report
+
+    return {
+        "status": "ok",
+        "seconds": min(seconds),
+        "seconds_all": seconds,
+        "peak_memory_bytes": report["peak_memory_bytes"],
+        "polygons": polygons,
+        "vertices": vertices,
+        "references": references,
+        "gds_bytes": gds_bytes,
+        "stages": {record["stage"]: record["seconds"] for record in report["stages"]},
+    }
+
+
+def verify_stream_case(artwork, output_dir, name, component_options=None):
+    """
+    Write one artwork with gdspy and with the streaming writer and compare the files.
+
+    Returns:
+        bool: Whether both files are identical apart from their timestamps.
+    """
+    options = {**(component_options or {}), "stream_gds": False}
+    files = []
+    for suffix, stream_gds in (("gdspy", False), ("stream", True)):
+        options["stream_gds"] = stream_gds
+        Component(copy.deepcopy(artwork), output_dir, f"{name}_{suffix}", True, False, **options)
+        with open(os.path.join(output_dir, f"{name}_{suffix}.gds"), "rb") as f:
+            files.append(normalize_timestamps(f.read()))
+    return files[0] == files[1]
+
+
+def _layer_polygons(path):
+    """The flattened polygons of a GDS file's top cell by (layer, datatype)."""
+    library = gdspy.GdsLibrary(infile=path)
+    return library.top_level()[0].get_polygons(by_spec=True)
+
+
+def verify_hierarchical_case(artwork, output_dir, name, component_options=None):
+    """
+    Write one artwork flat and hierarchical and XOR the flattened layouts per layer.
+
+    Returns:
+        float: The total XOR area, 0 if the two layouts are the same artwork.
+    """
+    layouts = []
+    for suffix, hierarchical in (("flat", False), ("hier", True)):
+        options = {**(component_options or {}), "hierarchical": hierarchical}
+        Component(copy.deepcopy(artwork), output_dir, f"{name}_{suffix}", True, False, **options)
+        layouts.append(_layer_polygons(os.path.join(output_dir, f"{name}_{suffix}.gds")))
+    flat, hierarchical = layouts
+    area = 0.0
+    for spec in set(flat) | set(hierarchical):
+        difference = gdspy.boolean(flat.get(spec, []), hierarchical.get(spec, []), "xor", precision=XOR_PRECISION)
+        if difference is not None:
+            area += difference.area()
+    return area
+
+
+def run_benchmarks(templates, scales, repeat=3, output_dir=None, component_options=None, verify_stream=False,
+                   verify_hierarchical=False):
+    cases = {}
+    with tempfile.TemporaryDirectory(prefix="conure_bench_") as tmp_dir:
+        out_dir = output_dir or tmp_dir
+        os.makedirs(out_dir, exist_ok=True)
+        for template_name, path in templates.items():
+            with open(path, "r", encoding="utf-8") as f:
+                artwork = json.load(f)
+            for scale in scales:
+                case_name = f"{template_name}@{scale}"
+                try:
+                    scaled = scale_artwork(artwork, *SCALES[scale])
+                    cases[case_name] = run_case(scaled, out_dir, case_name.replace("@", "_"), repeat,
+                                                component_options)
+                    if verify_stream:
+                        cases[case_name]["stream_identical"] = verify_stream_case(
+                            scaled, out_dir, case_name.replace("@", "_"), component_options)
+                    if verify_hierarchical:
+                        cases[case_name]["hierarchical_xor_area"] = verify_hierarchical_case(
+                            scaled, out_dir, case_name.replace("@", "_"), component_options)
+                    logger.info("%-40s %8.3f s %8d polygons %10d bytes", case_name,
+                                cases[case_name]["seconds"], cases[case_name]["polygons"],
+                                cases[case_name]["gds_bytes"])
+                except Exception as e:
+                    # Some library templates predate the current schema; record them instead of aborting.
+                    cases[case_name] = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+                    logger.warning("%-40s failed: %s", case_name, cases[case_name]["error"])
+                cases[case_name]["template"] = os.path.relpath(path, REPO_ROOT)
+                cases[case_name]["scale"] = scale
+    return cases
+
+
+def build_report(cases, repeat, component_options):
+    return {
+        "meta": {
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "numpy": np.__version__,
+            "gdspy": gdspy.__version__,
+            "repeat": repeat,
+            "component_options": component_options,
+        },
+        "cases": cases,
+    }
+
+
+# ------------------------------------------------------------------------------
+# Baseline comparison
+# ------------------------------------------------------------------------------
+def compare_reports(report, baseline, tolerance=0.25):
+    """
+    Compare a report against a baseline report.
+
+    A case regresses when its time or peak memory exceeds the baseline by more
+    than tolerance, or when it fails where the baseline succeeded. Differences
+    in polygon counts or GDS size are listed as changes, not regressions.
+
+    Returns:
+        Tuple[list, list]: (regressions, changes) as human-readable lines.
+    """
+    regressions = []
+    changes = []
+    for case_name, base_case in baseline.get("cases", {}).items():
+        case = report["cases"].get(case_name)
+        if case is None:
+            continue
+        if base_case.get("status") == "ok" and case.get("status") != "ok":
+            regressions.append(f"{case_name}: now fails ({case.get('error')})")
+            continue
+        if case.get("status") != "ok" or base_case.get("status") != "ok":
+            continue
+        for metric in TIMED_METRICS:
+            ratio = case[metric] / base_case[metric] if base_case[metric] else 1.0
+            if ratio > 1.0 + tolerance:
+                regressions.append(f"{case_name}: {metric} {base_case[metric]:.4g} -> {case[metric]:.4g} "
+                                   f"({ratio:.2f}x)")
+        for metric in EXACT_METRICS:
+            if case.get(metric) != base_case.get(metric):
+                changes.append(f"{case_name}: {metric} {base_case.get(metric)} -> {case.get(metric)}")
+    return regressions, changes
+
+
+# ------------------------------------------------------------------------------
+# Main
+# ------------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the artwork generator over artwork_library templates.")
+    parser.add_argument("--templates", "-t", nargs="*", help="Template names to run (default: all)")
+    parser.add_argument("--scales", "-s", nargs="*", choices=list(SCALES), default=list(SCALES),
+                        help="Scales to run (default: all)")
+    parser.add_argument("--repeat", "-r", type=int, default=3, help="Timed runs per case; the best is reported")
+    parser.add_argument("--output", "-o", help="Write the JSON report here (default: stdout)")
+    parser.add_argument("--keep-output", help="Keep generated GDS files in this directory")
+    parser.add_argument("--baseline", "-b", nargs="?", const=str(DEFAULT_BASELINE),
+                        help=f"Compare against a baseline report (default: {DEFAULT_BASELINE.name})")
+    parser.add_argument("--save-baseline", nargs="?", const=str(DEFAULT_BASELINE),
+                        help="Store the report as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative slowdown/memory growth before a case counts as a regression")
+    parser.add_argument("--hierarchical", action="store_true", help="Benchmark hierarchical GDS output")
+    parser.add_argument("--merge", action="store_true", help="Benchmark with per-layer merging")
+    parser.add_argument("--integer-coords", action="store_true", help="Benchmark integer database-unit snapping")
+    parser.add_argument("--symmetry", action="store_true", help="Benchmark symmetry-aware generation")
+    parser.add_argument("--stream-gds", action="store_true", help="Benchmark the streaming GDS writer")
+    parser.add_argument("--verify-stream", action="store_true",
+                        help="Check that the streaming GDS writer reproduces gdspy's output for every case")
+    parser.add_argument("--verify-hierarchical", action="store_true",
+                        help="Check that the flattened hierarchical layout equals the flat one for every case")
+    args = parser.parse_args()
+
+    # The generator logs every written file at INFO; keep the benchmark output readable.
+    logging.getLogger().setLevel(logging.WARNING)
+
+    component_options = {"hierarchical": args.hierarchical, "merge_layers": args.merge,
+                         "integer_coordinates": args.integer_coords, "symmetry": args.symmetry,
+                         "stream_gds": args.stream_gds}
+    templates = discover_templates(names=args.templates)
+    cases = run_benchmarks(templates, args.scales, args.repeat, args.keep_output, component_options,
+                           args.verify_stream, args.verify_hierarchical)
+    report = build_report(cases, args.repeat, component_options)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+        logger.info("Report written to %s", args.output)
+    else:
+        json.dump(report, sys.stdout, indent=4)
+        sys.stdout.write("\n")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+        logger.info("Baseline written to %s", args.save_baseline)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions, changes = compare_reports(report, baseline, args.tolerance)
+        for line in changes:
+            logger.warning("Changed: %s", line)
+        for line in regressions:
+            logger.error("Regression: %s", line)
+        if regressions:
+            sys.exit(1)
+        logger.info("No regressions against %s", args.baseline)
+
+    if args.verify_stream:
+        mismatches = [name for name, case in cases.items() if case.get("stream_identical") is False]
+        for name in mismatches:
+            logger.error("Streamed GDS differs from gdspy: %s", name)
+        if mismatches:
+            sys.exit(1)
+        logger.info("Streamed GDS files match gdspy for every case")
+
+    if args.verify_hierarchical:
+        mismatches = [name for name, case in cases.items() if case.get("hierarchical_xor_area", 0) > 0]
+        for name in mismatches:
+            logger.error("Flattened hierarchical GDS differs from flat by %.6g um^2: %s",
+                         cases[name]["hierarchical_xor_area"], name)
+        if mismatches:
+            sys.exit(1)
+        logger.info("Flattened hierarchical GDS files match the flat layout for every case")
+
+
+if __name__ == "__main__":
+    main()
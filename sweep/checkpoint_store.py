@@ -0,0 +1,264 @@
+"""
+SQLite-backed sweep checkpoint.
+
+checkpoint.json used to be rewritten in full after every field change, and
+the summary recounted every run after every update, so a sweep of N runs
+cost O(N^2) disk I/O. CheckpointStore keeps one row per run in
+checkpoint.db (WAL mode, one transaction per update) with the layout, SVG
+and simulation states in indexed columns, and maintains the summary counts
+in a counts table as runs change state, so neither an update nor a count
+touches other runs.
+
+checkpoint.json is still written by export_json for tools that read it. A
+sweep directory that only has a checkpoint.json is migrated into a new
+checkpoint.db the first time it is opened.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+
+logger = logging.getLogger("sweep")
+
+DB_NAME = "checkpoint.db"
+JSON_NAME = "checkpoint.json"
+
+# Seconds to wait for another process's write transaction.
+BUSY_TIMEOUT = 60
+
+# Record fields with their own column: True -> 1 (completed), False -> 0 (failed), missing -> NULL.
+STATE_FIELDS = ("layout_completed", "svg_completed", "simulation_completed")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_key TEXT PRIMARY KEY,
+    record TEXT NOT NULL,
+    pruned INTEGER NOT NULL DEFAULT 0,
+    layout_completed INTEGER,
+    svg_completed INTEGER,
+    simulation_completed INTEGER
+);
+CREATE INDEX IF NOT EXISTS runs_pruned ON runs (pruned);
+CREATE INDEX IF NOT EXISTS runs_layout ON runs (layout_completed);
+CREATE INDEX IF NOT EXISTS runs_svg ON runs (svg_completed);
+CREATE INDEX IF NOT EXISTS runs_simulation ON runs (simulation_completed);
+CREATE TABLE IF NOT EXISTS counts (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def load_checkpoint_json(checkpoint_path):
+    """
+    Read a checkpoint.json; an empty or corrupted file reads as no runs.
+    """
+    if not os.path.exists(checkpoint_path):
+        return {"runs": {}}
+    try:
+        with open(checkpoint_path, "r", encoding="utf-8") as f:
+            data = f.read().strip()
+            if not data:
+                return {"runs": {}}
+            return json.loads(data)
+    except json.JSONDecodeError:
+        logger.warning(
+            "Checkpoint file %s is empty or corrupted. Resetting checkpoint database.",
+            checkpoint_path,
+        )
+        return {"runs": {}}
+
+
+def _states(record):
+    """The indexed column values of a run record."""
+    pruned = 1 if record.get("pruned") is True else 0
+    states = []
+    for field in STATE_FIELDS:
+        value = record.get(field)
+        states.append(1 if value is True else 0 if field in record and value is False else None)
+    return (pruned, *states)
+
+
+def _count_names(states):
+    """The counters a run with the given column values contributes to."""
+    pruned, *fields = states
+    names = ["pruned"] if pruned else []
+    for field, value in zip(STATE_FIELDS, fields):
+        if value is not None:
+            names.append(f"{field.split('_')[0]}_{'completed' if value else 'failed'}")
+    return names
+
+
+class CheckpointStore:
+    """
+    Per-run checkpoint records of a sweep directory.
+
+    Parameters:
+        directory (str): The sweep's base output directory.
+
+    The store may be shared by the threads of one sweep; every operation
+    holds an internal lock.
+    """
+
+    def __init__(self, directory):
+        self.db_path = os.path.join(directory, DB_NAME)
+        self.json_path = os.path.join(directory, JSON_NAME)
+        migrate = not os.path.exists(self.db_path) and os.path.exists(self.json_path)
+        self._lock = threading.RLock()
+        # Shards of one sweep may write the same database from several processes.
+        self._connection = sqlite3.connect(
+            self.db_path, timeout=BUSY_TIMEOUT, check_same_thread=False, isolation_level=None
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(SCHEMA)
+        if migrate:
+            runs = load_checkpoint_json(self.json_path).get("runs", {})
+            self.update_many(runs)
+            logger.info("Migrated %d runs from %s to %s", len(runs), self.json_path, self.db_path)
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get(self, run_key):
+        """The record of a run, or an empty dict if it has none."""
+        with self._lock:
+            row = self._connection.execute("SELECT record FROM runs WHERE run_key = ?", (run_key,)).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def update(self, run_key, updates):
+        """Merge updates into a run's record."""
+        self.update_many({run_key: updates})
+
+    def update_many(self, updates_by_run):
+        """Merge updates into the records of several runs in one transaction."""
+        with self._lock:
+            cursor = self._connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                for run_key, updates in updates_by_run.items():
+                    self._update(cursor, run_key, updates)
+                cursor.execute("COMMIT")
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+
+    def _update(self, cursor, run_key, updates):
+        row = cursor.execute(
+            "SELECT record, pruned, layout_completed, svg_completed, simulation_completed FROM runs WHERE run_key = ?",
+            (run_key,),
+        ).fetchone()
+        record = json.loads(row[0]) if row else {}
+        old_states = tuple(row[1:]) if row else None
+        record.update(updates)
+        new_states = _states(record)
+        cursor.execute(
+            "INSERT OR REPLACE INTO runs (run_key, record, pruned, layout_completed, svg_completed, "
+            "simulation_completed) VALUES (?, ?, ?, ?, ?, ?)",
+            (run_key, json.dumps(record), *new_states),
+        )
+        if new_states == old_states:
+            return
+        for name in _count_names(old_states) if old_states else ():
+            cursor.execute("UPDATE counts SET value = value - 1 WHERE name = ?", (name,))
+        for name in _count_names(new_states):
+            cursor.execute(
+                "INSERT INTO counts (name, value) VALUES (?, 1) ON CONFLICT (name) DO UPDATE SET value = value + 1",
+                (name,),
+            )
+
+    def counts(self, total_runs):
+        """
+        Run state counts in the form of summary.json's "counts".
+
+        Parameters:
+            total_runs (int): Number of runs in the sweep; runs without a
+                completed or failed state are pending.
+        """
+        with self._lock:
+            values = dict(self._connection.execute("SELECT name, value FROM counts").fetchall())
+        counts = {}
+        for field in STATE_FIELDS:
+            task = field.split("_")[0]
+            completed = values.get(f"{task}_completed", 0)
+            failed = values.get(f"{task}_failed", 0)
+            counts[task] = {
+                "completed": completed,
+                "failed": failed,
+                "pending": max(0, total_runs - completed - failed),
+            }
+        counts["pruned"] = values.get("pruned", 0)
+        return counts
+
+    def finished_keys(self, layout=False, svg=False, thumbnail=False, rule_check=False, simulation=False,
+                      first_key=None, last_key=None):
+        """
+        Keys of the runs that have every requested output, so a resumed sweep can skip them.
+
+        A run whose simulation was skipped for a rule violation counts as
+        simulated. Nothing is finished if no output is requested.
+
+        Parameters:
+            layout, svg, thumbnail, rule_check, simulation (bool): The outputs a run needs.
+            first_key, last_key (str, optional): Only look at run keys in this
+                inclusive range, e.g. the first and last run of a shard.
+
+        Returns:
+            set: The finished run keys.
+        """
+        conditions = []
+        if layout:
+            conditions.append("layout_completed = 1")
+        if svg:
+            conditions.append("svg_completed = 1")
+        if thumbnail:
+            conditions.append("json_extract(record, '$.thumbnail_completed') = 1")
+        if rule_check:
+            conditions.append("json_extract(record, '$.rule_check_passed') IS NOT NULL")
+        if simulation:
+            conditions.append("(simulation_completed = 1 OR json_extract(record, '$.simulation_skipped') = 1)")
+        if not conditions:
+            return set()
+        arguments = []
+        if first_key is not None:
+            conditions.append("run_key >= ?")
+            arguments.append(first_key)
+        if last_key is not None:
+            conditions.append("run_key <= ?")
+            arguments.append(last_key)
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT run_key FROM runs WHERE {' AND '.join(conditions)}", arguments
+            ).fetchall()
+        return {run_key for run_key, in rows}
+
+    def runs(self):
+        """(run_key, record) of every run, in run key order."""
+        with self._lock:
+            rows = self._connection.execute("SELECT run_key, record FROM runs ORDER BY run_key").fetchall()
+        for run_key, record in rows:
+            yield run_key, json.loads(record)
+
+    def export_json(self, path=None):
+        """
+        Write every record as checkpoint.json, {"runs": {run_key: record}}.
+
+        Parameters:
+            path (str, optional): Where to write; defaults to checkpoint.json beside the database.
+        """
+        path = path or self.json_path
+        # Shards of a sweep may export at the same time.
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            json.dump({"runs": dict(self.runs())}, f, indent=4)
+        os.replace(temporary_path, path)
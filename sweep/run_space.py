@@ -0,0 +1,180 @@
+"""
+Lazy run space of a sweep.
+
+A sweep's runs are the Cartesian product of its parameter axes, run i being
+the i-th tuple of itertools.product over the axes. Listing that product up
+front costs memory in the size of the whole grid before the first run
+starts. RunSpace instead decodes a run's parameter values from its index as a
+mixed-radix number, the last axis being the fastest digit, and SweepAxis
+computes an axis value from its position the same way, so only the runs that
+are actually visited are ever built.
+
+Resumed sweeps iterate only the pending indices, and shard splits the index
+range into contiguous parts for separate sweep processes.
+"""
+
+import math
+
+
+def to_number(value, label):
+    try:
+        return float(value)
+    except Exception as exc:
+        raise ValueError(f"{label} must be numeric, got: {value!r}") from exc
+
+
+def clean_number(value):
+    """Whole floats become ints, as sweep values always have."""
+    if isinstance(value, float) and float(value).is_integer():
+        return int(value)
+    return value
+
+
+class SweepAxis:
+    """
+    The values of one sweep parameter, computed from their position.
+
+    Accepted forms:
+    - list: the values themselves
+    - dict with:
+        {
+          "from": ...,
+          "to": ...,
+          "type": "npoints" | "step",
+          "value": ...
+        }
+
+    Raises:
+        TypeError: If the parameter is neither a list nor a dict.
+        ValueError: If the dict is incomplete or invalid.
+    """
+
+    def __init__(self, param):
+        self._values = None
+        if isinstance(param, list):
+            self._values = param
+            self._length = len(param)
+            return
+
+        if not isinstance(param, dict):
+            raise TypeError("Sweep parameter must be either a list or a dict.")
+
+        required = ["from", "to", "type", "value"]
+        missing = [k for k in required if k not in param]
+        if missing:
+            raise ValueError(f"Missing keys in sweep parameter spec: {missing}")
+
+        self._start = to_number(param["from"], "'from'")
+        self._end = to_number(param["to"], "'to'")
+        self._method = str(param["type"]).lower()
+        raw_value = param["value"]
+
+        if self._method == "npoints":
+            try:
+                count = int(raw_value)
+            except Exception as exc:
+                raise ValueError(f"npoints value must be an integer, got: {raw_value!r}") from exc
+
+            if count < 1:
+                raise ValueError(f"npoints value must be >= 1, got: {count}")
+
+            self._length = count
+            # As np.linspace: start + i * step, with the last point exactly at the end.
+            self._step = (self._end - self._start) / (count - 1) if count > 1 else 0.0
+
+        elif self._method == "step":
+            step = to_number(raw_value, "'value' for step")
+
+            if step == 0:
+                raise ValueError("step value must not be 0")
+
+            if self._end >= self._start and step < 0:
+                step = abs(step)
+            elif self._end < self._start and step > 0:
+                step = -step
+
+            self._step = step
+            # Every point up to the end, allowing for rounding in the division.
+            self._length = int(math.floor((self._end - self._start) / step + 1e-9)) + 1
+
+        else:
+            raise ValueError(f"Unknown sweep type: {param['type']}")
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, position):
+        if position < 0:
+            position += self._length
+        if not 0 <= position < self._length:
+            raise IndexError(f"Sweep axis position {position} out of range")
+        if self._values is not None:
+            return self._values[position]
+        if self._method == "npoints":
+            if position == self._length - 1 and self._length > 1:
+                return clean_number(self._end)
+            return clean_number(position * self._step + self._start)
+        return clean_number(round(self._start + position * self._step, 12))
+
+    def __iter__(self):
+        return (self[position] for position in range(self._length))
+
+
+class RunSpace:
+    """
+    The runs of a sweep, addressed by index.
+
+    Parameters:
+        parameters (dict): Parameter name -> sweep spec, the "parameters"
+            block of a sweep.json.
+    """
+
+    def __init__(self, parameters):
+        self.names = list(parameters.keys())
+        self.axes = [SweepAxis(parameters[name]) for name in self.names]
+        self._length = math.prod(len(axis) for axis in self.axes)
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        """The parameter values of run index, as the index-th tuple of itertools.product."""
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(f"Run index {index} out of range for {self._length} runs")
+        values = []
+        for axis in reversed(self.axes):
+            index, position = divmod(index, len(axis))
+            values.append(axis[position])
+        return tuple(reversed(values))
+
+    def __iter__(self):
+        return (self[index] for index in range(self._length))
+
+    def parameters(self, index):
+        """Parameter name -> value of run index."""
+        return dict(zip(self.names, self[index]))
+
+    def shard(self, shard_index, shard_count):
+        """
+        The contiguous index range of one of shard_count equal parts.
+
+        Raises:
+            ValueError: If shard_index is not in [0, shard_count).
+        """
+        if shard_count < 1 or not 0 <= shard_index < shard_count:
+            raise ValueError(f"Invalid shard {shard_index}/{shard_count}")
+        return range(self._length * shard_index // shard_count, self._length * (shard_index + 1) // shard_count)
+
+
+def pending(indices, run_key, finished):
+    """
+    The indices whose run key is not in finished, lazily.
+
+    Parameters:
+        indices (iterable of int): The run indices to visit, e.g. a shard.
+        run_key (callable): Run index -> run key.
+        finished (set): Keys of the runs to skip.
+    """
+    return (index for index in indices if run_key(index) not in finished)
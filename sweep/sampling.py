@@ -0,0 +1,185 @@
+"""
+Space-filling samples of a sweep's parameter space.
+
+A full-factorial sweep grows with the product of its axis lengths. To train
+a surrogate model it is usually better to simulate far fewer points spread
+evenly over the space. A "sampling" block in sweep.json replaces the grid
+with such a design:
+
+    "sampling": {
+        "method": "lhs" | "sobol" | "halton",
+        "samples": 200,
+        "seed": 1
+    }
+
+Each parameter then spans a range instead of a list of grid points:
+
+- {"from": 80, "to": 170}: continuous in [from, to]
+- {"from": 2, "to": 6, "integer": true}: an integer in from..to
+- a list, e.g. [4, 8], or a grid spec with "type" and "value": one of its values
+
+The unit-cube points come from scipy.stats.qmc: Latin hypercube, scrambled
+Sobol or scrambled Halton, all seeded. Continuous axes scale a coordinate,
+integer and discrete axes split [0, 1) into equally wide bins, one per value.
+
+The drawn points are written to samples.json in the sweep directory, and a
+resumed sweep reads them back instead of drawing again. Run i is therefore
+always sample i, even with another scipy version.
+"""
+
+import json
+import logging
+import math
+import os
+import warnings
+
+from run_space import RunSpace, SweepAxis, clean_number, to_number
+
+
+logger = logging.getLogger("sweep")
+
+SAMPLES_NAME = "samples.json"
+
+METHODS = ("lhs", "sobol", "halton")
+
+
+class SampledAxis:
+    """
+    Maps a unit-interval coordinate to a value of one sweep parameter.
+
+    Raises:
+        TypeError: If the parameter is neither a list nor a dict.
+        ValueError: If the spec is invalid.
+    """
+
+    def __init__(self, param):
+        self._values = None
+        if isinstance(param, dict) and "type" not in param:
+            missing = [k for k in ("from", "to") if k not in param]
+            if missing:
+                raise ValueError(f"Missing keys in sampled parameter spec: {missing}")
+            self._low = to_number(param["from"], "'from'")
+            self._high = to_number(param["to"], "'to'")
+            if param.get("integer", False):
+                if not (self._low.is_integer() and self._high.is_integer()):
+                    raise ValueError(f"Integer sampled parameter needs whole bounds, got: {param!r}")
+                self._values = range(int(min(self._low, self._high)), int(max(self._low, self._high)) + 1)
+        else:
+            # Lists and grid specs are sampled as discrete values.
+            self._values = list(SweepAxis(param))
+            if not self._values:
+                raise ValueError("Sampled parameter has no values")
+
+    def __call__(self, coordinate):
+        if self._values is not None:
+            return self._values[min(int(coordinate * len(self._values)), len(self._values) - 1)]
+        return clean_number(self._low + coordinate * (self._high - self._low))
+
+
+def draw_unit_samples(method, samples, dimensions, seed=None):
+    """
+    Draw points in the unit hypercube.
+
+    Parameters:
+        method (str): "lhs", "sobol" or "halton".
+        samples (int): Number of points.
+        dimensions (int): Number of coordinates per point.
+        seed (int, optional): Seed of the scrambling or permutation; the same
+            seed draws the same points.
+
+    Returns:
+        ndarray: (samples, dimensions) coordinates in [0, 1).
+
+    Raises:
+        ValueError: If method is unknown.
+    """
+    # scipy only arrives with scikit-rf, so grid sweeps must not need it.
+    from scipy.stats import qmc
+
+    if method == "lhs":
+        sampler = qmc.LatinHypercube(d=dimensions, seed=seed)
+    elif method == "sobol":
+        sampler = qmc.Sobol(d=dimensions, scramble=True, seed=seed)
+    elif method == "halton":
+        sampler = qmc.Halton(d=dimensions, scramble=True, seed=seed)
+    else:
+        raise ValueError(f"Unknown sampling method {method!r}; use one of {', '.join(METHODS)}")
+    if method == "sobol" and samples & (samples - 1):
+        logger.warning(
+            "Sobol samples are balanced only in powers of 2; %d samples were asked for, %d or %d would be balanced",
+            samples,
+            2 ** int(math.log2(samples)),
+            2 ** math.ceil(math.log2(samples)),
+        )
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        return sampler.random(samples)
+
+
+class SampleSpace(RunSpace):
+    """
+    The runs of a sampled sweep, run i being sample i.
+
+    Parameters:
+        parameters (dict): Parameter name -> sampled spec, the "parameters" block of a sweep.json.
+        sampling (dict): The "sampling" block.
+        points (sequence, optional): Parameter values per run, e.g. read back
+            from samples.json; drawn from the sampling block otherwise.
+
+    Raises:
+        ValueError: If the sampling block is invalid.
+    """
+
+    def __init__(self, parameters, sampling, points=None):
+        self.names = list(parameters.keys())
+        self.parameter_specs = parameters
+        self.sampling = sampling
+        if points is None:
+            method = str(sampling.get("method", "lhs")).lower()
+            try:
+                samples = int(sampling["samples"])
+            except (KeyError, TypeError, ValueError) as exc:
+                raise ValueError(f"Sampling needs an integer 'samples', got: {sampling.get('samples')!r}") from exc
+            if samples < 1:
+                raise ValueError(f"Sampling 'samples' must be >= 1, got: {samples}")
+            axes = [SampledAxis(parameters[name]) for name in self.names]
+            unit = draw_unit_samples(method, samples, len(axes), sampling.get("seed"))
+            points = [tuple(axis(coordinate) for axis, coordinate in zip(axes, row)) for row in unit.tolist()]
+        self.points = [tuple(point) for point in points]
+        self._length = len(self.points)
+
+    def __getitem__(self, index):
+        return self.points[index]
+
+    @classmethod
+    def for_sweep(cls, parameters, sampling, directory, force=False):
+        """
+        The sample space of a sweep directory, drawn once and then read back.
+
+        Parameters:
+            parameters (dict): The "parameters" block of the sweep.json.
+            sampling (dict): Its "sampling" block.
+            directory (str): The sweep's base output directory.
+            force (bool): Draw again even if samples.json holds points of another spec.
+
+        Raises:
+            ValueError: If samples.json was drawn from another spec and force is not set.
+        """
+        path = os.path.join(directory, SAMPLES_NAME)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            if saved.get("parameters") == parameters and saved.get("sampling") == sampling:
+                logger.info("Reusing %d samples from %s", len(saved["points"]), path)
+                return cls(parameters, sampling, saved["points"])
+            if not force:
+                raise ValueError(
+                    f"{path} was drawn from another parameters or sampling block; "
+                    "use a new output directory or --force to draw again"
+                )
+        space = cls(parameters, sampling)
+        os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"parameters": parameters, "sampling": sampling, "names": space.names,
+                       "points": [list(point) for point in space.points]}, f, indent=4)
+        return space
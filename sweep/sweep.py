@@ -4,37 +4,52 @@ Sweep script for artwork generation and optional simulation.
 
 Behavior:
 - Reads artwork JSON and sweep JSON
-- Generates one run folder per permutation
+- Generates one run folder per permutation, decoding permutations lazily from
+  their index; resumed sweeps visit only runs the checkpoint has not finished,
+  and --shard K/N runs one contiguous part of the index range
 - Writes:
     - parameters.json
     - <run_name>_artwork.json
     - summary.json
-    - checkpoint.json
-- Optionally generates layout/SVG
+    - checkpoint.db (checkpoint.json is exported from it at the end)
+- Optionally generates layout/SVG and PNG thumbnails
+- Optionally rule-checks each layout and skips simulating runs that fail
 - Optionally runs simulation
+- Runs as a pipeline of generate -> simulate -> pack-ingest stages joined by
+  bounded queues, so layouts of later runs are built while earlier runs
+  simulate; --jobs / --sim-jobs widen the generate and simulate stages
 - Optionally packs simulation results
 
 Important:
-- sweep.json contains only:
+- sweep.json contains:
     {
       "parameters": {
         ...
-      }
+      },
+      "target": {...},   (optional, see estimator.TargetWindow)
+      "sampling": {...}  (optional, see sampling.py)
     }
+- With a sampling block, runs are the points of a Latin hypercube, Sobol or
+  Halton design instead of the full grid
+- With a target, permutations whose closed-form L/Q estimate lies outside
+  the window are pruned before generation, and the rest run in target order
 
 Path note:
 - simulator/simulator.py is resolved as ../simulator/simulator.py relative to this file
 """
 
 import argparse
+import collections
 import copy
 import glob
-import itertools
 import json
 import logging
 import os
+import queue
 import subprocess
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
 from pathlib import Path
 
@@ -42,6 +57,10 @@ import numpy as np
 import skrf as rf
 from dotenv import load_dotenv
 
+from checkpoint_store import CheckpointStore
+from run_space import RunSpace, SweepAxis, pending
+from sampling import SampleSpace
+
 
 # ------------------------------------------------------------------------------
 # Logging
@@ -93,6 +112,28 @@ artwork_generator_path = (conure_path / artwork_generator_rel).resolve()
 THIS_DIR = Path(__file__).resolve().parent
 SIMULATOR_SCRIPT = (THIS_DIR / "../simulator/simulator.py").resolve()
 
+# Artwork is generated in-process; the generator directory is a script
+# directory, so make its modules importable.
+sys.path.insert(0, str(artwork_generator_path.parent))
+from batch_generator import ArtworkTemplate, BatchJob, generate_batch  # noqa: E402
+from estimator import TargetWindow, estimate_artwork  # noqa: E402
+from profiler import PROFILE_SUFFIX  # noqa: E402
+from rule_check import RULES_SUFFIX, read_report  # noqa: E402
+from stage_cache import DEFAULT_MAX_BYTES as DEFAULT_STAGE_CACHE_BYTES, StageCache  # noqa: E402
+from output_cache import DEFAULT_MAX_BYTES, OutputCache  # noqa: E402
+from thumbnail import DEFAULT_THUMBNAIL_SIZE  # noqa: E402
+
+# Seconds a blocked pipeline stage waits before checking whether the sweep stopped.
+QUEUE_POLL_SECONDS = 0.1
+
+LOG_LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+    "critical": logging.CRITICAL,
+}
+
 
 # ------------------------------------------------------------------------------
 # Utility functions
@@ -116,179 +157,16 @@ def get_timestamp():
     return datetime.now().isoformat()
 
 
-def _to_number(value, label):
-    try:
-        return float(value)
-    except Exception as exc:
-        raise ValueError(f"{label} must be numeric, got: {value!r}") from exc
-
-
 def get_sweep_values(param):
     """
-    Convert a sweep parameter into a list of values.
-
-    Accepted forms:
-    - list: returned directly
-    - dict with:
-        {
-          "from": ...,
-          "to": ...,
-          "type": "npoints" | "step",
-          "value": ...
-        }
+    Convert a sweep parameter into a list of values; see run_space.SweepAxis for the accepted forms.
     """
-    if isinstance(param, list):
-        return param
-
-    if not isinstance(param, dict):
-        raise TypeError("Sweep parameter must be either a list or a dict.")
-
-    required = ["from", "to", "type", "value"]
-    missing = [k for k in required if k not in param]
-    if missing:
-        raise ValueError(f"Missing keys in sweep parameter spec: {missing}")
-
-    start = _to_number(param["from"], "'from'")
-    end = _to_number(param["to"], "'to'")
-    method = str(param["type"]).lower()
-    raw_value = param["value"]
-
-    if method == "npoints":
-        try:
-            count = int(raw_value)
-        except Exception as exc:
-            raise ValueError(f"npoints value must be an integer, got: {raw_value!r}") from exc
-
-        if count < 1:
-            raise ValueError(f"npoints value must be >= 1, got: {count}")
-
-        values = np.linspace(start, end, count).tolist()
-
-    elif method == "step":
-        step = _to_number(raw_value, "'value' for step")
-
-        if step == 0:
-            raise ValueError("step value must not be 0")
-
-        if end >= start and step < 0:
-            step = abs(step)
-        elif end < start and step > 0:
-            step = -step
-
-        values = []
-        current = start
-        eps = 1e-12
-
-        if step > 0:
-            while current <= end + eps:
-                values.append(current)
-                current += step
-        else:
-            while current >= end - eps:
-                values.append(current)
-                current += step
-
-        values = [round(v, 12) for v in values]
-
-    else:
-        raise ValueError(f"Unknown sweep type: {param['type']}")
-
-    cleaned = []
-    for v in values:
-        if isinstance(v, float) and float(v).is_integer():
-            cleaned.append(int(v))
-        else:
-            cleaned.append(v)
-
-    return cleaned
-
-
-# ------------------------------------------------------------------------------
-# Checkpoint database
-# ------------------------------------------------------------------------------
-def load_checkpoint_db(checkpoint_path):
-    if os.path.exists(checkpoint_path):
-        try:
-            with open(checkpoint_path, "r", encoding="utf-8") as f:
-                data = f.read().strip()
-                if not data:
-                    return {"runs": {}}
-                return json.loads(data)
-        except json.JSONDecodeError:
-            logger.warning(
-                "Checkpoint file %s is empty or corrupted. Resetting checkpoint database.",
-                checkpoint_path,
-            )
-            return {"runs": {}}
-    return {"runs": {}}
-
-
-def save_checkpoint_db(db, checkpoint_path):
-    with open(checkpoint_path, "w", encoding="utf-8") as f:
-        json.dump(db, f, indent=4)
-
-
-def update_checkpoint(run_key, checkpoint_db, checkpoint_path, updates):
-    run_record = checkpoint_db.get("runs", {}).get(run_key, {})
-    run_record.update(updates)
-    checkpoint_db.setdefault("runs", {})[run_key] = run_record
-    save_checkpoint_db(checkpoint_db, checkpoint_path)
+    return list(SweepAxis(param))
 
 
 # ------------------------------------------------------------------------------
 # Summary helpers
 # ------------------------------------------------------------------------------
-def _count_run_states(checkpoint_db, total_runs):
-    runs = checkpoint_db.get("runs", {})
-
-    layout_completed = 0
-    layout_failed = 0
-
-    svg_completed = 0
-    svg_failed = 0
-
-    simulation_completed = 0
-    simulation_failed = 0
-
-    for _, rec in runs.items():
-        if rec.get("layout_completed") is True:
-            layout_completed += 1
-        elif "layout_completed" in rec and rec.get("layout_completed") is False:
-            layout_failed += 1
-
-        if rec.get("svg_completed") is True:
-            svg_completed += 1
-        elif "svg_completed" in rec and rec.get("svg_completed") is False:
-            svg_failed += 1
-
-        if rec.get("simulation_completed") is True:
-            simulation_completed += 1
-        elif "simulation_completed" in rec and rec.get("simulation_completed") is False:
-            simulation_failed += 1
-
-    layout_pending = max(0, total_runs - layout_completed - layout_failed)
-    svg_pending = max(0, total_runs - svg_completed - svg_failed)
-    simulation_pending = max(0, total_runs - simulation_completed - simulation_failed)
-
-    return {
-        "layout": {
-            "completed": layout_completed,
-            "failed": layout_failed,
-            "pending": layout_pending,
-        },
-        "svg": {
-            "completed": svg_completed,
-            "failed": svg_failed,
-            "pending": svg_pending,
-        },
-        "simulation": {
-            "completed": simulation_completed,
-            "failed": simulation_failed,
-            "pending": simulation_pending,
-        },
-    }
-
-
 def update_summary(
     summary_file_path,
     total,
@@ -296,15 +174,17 @@ def update_summary(
     run_key,
     current_run_index,
     current_task,
-    checkpoint_db,
+    checkpoint_store,
     current_permutation=None,
     current_run_name=None,
     state="running",
     started_at=None,
     finished_at=None,
+    sweep_runs=None,
 ):
     progress_percentage = (completed / total) * 100 if total > 0 else 0.0
-    counts = _count_run_states(checkpoint_db, total)
+    # The checkpoint counts every run of the sweep, also those of other shards.
+    counts = checkpoint_store.counts(total if sweep_runs is None else sweep_runs)
 
     summary = {
         "state": state,
@@ -331,6 +211,78 @@ def update_summary(
 # ------------------------------------------------------------------------------
 # Main sweep logic
 # ------------------------------------------------------------------------------
+def plan_runs(artwork_template, run_space, run_indices, target):
+    """
+    Estimate the given permutations of a run space against a target window.
+
+    Returns (order, estimates, pruned): the permutation indices to run, best
+    ranked first, the estimate dict per index, and the set of pruned indices.
+    Permutations that cannot be estimated are kept and run last.
+    """
+    estimates = {}
+    ranks = {}
+    pruned = set()
+    unestimated = []
+    for run_index in run_indices:
+        try:
+            result = estimate_artwork(
+                artwork_template.artwork,
+                run_space.parameters(run_index),
+                frequency=target.frequency,
+                method=target.method,
+                parameter_graph=artwork_template.parameter_graph,
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning("Could not estimate permutation %d: %s", run_index, e)
+            unestimated.append(run_index)
+            continue
+        estimates[run_index] = result.to_dict()
+        if target.accepts(result):
+            ranks[run_index] = target.rank(result)
+        else:
+            pruned.add(run_index)
+    # sorted is stable, so equally ranked runs keep the sweep order.
+    order = sorted(ranks, key=ranks.get) + unestimated
+    return order, estimates, pruned
+
+
+def simulation_slots(simulator, simulatorConfig, sim_jobs):
+    """
+    Number of simulations to run at once.
+
+    EMX runs use parallelCPU threads each, so with EMX at most
+    cpu_count // parallelCPU simulations run at once, however many
+    sim_jobs are asked for.
+    """
+    slots = max(1, sim_jobs)
+    if simulator != "emx" or not simulatorConfig:
+        return slots
+    try:
+        if os.path.isfile(simulatorConfig):
+            with open(simulatorConfig, "r", encoding="utf-8") as f:
+                config = json.load(f)
+        else:
+            config = json.loads(simulatorConfig)
+    except (OSError, ValueError) as e:
+        logger.warning("Could not read simulator config %s: %s", simulatorConfig, e)
+        return slots
+    threads = int(config.get("emx_config", {}).get("parallelCPU") or 1)
+    fitting = max(1, (os.cpu_count() or 1) // threads)
+    if fitting < slots:
+        logger.warning(
+            "Running %d instead of %d simulations at once: each EMX run uses %d CPUs and this machine has %d",
+            fitting,
+            slots,
+            threads,
+            os.cpu_count() or 1,
+        )
+    return min(slots, fitting)
+
+
+def run_simulation(command):
+    return subprocess.run(command).returncode
+
+
 def sweep(
     simulator,
     artworkData,
@@ -345,23 +297,92 @@ def sweep(
     force=False,
     verbose=False,
     log_level=None,
+    stage_cache_dir=None,
+    stage_cache_bytes=DEFAULT_STAGE_CACHE_BYTES,
+    hierarchical=False,
+    merge_layers=False,
+    profile=False,
+    integer_coordinates=False,
+    symmetry=False,
+    stream_gds=False,
+    output_cache_dir=None,
+    output_cache_bytes=DEFAULT_MAX_BYTES,
+    thumbnail_size=0,
+    thumbnail_colors=None,
+    rule_check=False,
+    jobs=1,
+    sim_jobs=1,
+    queue_depth=2,
+    shard=None,
 ):
-    sweepPar = list(sweepParam["parameters"].keys())
-    sweepData = [get_sweep_values(sweepParam["parameters"][param]) for param in sweepPar]
-    permutations = list(itertools.product(*sweepData))
+    # Permutations are decoded from their index as they are visited, never listed.
+    # A sampling block replaces the grid with a space-filling design, drawn once per output directory.
+    if sweepParam.get("sampling"):
+        run_space = SampleSpace.for_sweep(sweepParam["parameters"], sweepParam["sampling"], base_output_dir, force)
+        logger.info("Sampling %d points by %s", len(run_space), sweepParam["sampling"].get("method", "lhs"))
+    else:
+        run_space = RunSpace(sweepParam["parameters"])
+    sweepPar = run_space.names
+    target = TargetWindow(sweepParam["target"]) if sweepParam.get("target") else None
 
-    total_permutations = len(permutations)
+    total_permutations = len(run_space)
     width = max(4, len(str(total_permutations)))
 
+    def run_key_of(run_index):
+        return f"RunID_{run_index:0{width}d}"
+
     logger.info("Total number of permutations: %d", total_permutations)
 
+    # A shard is a contiguous part of the index range; shards of one sweep share its
+    # output directory and checkpoint, and each writes its own summary.
+    if shard is not None:
+        run_indices = run_space.shard(*shard)
+        logger.info(
+            "Shard %d of %d: permutations %d to %d", shard[0], shard[1], run_indices.start, run_indices.stop - 1
+        )
+        summary_name = f"summary_shard{shard[0]}.json"
+    else:
+        run_indices = range(total_permutations)
+        summary_name = "summary.json"
+    run_total = len(run_indices)
+    last_run_index = run_indices[-1] if run_indices else -1
+
     os.makedirs(base_output_dir, exist_ok=True)
 
-    summary_file_path = os.path.join(base_output_dir, "summary.json")
-    checkpoint_file_path = os.path.join(base_output_dir, "checkpoint.json")
-    checkpoint_db = load_checkpoint_db(checkpoint_file_path)
+    summary_file_path = os.path.join(base_output_dir, summary_name)
+    checkpoint_store = CheckpointStore(base_output_dir)
+
+    # Runs the checkpoint already has every requested output of are not visited again.
+    finished = set()
+    if not force and run_indices:
+        finished = checkpoint_store.finished_keys(
+            layout=enableLayoutGeneration or enableSimulation,
+            svg=generateSVG,
+            thumbnail=bool(thumbnail_size),
+            rule_check=rule_check,
+            simulation=enableSimulation,
+            first_key=run_key_of(run_indices[0]),
+            last_key=run_key_of(last_run_index),
+        )
+        if finished:
+            logger.info("Skipping %d of %d permutations the checkpoint records as finished", len(finished), run_total)
+
+    completedRuns = len(finished)
 
-    completedRuns = 0
+    # Parse and compile the artwork once; every run only swaps in its swept values
+    # and regenerates the stages those values feed into.
+    # Runs whose files an earlier sweep already generated are restored from the output cache.
+    output_cache = OutputCache(output_cache_dir, output_cache_bytes) if output_cache_dir else None
+    artwork_template = ArtworkTemplate(
+        artworkData, StageCache(directory=stage_cache_dir, max_bytes=stage_cache_bytes), output_cache
+    )
+    # Generator logging is off unless asked for, as with the standalone generator CLI.
+    if verbose:
+        logging.getLogger().setLevel(logging.DEBUG)
+    elif log_level:
+        logging.getLogger().setLevel(LOG_LEVELS[log_level])
+    else:
+        logging.getLogger().setLevel(logging.CRITICAL + 1)
 
     default_task_status = {
         "layout": {"status": "pending"},
@@ -370,22 +391,86 @@ def sweep(
     }
     update_summary(
         summary_file_path,
-        total_permutations,
+        run_total,
         completedRuns,
         "N/A",
         -1,
         default_task_status,
-        checkpoint_db,
+        checkpoint_store,
         current_permutation={},
         current_run_name=None,
+        sweep_runs=total_permutations,
     )
 
-    for run_index, permutation in enumerate(permutations):
-        run_key = f"RunID_{run_index:0{width}d}"
-        run_record = checkpoint_db.get("runs", {}).get(run_key, {})
+    # Run IDs follow the sweep order even when a target reorders or prunes runs,
+    # so resumed sweeps find their runs again.
+    run_order = pending(run_indices, run_key_of, finished)
+    estimates = {}
+    pruned = set()
+    if target is not None:
+        run_order, estimates, pruned = plan_runs(artwork_template, run_space, run_order, target)
+        logger.info(
+            "Target window keeps %d of %d permutations (%d pruned by the L/Q estimate)",
+            len(run_order),
+            len(run_order) + len(pruned),
+            len(pruned),
+        )
+        # Pruned runs are only recorded; they get no run folder.
+        checkpoint_store.update_many({
+            run_key_of(run_index): {
+                "parameters": run_space.parameters(run_index),
+                "estimate": estimates[run_index],
+                "pruned": True,
+            }
+            for run_index in sorted(pruned)
+        })
+        completedRuns += len(pruned)
+
+    generation_options = {
+        "generate_layout": enableLayoutGeneration,
+        "generate_svg": generateSVG,
+        "hierarchical": hierarchical,
+        "merge_layers": merge_layers,
+        "profile": profile,
+        "integer_coordinates": integer_coordinates,
+        "symmetry": symmetry,
+        "stream_gds": stream_gds,
+        "thumbnail_size": thumbnail_size,
+        "thumbnail_colors": thumbnail_colors,
+        "rule_check": rule_check,
+    }
+
+    # Pipeline stages share the checkpoint and summary; every update holds this lock.
+    checkpoint_lock = threading.RLock()
+
+    def record(run_key, updates):
+        with checkpoint_lock:
+            checkpoint_store.update(run_key, updates)
+
+    def report(run, task_status):
+        with checkpoint_lock:
+            update_summary(
+                summary_file_path,
+                run_total,
+                completedRuns,
+                run["key"],
+                run["index"],
+                task_status,
+                checkpoint_store,
+                current_permutation=run["permutation"],
+                current_run_name=run["name"],
+                sweep_runs=total_permutations,
+            )
+
+    def prepare_run(run_index):
+        """Write the run folder and decide which outputs the run still needs."""
+        permutation = run_space[run_index]
+        run_key = run_key_of(run_index)
+        run_record = checkpoint_store.get(run_key)
 
         layout_done = run_record.get("layout_completed", False)
         svg_done = run_record.get("svg_completed", False)
+        thumbnail_done = run_record.get("thumbnail_completed", False)
         simulation_done = run_record.get("simulation_completed", False)
 
         run_artwork = copy.deepcopy(artworkData)
@@ -422,13 +507,12 @@ def sweep(
             with open(run_parameters_json_path, "w", encoding="utf-8") as parfile:
                 json.dump(runData, parfile, indent=4)
 
-        update_checkpoint(
+        record(
             run_key,
-            checkpoint_db,
-            checkpoint_file_path,
             {
                 "parameters": runData["parameters"],
                 "run_name": run_name,
+                **({"estimate": estimates[run_index], "pruned": False} if run_index in estimates else {}),
             },
         )
 
@@ -445,6 +529,8 @@ def sweep(
         portCount = len(run_artwork.get("ports", {}).get("config", {}).get("simulatingPorts", []))
         gdsPath = os.path.join(run_output_dir, f"{run_name}.gds")
         svgPath = os.path.join(run_output_dir, f"{run_name}.svg")
+        pngPath = os.path.join(run_output_dir, f"{run_name}.png")
+        rulesPath = os.path.join(run_output_dir, f"{run_name}{RULES_SUFFIX}")
         sParamPath = os.path.join(run_output_dir, f"{run_name}.s{portCount}p")
 
         if enableLayoutGeneration or enableSimulation:
@@ -469,217 +555,439 @@ def sweep(
         else:
             needs_svg = False
 
-        if needs_layout or needs_svg:
-            task_status = {
-                "layout": {"status": "in progress", "last_updated": get_timestamp()} if needs_layout else {"status": "completed"},
-                "svg": {"status": "in progress", "last_updated": get_timestamp()} if needs_svg else {"status": "completed"},
-                "simulation": {"status": "pending"},
-            }
-            update_summary(
-                summary_file_path,
-                total_permutations,
-                completedRuns,
-                run_key,
-                run_index,
-                task_status,
-                checkpoint_db,
-                current_permutation=current_permutation,
-                current_run_name=run_name,
-            )
+        needs_thumbnail = bool(thumbnail_size) and (force or not thumbnail_done or not os.path.exists(pngPath))
+        needs_rule_check = rule_check and (force or not os.path.exists(rulesPath))
+
+        return {
+            "index": run_index,
+            "key": run_key,
+            "name": run_name,
+            "output_dir": run_output_dir,
+            "artwork": run_artwork,
+            "permutation": current_permutation,
+            "gds": gdsPath,
+            "svg": svgPath,
+            "png": pngPath,
+            "rules": rulesPath,
+            "sparam": sParamPath,
+            "needs_layout": needs_layout,
+            "needs_svg": needs_svg,
+            "needs_thumbnail": needs_thumbnail,
+            "needs_rule_check": needs_rule_check,
+            "simulation_done": simulation_done,
+        }
+
+    def needs_generation(run):
+        return run["needs_layout"] or run["needs_svg"] or run["needs_thumbnail"] or run["needs_rule_check"]
 
-            logger.info(
-                "Generating artwork for %s (needs_layout: %s, needs_svg: %s)",
+    def generation_started(run):
+        task_status = {
+            "layout": {"status": "in progress", "last_updated": get_timestamp()} if run["needs_layout"] else {"status": "completed"},
+            "svg": {"status": "in progress", "last_updated": get_timestamp()} if run["needs_svg"] else {"status": "completed"},
+            "simulation": {"status": "pending"},
+        }
+        report(run, task_status)
+
+        logger.info(
+            "Generating artwork for %s (needs_layout: %s, needs_svg: %s, needs_thumbnail: %s, "
+            "needs_rule_check: %s)",
+            run["key"],
+            run["needs_layout"],
+            run["needs_svg"],
+            run["needs_thumbnail"],
+            run["needs_rule_check"],
+        )
+
+    def generation_finished(run, result):
+        run_key = run["key"]
+        if result["ok"]:
+            if result["cached"]:
+                logger.info("Artwork for %s restored from the output cache", run_key)
+            else:
+                logger.info("Artwork generation succeeded for %s", run_key)
+        else:
+            logger.error("Artwork generation failed for %s: %s", run_key, result["error"])
+        # A failed generation records every output it was asked for as not completed.
+        updates = {}
+        if run["needs_layout"]:
+            updates["layout_completed"] = result["ok"] and os.path.exists(run["gds"])
+        if run["needs_svg"]:
+            updates["svg_completed"] = result["ok"] and os.path.exists(run["svg"])
+        if run["needs_thumbnail"]:
+            updates["thumbnail_completed"] = result["ok"] and os.path.exists(run["png"])
+        if updates:
+            record(run_key, updates)
+
+    def check_rules(run):
+        """Record the run's rule check; True if it found violations."""
+        # Runs that break a layout rule are not worth an EM simulation.
+        if not rule_check:
+            return False
+        run_key = run["key"]
+        rule_report = read_report(run["rules"])
+        if rule_report is None:
+            logger.warning("No rule check report for %s", run_key)
+            return False
+        rule_violation = not rule_report["passed"]
+        record(
+            run_key,
+            {
+                "rule_check_passed": rule_report["passed"],
+                "rule_violations": rule_report["counts"],
+                "simulation_skipped": rule_violation,
+            },
+        )
+        if rule_violation:
+            logger.warning(
+                "Rule check failed for %s (%s); skipping simulation",
                 run_key,
-                needs_layout,
-                needs_svg,
+                ", ".join(f"{name} x{count}" for name, count in rule_report["counts"].items()),
             )
+        return rule_violation
+
+    def simulation_command(run):
+        """The simulator command line of the run, or None if it needs no simulation."""
+        run_key = run["key"]
+        should_run_sim = force or not run["simulation_done"] or not os.path.exists(run["sparam"])
+        if not os.path.exists(run["gds"]):
+            logger.warning("Skipping simulation for %s because GDS file is missing.", run_key)
+            return None
+        if not should_run_sim:
+            return None
+
+        command = [
+            sys.executable,
+            str(SIMULATOR_SCRIPT),
+            "-f",
+            run["gds"],
+            "-a",
+            json.dumps(run["artwork"]),
+            "-c",
+            simulatorConfig if simulatorConfig else "",
+            "--sim",
+            simulator,
+            "-o",
+            run["output_dir"],
+            "-n",
+            run["name"],
+        ]
+
+        if verbose:
+            command.append("--verbose")
+        if log_level:
+            command.extend(["--log-level", log_level])
+
+        return [arg for arg in command if arg]
+
+    def simulation_started(run):
+        task_status = {
+            "layout": {"status": "completed"},
+            "svg": {"status": "completed" if os.path.exists(run["svg"]) else "pending"},
+            "simulation": {"status": "in progress", "last_updated": get_timestamp()},
+        }
+        report(run, task_status)
 
-            command = [
-                sys.executable,
-                str(artwork_generator_path),
-                "-a",
-                json.dumps(run_artwork),
-                "-o",
-                run_output_dir,
-                "-n",
-                run_name,
-            ]
-            if enableLayoutGeneration:
-                command.append("--layout")
-            if generateSVG:
-                command.append("--svg")
-            if verbose:
-                command.append("--verbose")
-            if log_level:
-                command.extend(["--log-level", log_level])
-
-            logger.debug("Running artwork generation command: %s", " ".join(command))
-            process = subprocess.run(command)
-
-            if process.returncode == 0:
-                logger.info("Artwork generation succeeded for %s", run_key)
-                if needs_layout:
-                    update_checkpoint(
-                        run_key,
-                        checkpoint_db,
-                        checkpoint_file_path,
-                        {"layout_completed": os.path.exists(gdsPath)},
-                    )
-                if needs_svg:
-                    update_checkpoint(
-                        run_key,
-                        checkpoint_db,
-                        checkpoint_file_path,
-                        {"svg_completed": os.path.exists(svgPath)},
-                    )
-            else:
-                logger.error("Artwork generation failed for %s with code %d", run_key, process.returncode)
-                if needs_layout:
-                    update_checkpoint(
-                        run_key,
-                        checkpoint_db,
-                        checkpoint_file_path,
-                        {"layout_completed": False},
-                    )
-                if needs_svg:
-                    update_checkpoint(
-                        run_key,
-                        checkpoint_db,
-                        checkpoint_file_path,
-                        {"svg_completed": False},
-                    )
-
-        if enableSimulation:
-            should_run_sim = force or not simulation_done or not os.path.exists(sParamPath)
-
-            if os.path.exists(gdsPath) and should_run_sim:
-                task_status = {
-                    "layout": {"status": "completed"},
-                    "svg": {"status": "completed" if os.path.exists(svgPath) else "pending"},
-                    "simulation": {"status": "in progress", "last_updated": get_timestamp()},
-                }
-                update_summary(
-                    summary_file_path,
-                    total_permutations,
-                    completedRuns,
-                    run_key,
-                    run_index,
-                    task_status,
-                    checkpoint_db,
-                    current_permutation=current_permutation,
-                    current_run_name=run_name,
-                )
-
-                logger.info("Performing EM simulation for %s", run_key)
-
-                command = [
-                    sys.executable,
-                    str(SIMULATOR_SCRIPT),
-                    "-f",
-                    gdsPath,
-                    "-a",
-                    json.dumps(run_artwork),
-                    "-c",
-                    simulatorConfig if simulatorConfig else "",
-                    "--sim",
-                    simulator,
-                    "-o",
-                    run_output_dir,
-                    "-n",
-                    run_name,
-                ]
-
-                if verbose:
-                    command.append("--verbose")
-                if log_level:
-                    command.extend(["--log-level", log_level])
-
-                command = [arg for arg in command if arg]
+        logger.info("Performing EM simulation for %s", run["key"])
 
-                logger.debug("Running simulation command: %s", " ".join(command))
-                process = subprocess.run(command)
-
-                if process.returncode == 0:
-                    logger.info("Simulation succeeded for %s", run_key)
-                    update_checkpoint(
-                        run_key,
-                        checkpoint_db,
-                        checkpoint_file_path,
-                        {"simulation_completed": os.path.exists(sParamPath)},
-                    )
-                else:
-                    logger.error("Simulation failed for %s with code %d", run_key, process.returncode)
-                    update_checkpoint(
-                        run_key,
-                        checkpoint_db,
-                        checkpoint_file_path,
-                        {"simulation_completed": False},
-                    )
-            elif enableSimulation and not os.path.exists(gdsPath):
-                logger.warning("Skipping simulation for %s because GDS file is missing.", run_key)
-
-        completedRuns += 1
+    def simulation_finished(run, returncode):
+        run_key = run["key"]
+        if returncode == 0:
+            logger.info("Simulation succeeded for %s", run_key)
+            record(run_key, {"simulation_completed": os.path.exists(run["sparam"])})
+        else:
+            logger.error("Simulation failed for %s with code %d", run_key, returncode)
+            record(run_key, {"simulation_completed": False})
+
+    def run_finished(run, rule_violation):
+        nonlocal completedRuns
+        with checkpoint_lock:
+            completedRuns += 1
         task_status = {
-            "layout": {"status": "completed" if os.path.exists(gdsPath) else "pending"},
-            "svg": {"status": "completed" if os.path.exists(svgPath) else "pending"},
-            "simulation": {"status": "completed" if os.path.exists(sParamPath) else "pending"},
+            "layout": {"status": "completed" if os.path.exists(run["gds"]) else "pending"},
+            "svg": {"status": "completed" if os.path.exists(run["svg"]) else "pending"},
+            "simulation": {"status": "skipped" if rule_violation
+                           else "completed" if os.path.exists(run["sparam"]) else "pending"},
         }
-        update_summary(
-            summary_file_path,
-            total_permutations,
-            completedRuns,
-            run_key,
-            run_index,
-            task_status,
-            checkpoint_db,
-            current_permutation=current_permutation,
-            current_run_name=run_name,
-        )
+        report(run, task_status)
+
+    # Set when a stage fails; every blocking queue operation gives up once it is set.
+    stop = threading.Event()
+    errors = []
+    ingested = {}
+
+    def put(stage_queue, item):
+        """Put an item on a bounded queue; False if the pipeline stopped first."""
+        while not stop.is_set():
+            try:
+                stage_queue.put(item, timeout=QUEUE_POLL_SECONDS)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def take(stage_queue):
+        """The next item of a queue, or None once the pipeline stopped."""
+        while not stop.is_set():
+            try:
+                return stage_queue.get(timeout=QUEUE_POLL_SECONDS)
+            except queue.Empty:
+                pass
+        return None
+
+    def run_stage(stage, *args):
+        try:
+            stage(*args)
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+            raise
+
+    def dispatch(run, simulation_queue):
+        """Send a generated run on to the simulation stage, or finish it."""
+        rule_violation = check_rules(run)
+        if enableSimulation and not rule_violation:
+            # Blocks while the queue is full, so generation stays only a few runs ahead.
+            put(simulation_queue, run)
+        else:
+            run_finished(run, rule_violation)
+
+    def generate_stage(simulation_queue):
+        to_generate = collections.deque()
+
+        def jobs_to_generate():
+            for run_index in run_order:
+                if stop.is_set():
+                    return
+                run = prepare_run(run_index)
+                if needs_generation(run):
+                    generation_started(run)
+                    to_generate.append(run)
+                    yield BatchJob(run["permutation"], run["output_dir"], run["name"])
+                else:
+                    dispatch(run, simulation_queue)
+
+        try:
+            results = generate_batch(
+                artwork_template,
+                jobs_to_generate(),
+                jobs=jobs,
+                log_level=logging.getLogger().level,
+                stage_cache_dir=stage_cache_dir,
+                stage_cache_bytes=stage_cache_bytes,
+                output_cache_dir=output_cache_dir,
+                output_cache_bytes=output_cache_bytes,
+                **generation_options,
+            )
+            for result in results:
+                if stop.is_set():
+                    break
+                run = to_generate.popleft()
+                generation_finished(run, result)
+                dispatch(run, simulation_queue)
+        finally:
+            for _ in range(slots):
+                put(simulation_queue, None)
+
+    def simulate_stage(simulation_queue, ingest_queue):
+        while True:
+            run = take(simulation_queue)
+            if run is None:
+                return
+            command = simulation_command(run)
+            if command is not None:
+                simulation_started(run)
+                logger.debug("Running simulation command: %s", " ".join(command))
+                simulation_finished(run, run_simulation(command))
+            put(ingest_queue, run)
+
+    def ingest_stage(ingest_queue):
+        while True:
+            run = take(ingest_queue)
+            if run is None:
+                return
+            # Parse the touchstone file now, so packing does not read every run at the end.
+            if packSimulationResults and os.path.exists(run["sparam"]):
+                try:
+                    ingested[os.path.basename(run["output_dir"])] = (run["sparam"], read_touchstone(run["sparam"]))
+                except Exception as e:
+                    logger.warning("Could not read %s for packing: %s", run["sparam"], e)
+            run_finished(run, False)
+
+    # generate -> simulate -> pack-ingest, each stage on its own threads and
+    # joined by bounded queues: layouts of later runs are built while earlier
+    # runs simulate, but never more than queue_depth runs per simulation slot ahead.
+    slots = simulation_slots(simulator, simulatorConfig, sim_jobs) if enableSimulation else 1
+    if jobs > 1 or slots > 1:
+        logger.info("Running with %d generation process(es) and %d simulation slot(s)", jobs, slots)
+    simulation_queue = queue.Queue(maxsize=slots * max(1, queue_depth))
+    ingest_queue = queue.Queue(maxsize=slots * max(1, queue_depth))
+    try:
+        with ThreadPoolExecutor(max_workers=slots + 2, thread_name_prefix="sweep") as stages:
+            try:
+                producers = [stages.submit(run_stage, generate_stage, simulation_queue)]
+                producers += [stages.submit(run_stage, simulate_stage, simulation_queue, ingest_queue)
+                              for _ in range(slots)]
+                ingester = stages.submit(run_stage, ingest_stage, ingest_queue)
+                wait(producers)
+                put(ingest_queue, None)
+                wait([ingester])
+            except BaseException:
+                stop.set()
+                raise
+        # The first stage that failed stopped the others; report its error as the sequential loop did.
+        if errors:
+            raise errors[0]
+    finally:
+        # checkpoint.db is the checkpoint; checkpoint.json is kept for tools that read it.
+        checkpoint_store.export_json()
+
+    if profile:
+        aggregate_generation_profiles(base_output_dir)
 
     if packSimulationResults:
         logger.info("Packing simulation results from base output: %s", base_output_dir)
-        pack_simulation_data(base_output_dir)
+        pack_simulation_data(base_output_dir, ingested)
 
         # refresh summary one last time after pack step
         update_summary(
             summary_file_path,
-            total_permutations,
+            run_total,
             completedRuns,
             "DONE",
-            total_permutations - 1 if total_permutations > 0 else -1,
+            last_run_index,
             {
                 "layout": {"status": "completed"},
                 "svg": {"status": "completed" if generateSVG else "pending"},
                 "simulation": {"status": "completed" if enableSimulation else "pending"},
                 "packing": {"status": "completed"},
             },
-            checkpoint_db,
+            checkpoint_store,
             current_permutation={},
             current_run_name=None,
+            sweep_runs=total_permutations,
         )
     else:
         update_summary(
             summary_file_path,
-            total_permutations,
+            run_total,
             completedRuns,
             "DONE",
-            total_permutations - 1 if total_permutations > 0 else -1,
+            last_run_index,
             {
                 "layout": {"status": "completed"},
                 "svg": {"status": "completed" if generateSVG else "pending"},
                 "simulation": {"status": "completed" if enableSimulation else "pending"},
             },
-            checkpoint_db,
+            checkpoint_store,
             current_permutation={},
             current_run_name=None,
+            sweep_runs=total_permutations,
         )
+    checkpoint_store.close()
+
+
+# ------------------------------------------------------------------------------
+# Aggregate generation profiles
+# ------------------------------------------------------------------------------
+def aggregate_generation_profiles(sweep_dir):
+    """
+    Combine the per-run <run>.profile.json sidecars into profile_summary.json.
+
+    For every stage the summary holds the number of runs, total/mean/max
+    seconds, mean polygon and vertex counts, the peak memory and how many runs
+    took it from the stage cache.
+    """
+    profile_paths = sorted(glob.glob(os.path.join(sweep_dir, "RunID_*", f"*{PROFILE_SUFFIX}")))
+    if not profile_paths:
+        logger.warning("No generation profiles found in %s", sweep_dir)
+        return None
+
+    stages = {}
+    run_seconds = []
+    for path in profile_paths:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                report = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning("Skipping unreadable profile %s: %s", path, e)
+            continue
+        run_seconds.append(report.get("total_seconds", 0.0))
+        for record in report.get("stages", []):
+            stage = stages.setdefault(record["stage"], {
+                "kind": record.get("kind"),
+                "runs": 0,
+                "cached_runs": 0,
+                "seconds": [],
+                "polygons": [],
+                "vertices": [],
+                "peak_memory_bytes": 0,
+            })
+            stage["runs"] += 1
+            stage["cached_runs"] += 1 if record.get("cached") else 0
+            stage["seconds"].append(record.get("seconds", 0.0))
+            if "polygons" in record:
+                stage["polygons"].append(record["polygons"])
+                stage["vertices"].append(record["vertices"])
+            stage["peak_memory_bytes"] = max(stage["peak_memory_bytes"], record.get("peak_memory_bytes", 0))
+
+    summary = {
+        "runs": len(run_seconds),
+        "total_seconds": float(np.sum(run_seconds)),
+        "mean_run_seconds": float(np.mean(run_seconds)) if run_seconds else 0.0,
+        "stages": {},
+    }
+    for name, stage in stages.items():
+        seconds = stage.pop("seconds")
+        polygons = stage.pop("polygons")
+        vertices = stage.pop("vertices")
+        stage.update({
+            "total_seconds": float(np.sum(seconds)),
+            "mean_seconds": float(np.mean(seconds)),
+            "max_seconds": float(np.max(seconds)),
+        })
+        if polygons:
+            stage["mean_polygons"] = float(np.mean(polygons))
+            stage["mean_vertices"] = float(np.mean(vertices))
+        summary["stages"][name] = stage
+
+    summary_path = os.path.join(sweep_dir, "profile_summary.json")
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=4)
+    logger.info("Aggregated %d generation profiles into %s", len(run_seconds), summary_path)
+    return summary
 
 
 # ------------------------------------------------------------------------------
 # Pack simulation data
 # ------------------------------------------------------------------------------
-def pack_simulation_data(sweep_dir):
+def read_touchstone(touchstone_path):
+    """
+    Read a touchstone file into (frequency_points, target_names, s_real_imag).
+    """
+    network = rf.Network(touchstone_path)
+    num_ports = network.s.shape[1]
+
+    target_names = []
+    s_real_imag = []
+    for i in range(num_ports):
+        for j in range(num_ports):
+            target_names.append(f"S{i+1}{j+1}_real")
+            target_names.append(f"S{i+1}{j+1}_imag")
+            s_real_imag.append(network.s[:, i, j].real)
+            s_real_imag.append(network.s[:, i, j].imag)
+
+    return network.f, target_names, np.stack(s_real_imag, axis=0)
+
+
+def pack_simulation_data(sweep_dir, ingested=None):
+    """
+    Pack the parameters and S-parameters of every run into simulation_data.npz.
+
+    ingested maps run folder names to (touchstone_path, read_touchstone result)
+    of files the sweep already read, which are not parsed again.
+    """
     logger.info("Packing simulation results from directory: %s", sweep_dir)
+    ingested = ingested or {}
 
     features_list = []
     targets_list = []
@@ -707,26 +1015,18 @@ def pack_simulation_data(sweep_dir):
         if touchstone_files:
             touchstone_path = touchstone_files[0]
             logger.info("Touchstone file found: %s", touchstone_path)
-            network = rf.Network(touchstone_path)
-            num_ports = network.s.shape[1]
+            cached = ingested.get(run_folder)
+            if cached is not None and cached[0] == touchstone_path:
+                frequencies, names, s_real_imag = cached[1]
+            else:
+                frequencies, names, s_real_imag = read_touchstone(touchstone_path)
 
             if frequency_points is None:
-                frequency_points = network.f
+                frequency_points = frequencies
 
             if target_names is None:
-                target_names = []
-                for i in range(num_ports):
-                    for j in range(num_ports):
-                        target_names.append(f"S{i+1}{j+1}_real")
-                        target_names.append(f"S{i+1}{j+1}_imag")
-
-            s_real_imag = []
-            for i in range(num_ports):
-                for j in range(num_ports):
-                    s_real_imag.append(network.s[:, i, j].real)
-                    s_real_imag.append(network.s[:, i, j].imag)
-
-            s_real_imag = np.stack(s_real_imag, axis=0)
+                target_names = names
+
             targets_list.append(s_real_imag)
         else:
             logger.warning("No touchstone file found for %s", run_folder)
@@ -754,6 +1054,17 @@ def pack_simulation_data(sweep_dir):
 # ------------------------------------------------------------------------------
 # Main
 # ------------------------------------------------------------------------------
+def parse_shard(value):
+    """Parse a --shard argument "K/N" into (K, N)."""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Shard must be K/N, got: {value!r}")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"Shard K/N needs 0 <= K < N, got: {value!r}")
+    return index, count
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Sweep script for artwork generation and simulation using .env paths with checkpointing."
@@ -776,21 +1087,110 @@ def main():
         default=None,
     )
     parser.add_argument("--verbose", "-v", action="store_true", help="Enable verbose (debug) output")
+    parser.add_argument(
+        "--hierarchical",
+        action="store_true",
+        help="Write vias and dummy fills as GDS cell references instead of flat polygons",
+    )
+    parser.add_argument(
+        "--merge",
+        action="store_true",
+        help="Union conductor polygons per layer before writing, to cut EM meshing time",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile artwork generation per run and aggregate the results into profile_summary.json",
+    )
+    parser.add_argument(
+        "--integer-coords",
+        action="store_true",
+        help="Snap generated geometry to the precision grid in integer GDS database units",
+    )
+    parser.add_argument(
+        "--symmetry",
+        action="store_true",
+        help="Generate part of the guard ring and dummy fills and mirror or rotate the rest",
+    )
+    parser.add_argument(
+        "--stream-gds",
+        action="store_true",
+        help="Stream GDS files while drawing instead of building gdspy polygons first",
+    )
+    parser.add_argument(
+        "--thumbnail",
+        type=int,
+        nargs="?",
+        const=DEFAULT_THUMBNAIL_SIZE,
+        default=0,
+        metavar="PX",
+        help=f"Write a PNG thumbnail per run, PX pixels on its longer side (default {DEFAULT_THUMBNAIL_SIZE})",
+    )
+    parser.add_argument(
+        "--thumbnail-colors",
+        help='Thumbnail colours as JSON data or file, keyed by layer name or "layer/datatype"',
+        default=None,
+    )
+    parser.add_argument(
+        "--rule-check",
+        action="store_true",
+        help="Check every layout against the rules of the artwork's layers block and skip simulating violating runs",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="Generate layouts in this many worker processes",
+    )
+    parser.add_argument(
+        "--sim-jobs",
+        type=int,
+        default=1,
+        help="Run up to this many simulations at once (EMX runs are capped by parallelCPU per run)",
+    )
+    parser.add_argument(
+        "--queue-depth",
+        type=int,
+        default=2,
+        help="Generated runs allowed to wait per simulation slot; generation pauses when they are all waiting",
+    )
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        default=None,
+        metavar="K/N",
+        help="Run only the K-th of N equal parts of the permutations (K from 0); shards share the output directory",
+    )
+    parser.add_argument(
+        "--stage-cache",
+        help="Directory to persist generated layout stages in, reused across sweeps and resumes",
+        default=None,
+    )
+    parser.add_argument(
+        "--stage-cache-size",
+        type=float,
+        default=DEFAULT_STAGE_CACHE_BYTES // 1024 ** 2,
+        help="Size cap of the stage cache directory in MB; least recently used stages are evicted",
+    )
+    parser.add_argument(
+        "--output-cache",
+        help="Directory of generated GDS/SVG files reused for runs whose artwork did not change",
+        default=None,
+    )
+    parser.add_argument(
+        "--output-cache-size",
+        type=float,
+        default=DEFAULT_MAX_BYTES // 1024 ** 2,
+        help="Size cap of the output cache in MB; least recently used files are evicted",
+    )
 
     args = parser.parse_args()
 
-    log_levels = {
-        "debug": logging.DEBUG,
-        "info": logging.INFO,
-        "warning": logging.WARNING,
-        "error": logging.ERROR,
-        "critical": logging.CRITICAL,
-    }
-
     if args.verbose:
         effective_level = logging.DEBUG
     elif args.log_level:
-        effective_level = log_levels[args.log_level]
+        effective_level = LOG_LEVELS[args.log_level]
     else:
         effective_level = logging.INFO
 
@@ -816,6 +1216,23 @@ def main():
         force=args.force,
         verbose=args.verbose,
         log_level=arg_log_level,
+        stage_cache_dir=args.stage_cache,
+        stage_cache_bytes=int(args.stage_cache_size * 1024 ** 2),
+        hierarchical=args.hierarchical,
+        merge_layers=args.merge,
+        profile=args.profile,
+        integer_coordinates=args.integer_coords,
+        symmetry=args.symmetry,
+        stream_gds=args.stream_gds,
+        output_cache_dir=args.output_cache,
+        output_cache_bytes=int(args.output_cache_size * 1024 ** 2),
+        thumbnail_size=args.thumbnail,
+        thumbnail_colors=load_json_data(args.thumbnail_colors) if args.thumbnail_colors else None,
+        rule_check=args.rule_check,
+        jobs=args.jobs,
+        sim_jobs=args.sim_jobs,
+        queue_depth=args.queue_depth,
+        shard=args.shard,
     )
 
 
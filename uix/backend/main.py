@@ -11,6 +11,7 @@ import threading
 import time
 from pathlib import Path
 from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlencode
 
 from dotenv import load_dotenv
 from fastapi import Body, FastAPI, HTTPException, Query, Request
@@ -57,6 +58,7 @@ DEFAULT_PROJECT: Dict[str, Any] = {
                     "draftConfig": {
                         "enable_layout": True,
                         "enable_svg": True,
+                        "enable_thumbnails": False,
                         "enable_simulation": False,
                         "pack_sim": False,
                         "simulator": "emx",
@@ -528,6 +530,10 @@ def patch_state(partial: Dict[str, Any]):
 GENERATOR_PY = (BACKEND_DIR / "../../artwork_generator/artwork_generator.py").resolve()
 SIMULATOR_PY = (BACKEND_DIR / "../../simulator/simulator.py").resolve()
 
+# Previews of unchanged artworks are restored from this cache instead of regenerated.
+PREVIEW_OUTPUT_CACHE = WORKSPACE_ROOT / ".output_cache"
+PREVIEW_OUTPUT_CACHE_MB = os.getenv("PREVIEW_OUTPUT_CACHE_MB", "512")
+
 
 def _preview_root_for_active_project() -> Path:
     pid = _get_active_project_id()
@@ -577,6 +583,8 @@ def generate_preview(payload: Dict[str, Any]):
     artwork = payload.get("artwork", payload)
     if not isinstance(artwork, dict):
         raise HTTPException(status_code=400, detail="Invalid payload: expected an artwork object (dict).")
+    # Interactive previews are level-of-detail SVGs; the full layout and GDS only on request.
+    full_detail = bool(payload.get("fullDetail", False))
 
     if not GENERATOR_PY.exists():
         raise HTTPException(status_code=500, detail=f"Generator script not found at: {str(GENERATOR_PY)}")
@@ -594,8 +602,11 @@ def generate_preview(payload: Dict[str, Any]):
         str(out_dir),
         "-n",
         "artwork",
-        "--layout",
-        "--svg",
+        *(["--layout", "--svg"] if full_detail else ["--svg", "--preview-lod"]),
+        "--output-cache",
+        str(PREVIEW_OUTPUT_CACHE),
+        "--output-cache-size",
+        PREVIEW_OUTPUT_CACHE_MB,
     ]
 
     try:
@@ -622,6 +633,10 @@ def generate_preview(payload: Dict[str, Any]):
 
     svg_path = _find_newest_file(out_dir, "svg")
     gds_path = _find_newest_file(out_dir, "gds")
+    if not full_detail and gds_path:
+        # A GDS from an earlier full-detail preview no longer matches the artwork.
+        gds_path.unlink(missing_ok=True)
+        gds_path = None
 
     if not svg_path or not svg_path.exists():
         raise HTTPException(
@@ -767,6 +782,7 @@ def _default_sweep_draft() -> Dict[str, Any]:
     return {
         "enable_layout": True,
         "enable_svg": True,
+        "enable_thumbnails": False,
         "enable_simulation": False,
         "pack_sim": False,
         "simulator": "emx",
@@ -954,6 +970,7 @@ def open_sweep(payload: Dict[str, Any] = Body(...)):
     draft_config = {
         "enable_layout": bool(prev_draft.get("enable_layout", True)),
         "enable_svg": bool(prev_draft.get("enable_svg", True)),
+        "enable_thumbnails": bool(prev_draft.get("enable_thumbnails", False)),
         "enable_simulation": bool(prev_draft.get("enable_simulation", False)),
         "pack_sim": bool(prev_draft.get("pack_sim", False)),
         "simulator": prev_draft.get("simulator", "emx"),
@@ -980,6 +997,7 @@ def open_sweep(payload: Dict[str, Any] = Body(...)):
         "config": {
             "enable_layout": draft_config["enable_layout"],
             "enable_svg": draft_config["enable_svg"],
+            "enable_thumbnails": draft_config["enable_thumbnails"],
             "enable_simulation": draft_config["enable_simulation"],
             "pack_sim": draft_config["pack_sim"],
             "simulator": draft_config["simulator"],
@@ -1009,6 +1027,7 @@ def save_sweep(payload: Dict[str, Any] = Body(...)):
     draft_config = {
         "enable_layout": bool(config.get("enable_layout", True)),
         "enable_svg": bool(config.get("enable_svg", True)),
+        "enable_thumbnails": bool(config.get("enable_thumbnails", False)),
         "enable_simulation": bool(config.get("enable_simulation", False)),
         "pack_sim": bool(config.get("pack_sim", False)),
         "simulator": config.get("simulator", "emx"),
@@ -1172,6 +1191,7 @@ def start_sweep(payload: Dict[str, Any] = Body(...)):
 
     enable_layout = bool(config.get("enable_layout"))
     enable_svg = bool(config.get("enable_svg"))
+    enable_thumbnails = bool(config.get("enable_thumbnails"))
     enable_simulation = bool(config.get("enable_simulation"))
     pack_sim = bool(config.get("pack_sim"))
     simulator = (config.get("simulator") or "emx").lower()
@@ -1210,6 +1230,8 @@ def start_sweep(payload: Dict[str, Any] = Body(...)):
         command.append("--layout")
     if enable_svg:
         command.append("--svg")
+    if enable_thumbnails:
+        command.append("--thumbnail")
     if enable_simulation:
         config_path = project_dir / "simConfig.json"
         command.extend(["--simulate", "-c", str(config_path)])
@@ -1258,6 +1280,7 @@ def start_sweep(payload: Dict[str, Any] = Body(...)):
     draft_config = {
         "enable_layout": enable_layout,
         "enable_svg": enable_svg,
+        "enable_thumbnails": enable_thumbnails,
         "enable_simulation": enable_simulation,
         "pack_sim": pack_sim,
         "simulator": simulator,
@@ -1274,6 +1297,49 @@ def start_sweep(payload: Dict[str, Any] = Body(...)):
     return {"ok": True, "sweep_name": sweep_name}
 
 
+_SWEEP_RUN_DIR = re.compile(r"RunID_\d+")
+
+
+def _sweep_run_thumbnail(sdir: Path, run: str) -> Optional[Path]:
+    if not _SWEEP_RUN_DIR.fullmatch(run):
+        raise HTTPException(status_code=400, detail="Invalid run id.")
+    run_dir = sdir / run
+    if not run_dir.is_dir():
+        return None
+    return next(iter(sorted(run_dir.glob("*.png"))), None)
+
+
+@app.get("/api/sweeps/thumbnails")
+def list_sweep_thumbnails(sweep_name: str = Query(...)):
+    """List the runs of a sweep that have a thumbnail, with their swept parameters, for a gallery."""
+    actual_name, sdir = _resolve_existing_sweep_dir(sweep_name)
+    items = []
+    for run_dir in sorted(p for p in sdir.iterdir() if p.is_dir() and _SWEEP_RUN_DIR.fullmatch(p.name)):
+        thumbnail = _sweep_run_thumbnail(sdir, run_dir.name)
+        if thumbnail is None:
+            continue
+        run_data = _read_json(run_dir / "parameters.json", {}, strict=False)
+        items.append({
+            "run": run_dir.name,
+            "name": thumbnail.stem,
+            "parameters": run_data.get("parameters", {}) if isinstance(run_data, dict) else {},
+            "url": "/api/sweeps/thumbnail?" + urlencode({"sweep_name": actual_name, "run": run_dir.name}),
+            "mtime": thumbnail.stat().st_mtime,
+        })
+    return {"ok": True, "sweep_name": actual_name, "items": items}
+
+
+@app.get("/api/sweeps/thumbnail")
+def get_sweep_thumbnail(sweep_name: str = Query(...), run: str = Query(...)):
+    _, sdir = _resolve_existing_sweep_dir(sweep_name)
+    thumbnail = _sweep_run_thumbnail(sdir, run)
+    if thumbnail is None:
+        raise HTTPException(status_code=404, detail="Thumbnail not found")
+    # Thumbnails of finished runs do not change, and a gallery loads many of them.
+    return FileResponse(path=str(thumbnail), media_type="image/png", filename=thumbnail.name,
+                        headers={"Cache-Control": "max-age=300"})
+
+
 @app.post("/api/sweeps/stop")
 def stop_sweep(payload: Dict[str, Any] = Body(default={})):
     proc = SWEEP_RUNS.get(SWEEP_ACTIVE_RUN_KEY)
@@ -3,6 +3,7 @@ import ProcessConsole from "../../components/ProcessConsole";
 import { appendCapped, maxLineTime } from "../../components/consoleUtils";
 import { IconPencil, IconTrash } from "../../icons/actionIcons";
 import { useUiStore } from "../../state/uiStore";
+import ThumbnailGallery from "./sweep/ThumbnailGallery";
 
 const API_BASE = import.meta.env.VITE_API_BASE || "http://localhost:8000";
 
@@ -14,6 +15,7 @@ const ARTWORK_PARAMETERS_PATH = ["artwork", "parameters"];
 const DEFAULT_DRAFT = {
   enable_layout: true,
   enable_svg: true,
+  enable_thumbnails: false,
   enable_simulation: false,
   pack_sim: false,
   simulator: "emx",
@@ -121,6 +123,7 @@ function sweepResponseToDraft(config) {
   return {
     enable_layout: !!config?.enable_layout,
     enable_svg: !!config?.enable_svg,
+    enable_thumbnails: !!config?.enable_thumbnails,
     enable_simulation: !!config?.enable_simulation,
     pack_sim: !!config?.pack_sim,
     simulator: config?.simulator || "emx",
@@ -133,6 +136,7 @@ function draftToBackendConfig(draft) {
   return {
     enable_layout: !!draft.enable_layout,
     enable_svg: !!draft.enable_svg,
+    enable_thumbnails: !!draft.enable_thumbnails,
     enable_simulation: !!draft.enable_simulation,
     pack_sim: !!draft.pack_sim,
     simulator: draft.simulator || "emx",
@@ -899,6 +903,16 @@ export default function Sweep() {
               Enable SVG
             </label>
 
+            <label style={{ display: "flex", gap: 8, alignItems: "center" }}>
+              <input
+                type="checkbox"
+                checked={draft.enable_thumbnails}
+                onChange={(e) => updateTopField("enable_thumbnails", e.target.checked)}
+                disabled={running}
+              />
+              Enable PNG thumbnails
+            </label>
+
             <label style={{ display: "flex", gap: 8, alignItems: "center" }}>
               <input
                 type="checkbox"
@@ -1079,6 +1093,10 @@ export default function Sweep() {
             </button>
           </div>
 
+          {activeSweep ? (
+            <ThumbnailGallery sweepName={activeSweep} completedRuns={summary.completed_runs} />
+          ) : null}
+
           <ProcessConsole
             title={activeSweep ? `Sweep output — ${activeSweep} (server log)` : "Sweep output"}
             lines={lines}
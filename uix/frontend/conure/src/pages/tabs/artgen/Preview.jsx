@@ -8,6 +8,7 @@ export default function Preview({ draftArtwork }) {
   const [svgName, setSvgName] = useState(null);
   const [gdsName, setGdsName] = useState(null);
   const [error, setError] = useState("");
+  const [fullDetail, setFullDetail] = useState(false);
 
   async function generate() {
     setLoading(true);
@@ -20,7 +21,7 @@ export default function Preview({ draftArtwork }) {
       const res = await fetch(`${API_BASE}/api/preview/generate`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ artwork: draftArtwork }),
+        body: JSON.stringify({ artwork: draftArtwork, fullDetail }),
       });
 
       if (!res.ok) {
@@ -69,6 +70,16 @@ export default function Preview({ draftArtwork }) {
           {loading ? "Generating..." : "Generate Preview"}
         </button>
 
+        <label title="Draw every via and dummy fill and also generate the GDS file">
+          <input
+            type="checkbox"
+            checked={fullDetail}
+            onChange={(e) => setFullDetail(e.target.checked)}
+            disabled={loading}
+          />{" "}
+          Full detail
+        </label>
+
         <button onClick={() => download(svgUrl)} disabled={!svgText || loading}>
           Download SVG
         </button>
@@ -76,7 +87,7 @@ export default function Preview({ draftArtwork }) {
         <button
           onClick={() => download(gdsUrl)}
           disabled={!gdsName || loading}
-          title={!gdsName ? "GDS not generated/found" : ""}
+          title={!gdsName ? "GDS is generated with Full detail only" : ""}
         >
           Download GDS
         </button>
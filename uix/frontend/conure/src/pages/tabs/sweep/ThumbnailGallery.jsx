@@ -0,0 +1,120 @@
+import { useEffect, useState } from "react";
+
+const API_BASE = import.meta.env.VITE_API_BASE || "http://localhost:8000";
+
+function formatParameters(parameters) {
+  return Object.entries(parameters || {})
+    .map(([name, value]) => `${name}=${value}`)
+    .join(", ");
+}
+
+export default function ThumbnailGallery({ sweepName, completedRuns }) {
+  const [items, setItems] = useState([]);
+  const [error, setError] = useState("");
+  const [filter, setFilter] = useState("");
+
+  // completedRuns changes while a sweep runs, so new thumbnails show up as they are written.
+  useEffect(() => {
+    let cancelled = false;
+    if (!sweepName) {
+      setItems([]);
+      return () => {
+        cancelled = true;
+      };
+    }
+    (async () => {
+      try {
+        const res = await fetch(
+          `${API_BASE}/api/sweeps/thumbnails?sweep_name=${encodeURIComponent(sweepName)}`
+        );
+        if (!res.ok) throw new Error(await res.text());
+        const data = await res.json();
+        if (!cancelled) {
+          setItems(data.items || []);
+          setError("");
+        }
+      } catch (err) {
+        if (!cancelled) setError(err?.message || String(err));
+      }
+    })();
+    return () => {
+      cancelled = true;
+    };
+  }, [sweepName, completedRuns]);
+
+  const needle = filter.trim().toLowerCase();
+  const shown = needle
+    ? items.filter((item) =>
+        `${item.run} ${item.name} ${formatParameters(item.parameters)}`.toLowerCase().includes(needle)
+      )
+    : items;
+
+  return (
+    <div style={{ marginBottom: 16 }}>
+      <div style={{ display: "flex", justifyContent: "space-between", alignItems: "center", marginBottom: 8 }}>
+        <strong>Thumbnails ({items.length})</strong>
+        <input
+          value={filter}
+          onChange={(e) => setFilter(e.target.value)}
+          placeholder="Filter by run or parameter"
+          style={{ width: 220 }}
+        />
+      </div>
+
+      {error ? <div style={{ color: "crimson", marginBottom: 8 }}>{error}</div> : null}
+
+      {shown.length === 0 ? (
+        <div style={{ opacity: 0.7, fontSize: 13 }}>
+          {items.length === 0
+            ? "No thumbnails yet. Enable PNG thumbnails and start the sweep."
+            : "No thumbnails match the filter."}
+        </div>
+      ) : (
+        <div
+          style={{
+            display: "grid",
+            gridTemplateColumns: "repeat(auto-fill, minmax(160px, 1fr))",
+            gap: 10,
+            maxHeight: 520,
+            overflow: "auto",
+          }}
+        >
+          {shown.map((item) => {
+            const src = `${API_BASE}${item.url}&v=${encodeURIComponent(item.mtime)}`;
+            const parameters = formatParameters(item.parameters);
+            return (
+              <a
+                key={item.run}
+                href={src}
+                target="_blank"
+                rel="noopener noreferrer"
+                title={parameters || item.name}
+                style={{
+                  display: "block",
+                  border: "1px solid #e2e8f0",
+                  borderRadius: 8,
+                  padding: 6,
+                  background: "#fafafa",
+                  color: "#1f2937",
+                  textDecoration: "none",
+                  fontSize: 11,
+                }}
+              >
+                <img
+                  src={src}
+                  alt={item.name}
+                  loading="lazy"
+                  style={{ display: "block", width: "100%", aspectRatio: "1 / 1", objectFit: "contain" }}
+                />
+                <div style={{ marginTop: 4, fontWeight: 600 }}>{item.run}</div>
+                <div style={{ overflow: "hidden", textOverflow: "ellipsis", whiteSpace: "nowrap" }}>
+                  {parameters}
+                </div>
+              </a>
+            );
+          })}
+        </div>
+      )}
+    </div>
+  );
+}